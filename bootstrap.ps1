@@ -72,7 +72,7 @@ Pop-Location
 
 Write-Step "Bootstrap complete"
 Write-Host "Next steps:" -ForegroundColor Green
-Write-Host "1) Configure PostgreSQL database and credentials in server/database.py" -ForegroundColor Green
+Write-Host "1) Configure PostgreSQL (DB_HOST/DB_USER/DB_PASSWORD/DB_NAME or DATABASE_URL), or for a single-node run: `$env:DATABASE_URL='sqlite:///ids.db'" -ForegroundColor Green
 Write-Host "2) Start backend:  cd server; .\.venv\Scripts\Activate.ps1; uvicorn main:app --reload --port 8000" -ForegroundColor Green
 Write-Host "3) Start frontend: cd frontend; npm run dev" -ForegroundColor Green
 Write-Host "4) (Optional Model app) set up Model deps and run python app.py" -ForegroundColor Green
@@ -1,10 +1,10 @@
-from sentence_transformers import SentenceTransformer
-
 _model = None
 
 def load_embedding_model():
     global _model
     if _model is None:
+        # Imported here: sentence_transformers pulls in torch, which is slow to import.
+        from sentence_transformers import SentenceTransformer
         _model = SentenceTransformer('all-MiniLM-L6-v2')
     return _model
 
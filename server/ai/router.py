@@ -3,22 +3,38 @@ from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
+from collections import defaultdict
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from database import get_db, ChatSession, ChatMessage, ManualReview, AutoBlocked, TrafficLog
+from sqlalchemy import func, select
+from database import get_async_db, get_db, ChatSession, ChatMessage, ManualReview, AutoBlocked, TrafficLog
+from pending_queue import pending_queue
 from .Rag.retriever import RAGSystem
 from .Rag.prompt_template import build_prompt
 from .llm.ollama_client import generate_response
 import json
+import threading
 
 router = APIRouter(prefix="/api/ai", tags=["AI Assistant"])
 
-# Initialize RAG (lazy load or global)
-try:
-    rag = RAGSystem([], None) 
-except Exception as e:
-    print(f"Warning: RAG System failed to initialize: {e}")
-    rag = None
+# RAG is built on first use (or warmed by main.py's startup thread) so importing
+# the router does not load the embedding model.
+_rag = None
+_rag_failed = False
+_rag_lock = threading.Lock()
+
+
+def get_rag():
+    """Return the shared RAG system, or None if it could not be initialized."""
+    global _rag, _rag_failed
+    with _rag_lock:
+        if _rag is None and not _rag_failed:
+            try:
+                _rag = RAGSystem([], None)
+            except Exception as e:
+                print(f"Warning: RAG System failed to initialize: {e}")
+                _rag_failed = True
+    return _rag
 
 class ChatRequest(BaseModel):
     query: str
@@ -42,10 +58,11 @@ def get_db_context(db: Session, query: str) -> str:
 
     # 1. Total Counts
     total_logs = db.query(TrafficLog).count()
-    pending_reviews = db.query(ManualReview).filter(ManualReview.status == "PENDING").count()
+    pending_reviews = pending_queue.committed_count()
+    pending_by_type = ", ".join(f"{t}: {n}" for t, n in sorted(pending_queue.by_type().items()))
     auto_blocked = db.query(AutoBlocked).count()
     context += f"- Total Traffic Logs: {total_logs}\n"
-    context += f"- Pending Incidents: {pending_reviews}\n"
+    context += f"- Pending Incidents: {pending_reviews}" + (f" ({pending_by_type})" if pending_by_type else "") + "\n"
     context += f"- Auto-Blocked IPs: {auto_blocked}\n"
 
     # 2. Country-Specific Queries (e.g., "logs from China")
@@ -172,11 +189,21 @@ def chat(req: ChatRequest, db: Session = Depends(get_db)):
     return StreamingResponse(stream_logic(), media_type="text/plain", headers={"X-Session-Id": str(session_id)})
 
 @router.get("/history", response_model=List[SessionResponse])
-def get_history(db: Session = Depends(get_db)):
-    sessions = db.query(ChatSession).order_by(ChatSession.created_at.desc()).limit(10).all()
+async def get_history(db: AsyncSession = Depends(get_async_db)):
+    sessions = (await db.scalars(select(ChatSession).order_by(ChatSession.created_at.desc()).limit(10))).all()
+    # One query for the messages of all listed sessions instead of one per session.
+    messages = defaultdict(list)
+    if sessions:
+        rows = await db.scalars(
+            select(ChatMessage)
+            .where(ChatMessage.session_id.in_([s.id for s in sessions]))
+            .order_by(ChatMessage.timestamp)
+        )
+        for m in rows:
+            messages[m.session_id].append(m)
     result = []
     for s in sessions:
-        msgs = db.query(ChatMessage).filter(ChatMessage.session_id == s.id).order_by(ChatMessage.timestamp).all()
+        msgs = messages[s.id]
         result.append({
             "id": s.id,
             "title": s.title,
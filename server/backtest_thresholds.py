@@ -7,17 +7,22 @@ Usage:
 """
 
 import json
+import os
 
 import joblib
 import numpy as np
 import pandas as pd
 from sklearn.metrics import precision_score, recall_score, f1_score
 
+from corpus_cache import load_corpus
+
 DATA_FILE = "large_simulation_log.csv"
 FEATURE_FILE = "feature_columns.json"
 MODEL_FILE = "multiclass_xgboost_ids.joblib"
 LABEL_ENCODER_FILE = "label_encoder.joblib"
 SCALER_FILE = "scaler.joblib"
+UNSCALED_MODEL_FILE = "multiclass_xgboost_ids_unscaled.joblib"
+MODEL_METADATA_FILE = "model_metadata.json"
 
 
 def add_engineered_features(df: pd.DataFrame) -> pd.DataFrame:
@@ -31,22 +36,32 @@ def add_engineered_features(df: pd.DataFrame) -> pd.DataFrame:
     return out
 
 
+def load_model_and_scaler():
+    """Prefer the verified scaler-free export; otherwise fall back to model + scaler."""
+    metadata = {}
+    if os.path.exists(MODEL_METADATA_FILE):
+        with open(MODEL_METADATA_FILE, "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+    if metadata.get("scaler_folding", {}).get("exported", False) and os.path.exists(UNSCALED_MODEL_FILE):
+        return joblib.load(UNSCALED_MODEL_FILE), None
+    return joblib.load(MODEL_FILE), joblib.load(SCALER_FILE)
+
+
 def main() -> None:
-    model = joblib.load(MODEL_FILE)
-    scaler = joblib.load(SCALER_FILE)
+    model, scaler = load_model_and_scaler()
     le = joblib.load(LABEL_ENCODER_FILE)
     with open(FEATURE_FILE, "r", encoding="utf-8") as f:
         feature_columns = json.load(f)
 
-    df = pd.read_csv(DATA_FILE)
-    df.columns = df.columns.str.strip()
+    df = load_corpus(DATA_FILE)
     df = add_engineered_features(df)
     X = df[feature_columns].replace([np.inf, -np.inf], np.nan).fillna(0.0)
     y_text = df["Attack Type"].astype(str).values
     y_true = (y_text != "Normal Traffic").astype(int)
 
-    Xs = pd.DataFrame(scaler.transform(X), columns=feature_columns)
-    probs = model.predict_proba(Xs)
+    if scaler is not None:
+        X = pd.DataFrame(scaler.transform(X), columns=feature_columns)
+    probs = model.predict_proba(X)
     pred_idx = np.argmax(probs, axis=1)
     pred_conf = np.max(probs, axis=1)
     pred_text = le.inverse_transform(pred_idx)
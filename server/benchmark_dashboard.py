@@ -0,0 +1,133 @@
+"""
+Load test the dashboard read endpoints with many concurrent pollers.
+
+Each poller behaves like an open dashboard tab: every --interval seconds it
+requests all --paths at once and records each response time. Pollers start
+at random offsets within the first interval so they don't fire in lockstep.
+Requests during the --warmup period are not recorded. Reports p50/p95/p99/max
+latency and errors per endpoint and overall. Pass several --url values (e.g.
+the sync and async builds of the API on two ports) to run the same load
+against each in turn and compare p99.
+
+Needs a running API (uvicorn main:app) and httpx (pip install httpx).
+
+Usage:
+    cd server
+    python benchmark_dashboard.py --url http://127.0.0.1:8000
+    python benchmark_dashboard.py --url http://127.0.0.1:8000 --url http://127.0.0.1:8001 --pollers 200 --duration 60
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+import numpy as np
+
+DASHBOARD_PATHS = (
+    "/api/system/health",
+    "/api/metrics/overview",
+    "/api/traffic/live",
+    "/api/threats/map",
+    "/api/incidents/pending",
+    "/api/logs/audit",
+)
+
+
+async def _get(client: httpx.AsyncClient, path: str, samples: dict, errors: dict, record_from: float) -> None:
+    start = time.perf_counter()
+    try:
+        response = await client.get(path)
+        ok = response.status_code == 200
+    except httpx.HTTPError:
+        ok = False
+    elapsed = time.perf_counter() - start
+    if start < record_from:
+        return
+    if ok:
+        samples[path].append(elapsed)
+    else:
+        errors[path] += 1
+
+
+async def _poller(client: httpx.AsyncClient, paths: list, interval: float, record_from: float,
+                  deadline: float, samples: dict, errors: dict) -> None:
+    await asyncio.sleep(random.uniform(0, interval))
+    while time.perf_counter() < deadline:
+        tick = time.perf_counter()
+        await asyncio.gather(*(_get(client, path, samples, errors, record_from) for path in paths))
+        await asyncio.sleep(max(0.0, interval - (time.perf_counter() - tick)))
+
+
+async def run_load(url: str, paths: list, pollers: int, interval: float, warmup: float, duration: float,
+                   timeout: float) -> dict:
+    """{path: (latencies in seconds, error count)} for `pollers` dashboards polling `url` for `duration` s.
+
+    Requests started during the first `warmup` seconds (connection pools filling up) are not recorded.
+    """
+    samples = {path: [] for path in paths}
+    errors = {path: 0 for path in paths}
+    limits = httpx.Limits(max_connections=pollers * len(paths), max_keepalive_connections=pollers * len(paths))
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        record_from = time.perf_counter() + warmup
+        deadline = record_from + duration
+        await asyncio.gather(*(
+            _poller(client, paths, interval, record_from, deadline, samples, errors) for _ in range(pollers)
+        ))
+    return {path: (samples[path], errors[path]) for path in paths}
+
+
+def _row(name: str, latencies: list, errors: int) -> str:
+    if not latencies:
+        return f"{name:<28} | {0:>7} | {errors:>6} | {'-':>8} | {'-':>8} | {'-':>8} | {'-':>8}"
+    p50, p95, p99 = np.percentile(np.asarray(latencies) * 1000, [50, 95, 99])
+    return (f"{name:<28} | {len(latencies):>7} | {errors:>6} | {p50:>8.1f} | {p95:>8.1f} | "
+            f"{p99:>8.1f} | {max(latencies) * 1000:>8.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test the dashboard endpoints with concurrent pollers.")
+    parser.add_argument("--url", action="append", help="API base URL; repeat to compare servers "
+                                                       "(default http://127.0.0.1:8000)")
+    parser.add_argument("--paths", default=",".join(DASHBOARD_PATHS), help="comma-separated endpoints per poll")
+    parser.add_argument("--pollers", type=int, default=200, help="concurrent dashboards")
+    parser.add_argument("--interval", type=float, default=2.0, help="seconds between polls per dashboard")
+    parser.add_argument("--warmup", type=float, default=10.0, help="seconds of unrecorded load before measuring")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds of recorded load per server")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout in seconds")
+    args = parser.parse_args()
+
+    urls = args.url or ["http://127.0.0.1:8000"]
+    paths = [p.strip() for p in args.paths.split(",") if p.strip()]
+    print(f"{args.pollers} pollers x {len(paths)} endpoints every {args.interval:g}s "
+          f"for {args.duration:g}s after {args.warmup:g}s warmup")
+
+    p99 = {}
+    for url in urls:
+        results = asyncio.run(run_load(url, paths, args.pollers, args.interval, args.warmup, args.duration,
+                                       args.timeout))
+        print()
+        print(url)
+        print("-" * 92)
+        print(f"{'endpoint':<28} | {'ok':>7} | {'errors':>6} | {'p50 ms':>8} | {'p95 ms':>8} | "
+              f"{'p99 ms':>8} | {'max ms':>8}")
+        print("-" * 92)
+        for path, (latencies, errors) in results.items():
+            print(_row(path, latencies, errors))
+        every = [s for latencies, _ in results.values() for s in latencies]
+        print(_row("all", every, sum(errors for _, errors in results.values())))
+        if every:
+            p99[url] = float(np.percentile(every, 99))
+
+    if len(p99) > 1:
+        base = urls[0]
+        print()
+        for url in urls[1:]:
+            if base in p99 and url in p99:
+                print(f"p99 {url} vs {base}: {p99[url] * 1000:.1f} ms vs {p99[base] * 1000:.1f} ms "
+                      f"({p99[base] / p99[url]:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
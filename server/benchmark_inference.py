@@ -0,0 +1,189 @@
+"""
+Benchmark the inference hot path used by traffic_simulator.
+
+Usage:
+    cd server
+    python benchmark_inference.py
+    python benchmark_inference.py --rows 2000 --repeat 500
+"""
+
+import argparse
+import json
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from explanations import contribution_matrix, format_top_contributors
+from fast_scorer import FastScorer
+from scoring_pool import ScoringPool
+
+DATA_FILE = "large_simulation_log.csv"
+FEATURE_FILE = "feature_columns.json"
+FEATURE_BASELINE_FILE = "feature_baseline.json"
+MODEL_FILE = "multiclass_xgboost_ids.joblib"
+EXPLAIN_MODEL_FILE = "xgboost_explainer.joblib"
+SCALER_FILE = "scaler.joblib"
+
+
+def load_sample_features(feature_columns, rows: int, seed: int = 42) -> pd.DataFrame:
+    """Raw feature rows from the replay CSV, or drawn from the training baseline if it is absent."""
+    if os.path.exists(DATA_FILE):
+        df = pd.read_csv(DATA_FILE, nrows=rows)
+        df.columns = df.columns.str.strip()
+        eps = 1e-6
+        df["feat_bytes_per_packet"] = df["Flow Bytes/s"] / (df["Flow Packets/s"] + eps)
+        df["feat_fwd_bwd_rate_ratio"] = df["Fwd Packets/s"] / (df["Bwd Packets/s"] + eps)
+        df["feat_flow_iat_range"] = df["Flow IAT Max"] - df["Flow IAT Min"]
+        df["feat_packet_len_range"] = df["Max Packet Length"] - df["Min Packet Length"]
+        df["feat_packet_length_cv"] = df["Packet Length Std"] / (df["Packet Length Mean"] + eps)
+        return df.reindex(columns=feature_columns, fill_value=0.0).replace([np.inf, -np.inf], np.nan).fillna(0.0)
+
+    with open(FEATURE_BASELINE_FILE, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    rng = np.random.default_rng(seed)
+    data = {
+        col: np.abs(rng.normal(baseline["mean"][col], baseline["std"][col], rows))
+        for col in feature_columns
+    }
+    return pd.DataFrame(data, columns=feature_columns)
+
+
+def time_per_call(fn, repeat: int) -> float:
+    """Median wall time of fn() in microseconds."""
+    fn()  # warm-up
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return float(np.median(samples)) * 1e6
+
+
+def bench_scorer(model, scaler, feature_columns, X_raw: pd.DataFrame, repeat: int) -> None:
+    scorer = FastScorer.from_model(model)
+    if scorer is None:
+        print("FastScorer: model is not a multi-class sigmoid-calibrated XGBoost, skipping.")
+        return
+
+    X_model = scaler.transform(X_raw) if scaler is not None else X_raw.to_numpy()
+    X_model32 = np.ascontiguousarray(X_model, dtype=np.float32)
+    expected = model.predict_proba(pd.DataFrame(X_model, columns=feature_columns))
+    actual = scorer.predict_proba(X_model32)
+    print(f"Parity: max |p_sklearn - p_fast| = {np.abs(expected - actual).max():.3e} over {len(X_raw)} rows")
+
+    one = X_model32[:1]
+    one_df = pd.DataFrame(X_model[:1], columns=feature_columns)
+    batch = X_model32[:256]
+    batch_df = pd.DataFrame(X_model[:256], columns=feature_columns)
+
+    print("-" * 72)
+    print(f"{'path':<40} | {'rows':>5} | {'us/call':>10} | {'us/row':>8}")
+    print("-" * 72)
+    for name, fn, n in [
+        ("CalibratedClassifierCV (DataFrame)", lambda: model.predict_proba(one_df), 1),
+        ("FastScorer (inplace_predict)", lambda: scorer.predict_proba(one), 1),
+        ("CalibratedClassifierCV (DataFrame)", lambda: model.predict_proba(batch_df), len(batch)),
+        ("FastScorer (inplace_predict)", lambda: scorer.predict_proba(batch), len(batch)),
+    ]:
+        us = time_per_call(fn, repeat if n == 1 else max(10, repeat // 10))
+        print(f"{name:<40} | {n:>5} | {us:>10.1f} | {us / n:>8.1f}")
+
+
+def bench_explanations(explain_model, model, scaler, X_raw: pd.DataFrame, feature_columns) -> None:
+    booster = explain_model.get_booster()
+    X_model = scaler.transform(X_raw) if scaler is not None else X_raw.to_numpy()
+    X_model = np.ascontiguousarray(X_model, dtype=np.float32)
+    class_idx = np.argmax(model.predict_proba(pd.DataFrame(X_model, columns=feature_columns)), axis=1)
+    per_k = 1000.0 / len(X_model)
+
+    print("-" * 72)
+    print(f"{'mode':<40} | {'rows':>5} | {'ms/1k rows':>12}")
+    print("-" * 72)
+    for name, approximate in [("exact TreeSHAP (pred_contribs)", False), ("approx Saabas (approx_contribs)", True)]:
+        start = time.perf_counter()
+        contrib = contribution_matrix(booster, X_model, class_idx, feature_columns, approximate=approximate)
+        format_top_contributors(contrib, feature_columns, top_k=3)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(f"{name + ', batched':<40} | {len(X_model):>5} | {elapsed_ms * per_k:>12.1f}")
+
+    # Today's path for reference: one DMatrix + pred_contribs call per row.
+    sample = X_model[:100]
+    start = time.perf_counter()
+    for i in range(len(sample)):
+        contrib = contribution_matrix(booster, sample[i:i + 1], class_idx[i:i + 1], feature_columns)
+        format_top_contributors(contrib, feature_columns, top_k=3)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    print(f"{'exact TreeSHAP, per row':<40} | {len(sample):>5} | {elapsed_ms * 1000.0 / len(sample):>12.1f}")
+
+    exact = contribution_matrix(booster, X_model, class_idx, feature_columns)
+    approx = contribution_matrix(booster, X_model, class_idx, feature_columns, approximate=True)
+    top1_agreement = float((np.abs(exact).argmax(axis=1) == np.abs(approx).argmax(axis=1)).mean())
+    print(f"Top-1 contributor agreement exact vs approx: {top1_agreement:.3f}")
+
+
+def bench_pool_throughput(scaler, X_raw: pd.DataFrame, worker_counts, seconds: float, batch_rows: int) -> None:
+    X_model = scaler.transform(X_raw) if scaler is not None else X_raw.to_numpy()
+    X_model = np.ascontiguousarray(X_model, dtype=np.float32)
+    reps = int(np.ceil(batch_rows / len(X_model)))
+    batch = np.ascontiguousarray(np.tile(X_model, (reps, 1))[:batch_rows])
+
+    print("-" * 72)
+    print(f"{'workers':>7} | {'batch':>6} | {'packets/sec':>12} | {'speedup':>8}")
+    print("-" * 72)
+    baseline = None
+    for workers in worker_counts:
+        pool = ScoringPool(MODEL_FILE, workers, batch.shape[1], max_rows_per_worker=batch_rows)
+        try:
+            pool.score(batch)  # warm-up
+            scored = 0
+            start = time.perf_counter()
+            while time.perf_counter() - start < seconds:
+                pool.score(batch)
+                scored += len(batch)
+            pps = scored / (time.perf_counter() - start)
+        finally:
+            pool.close()
+        baseline = baseline or pps
+        print(f"{workers:>7} | {len(batch):>6} | {pps:>12.0f} | {pps / baseline:>7.2f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the IDS inference hot path.")
+    parser.add_argument("--rows", type=int, default=1000, help="sample rows used for parity/batches")
+    parser.add_argument("--repeat", type=int, default=300, help="timed calls per measurement")
+    parser.add_argument("--pool-workers", default="1,2,4",
+                        help="comma-separated worker counts for the pool throughput test ('' to skip)")
+    parser.add_argument("--pool-seconds", type=float, default=5.0, help="duration of each throughput run")
+    parser.add_argument("--pool-batch", type=int, default=512, help="rows per pool.score() call")
+    args = parser.parse_args()
+
+    model = joblib.load(MODEL_FILE)
+    scaler = joblib.load(SCALER_FILE) if os.path.exists(SCALER_FILE) else None
+    with open(FEATURE_FILE, "r", encoding="utf-8") as f:
+        feature_columns = json.load(f)
+    X_raw = load_sample_features(feature_columns, args.rows)
+
+    print("=" * 72)
+    print("Scorer latency: sklearn calibrated model vs native booster fast path")
+    print("=" * 72)
+    bench_scorer(model, scaler, feature_columns, X_raw, args.repeat)
+
+    if os.path.exists(EXPLAIN_MODEL_FILE):
+        print("=" * 72)
+        print("Explanation cost: exact vs approximate contributions")
+        print("=" * 72)
+        bench_explanations(joblib.load(EXPLAIN_MODEL_FILE), model, scaler, X_raw, feature_columns)
+
+    worker_counts = [int(w) for w in args.pool_workers.split(",") if w.strip()]
+    if worker_counts:
+        print("=" * 72)
+        print(f"Scoring pool throughput ({os.cpu_count()} CPUs available)")
+        print("=" * 72)
+        bench_pool_throughput(scaler, X_raw, worker_counts, args.pool_seconds, args.pool_batch)
+
+
+if __name__ == "__main__":
+    main()
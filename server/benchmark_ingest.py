@@ -0,0 +1,168 @@
+"""
+Benchmark the traffic_logs write path: ORM add/commit vs bulk INSERT vs COPY.
+
+Writes synthetic simulator rows into a scratch copy of traffic_logs
+(traffic_logs_ingest_bench, dropped afterwards) on the configured database.
+
+Usage:
+    cd server
+    python benchmark_ingest.py
+    python benchmark_ingest.py --rows 10000,100000,1000000 --methods bulk,copy
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import MetaData, insert
+from sqlalchemy.orm import registry
+
+from bulk_ingest import supports_copy, write_rows
+from database import SessionLocal, TrafficLog, engine
+from snapshots import encode_rows, schema_hash
+
+BENCH_TABLE = "traffic_logs_ingest_bench"
+TEMPLATE_ROWS = 1000
+
+
+class BenchLog:
+    pass
+
+
+bench_table = TrafficLog.__table__.to_metadata(MetaData(), name=BENCH_TABLE)
+registry().map_imperatively(BenchLog, bench_table)
+
+
+def make_templates(feature_count: int = 37, seed: int = 42) -> list:
+    """Rows shaped like the simulator's (packed feature snapshot included); reused cyclically."""
+    rng = random.Random(seed)
+    schema = schema_hash([f"f{j}" for j in range(feature_count)])
+    types = ["Normal Traffic", "DDoS", "PortScan", "Brute Force", "Bots"]
+    start = datetime(2026, 1, 1)
+    rows = []
+    for i in range(TEMPLATE_ROWS):
+        attack = rng.choice(types)
+        rows.append({
+            "timestamp": start + timedelta(milliseconds=i),
+            "src_ip": f"192.168.1.{rng.randint(10, 200)}",
+            "country": rng.choice(["USA", "Germany", "India", "Brazil"]),
+            "lat": rng.uniform(-60, 60),
+            "lon": rng.uniform(-150, 150),
+            "type": attack,
+            "confidence": rng.uniform(0.5, 1.0),
+            "destination_port": rng.randint(1, 65535),
+            "action": "MONITOR" if attack == "Normal Traffic" else "AUTO_BLOCKED",
+            "target_username": None,
+            "burst_score": round(rng.uniform(0, 5), 2),
+            "failed_attempts": rng.randint(0, 50),
+            "traffic_volume": rng.choice(["Low", "Normal", "Medium", "High"]),
+            "login_behavior": rng.choice(["Normal", "Suspicious", "Detected"]),
+            "explanation": None if attack == "Normal Traffic" else "Flow Bytes/s (+0.41), Destination Port (+0.22)",
+            "feature_vector": encode_rows(schema, np.array([[rng.random() * 1e4 for _ in range(feature_count)]]))[0],
+            "model_version": "ids-xgb-benchmark",
+        })
+    return rows
+
+
+def chunks(templates: list, rows: int, batch_rows: int):
+    for start in range(0, rows, batch_rows):
+        yield [templates[i % len(templates)] for i in range(start, min(rows, start + batch_rows))]
+
+
+def run_orm(templates: list, rows: int, batch_rows: int) -> None:
+    """The original per-packet path: one ORM object, one commit."""
+    db = SessionLocal()
+    try:
+        for chunk in chunks(templates, rows, batch_rows):
+            for row in chunk:
+                db.add(BenchLog(**row))
+                db.commit()
+    finally:
+        db.close()
+
+
+def run_bulk(templates: list, rows: int, batch_rows: int) -> None:
+    db = SessionLocal()
+    try:
+        for chunk in chunks(templates, rows, batch_rows):
+            db.execute(insert(bench_table), chunk)
+            db.commit()
+    finally:
+        db.close()
+
+
+def run_copy(templates: list, rows: int, batch_rows: int) -> None:
+    db = SessionLocal()
+    try:
+        for chunk in chunks(templates, rows, batch_rows):
+            write_rows(db, bench_table, chunk, use_copy=True)
+            db.commit()
+    finally:
+        db.close()
+
+
+METHODS = {"orm": run_orm, "bulk": run_bulk, "copy": run_copy}
+
+
+def count_rows() -> int:
+    db = SessionLocal()
+    try:
+        return db.query(BenchLog).count()
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark traffic_logs ingest methods.")
+    parser.add_argument("--rows", default="10000,100000,1000000", help="comma-separated row counts")
+    parser.add_argument("--methods", default="orm,bulk,copy", help="comma-separated subset of orm,bulk,copy")
+    parser.add_argument("--batch-rows", type=int, default=10000, help="rows per transaction for bulk/copy")
+    parser.add_argument("--orm-max-rows", type=int, default=10000,
+                        help="skip the per-row ORM path above this many rows (it commits once per row)")
+    args = parser.parse_args()
+
+    row_counts = [int(r) for r in args.rows.split(",") if r.strip()]
+    methods = [m.strip() for m in args.methods.split(",") if m.strip()]
+    templates = make_templates()
+
+    db = SessionLocal()
+    try:
+        copy_ok = supports_copy(db)
+    finally:
+        db.close()
+    print(f"Database: {engine.url.render_as_string(hide_password=True)} (COPY {'available' if copy_ok else 'unavailable'})")
+
+    print("-" * 72)
+    print(f"{'method':<8} | {'rows':>9} | {'seconds':>9} | {'rows/sec':>10} | {'vs orm':>8}")
+    print("-" * 72)
+    orm_rate = None  # per-row commits cost the same at any size; compare larger runs against it
+    try:
+        for rows in row_counts:
+            for method in methods:
+                if method == "orm" and rows > args.orm_max_rows:
+                    print(f"{method:<8} | {rows:>9} | {'skipped (--orm-max-rows)':>34}")
+                    continue
+                if method == "copy" and not copy_ok:
+                    print(f"{method:<8} | {rows:>9} | {'skipped (needs PostgreSQL + psycopg2)':>34}")
+                    continue
+                bench_table.drop(engine, checkfirst=True)
+                bench_table.create(engine)
+                start = time.perf_counter()
+                METHODS[method](templates, rows, args.batch_rows)
+                elapsed = time.perf_counter() - start
+                written = count_rows()
+                if written != rows:
+                    raise RuntimeError(f"{method} wrote {written} rows, expected {rows}")
+                rate = rows / elapsed
+                if method == "orm":
+                    orm_rate = rate
+                speedup = f"{rate / orm_rate:>7.1f}x" if orm_rate else f"{'-':>8}"
+                print(f"{method:<8} | {rows:>9} | {elapsed:>9.2f} | {rate:>10.0f} | {speedup}")
+    finally:
+        bench_table.drop(engine, checkfirst=True)
+
+
+if __name__ == "__main__":
+    main()
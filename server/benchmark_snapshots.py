@@ -0,0 +1,139 @@
+"""
+Benchmark feature snapshot storage: JSON text vs packed float32 (snapshots.py).
+
+Reports bytes per row, encode time and decode-to-matrix time for each format.
+With --db it also writes both formats into a scratch table
+(feature_snapshot_bench, dropped afterwards) on the configured database and
+reports the stored size per row (after TOAST compression on PostgreSQL) and
+fetch + decode time.
+
+Usage:
+    cd server
+    python benchmark_snapshots.py
+    python benchmark_snapshots.py --rows 10000,100000 --csv large_simulation_log.csv --db
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Column, Integer, LargeBinary, MetaData, Table, Text, func, select
+
+from bulk_ingest import write_rows
+from database import SessionLocal, engine
+from model_artifacts import ModelArtifacts
+from snapshots import SchemaRegistry, decode_matrix, encode_rows, schema_hash
+
+BENCH_TABLE = "feature_snapshot_bench"
+
+bench_table = Table(
+    BENCH_TABLE, MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("feature_snapshot", Text),
+    Column("feature_vector", LargeBinary),
+)
+
+
+def load_rows(csv_path: str, rows: int, seed: int = 42):
+    """(feature columns, raw float32 rows): real flows from `csv_path`, or synthetic ones shaped like them."""
+    bundle = ModelArtifacts.load(use_fast_scorer=False)
+    columns = bundle.feature_columns
+    if csv_path:
+        frame = bundle.build_feature_frame(pd.read_csv(csv_path, nrows=rows))
+        raw = frame.to_numpy(dtype=np.float32)
+        return columns, raw[np.arange(rows) % len(raw)]
+    rng = np.random.default_rng(seed)
+    raw = rng.lognormal(mean=6.0, sigma=3.0, size=(rows, len(columns))).astype(np.float32)
+    counts = rng.random(len(columns)) < 0.5  # packet/byte counts are whole numbers
+    raw[:, counts] = np.round(raw[:, counts])
+    return columns, raw
+
+
+def encode_json(columns: list, raw: np.ndarray) -> list:
+    """The old write path: one json.dumps of a {feature: value} dict per row."""
+    return [json.dumps(dict(zip(columns, row))) for row in raw.tolist()]
+
+
+def decode_json(columns: list, texts: list) -> np.ndarray:
+    """The old read path (drift monitor): json.loads per row, then a DataFrame."""
+    frame = pd.DataFrame([json.loads(t) for t in texts])
+    return frame.reindex(columns=columns, fill_value=0.0).to_numpy(dtype=np.float32)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def bench_db(columns: list, texts: list, blobs: list, registry: SchemaRegistry) -> dict:
+    bench_table.drop(engine, checkfirst=True)
+    bench_table.create(engine)
+    db = SessionLocal()
+    try:
+        for start in range(0, len(texts), 10_000):
+            write_rows(db, bench_table, [
+                {"feature_snapshot": t, "feature_vector": b}
+                for t, b in zip(texts[start:start + 10_000], blobs[start:start + 10_000])
+            ])
+        db.commit()
+        size = func.pg_column_size if engine.dialect.name == "postgresql" else func.length
+        json_bytes, packed_bytes = db.execute(select(
+            func.avg(size(bench_table.c.feature_snapshot)), func.avg(size(bench_table.c.feature_vector))
+        )).one()
+        start = time.perf_counter()
+        decode_json(columns, db.execute(select(bench_table.c.feature_snapshot)).scalars().all())
+        json_read = time.perf_counter() - start
+        start = time.perf_counter()
+        decode_matrix(db.execute(select(bench_table.c.feature_vector)).scalars().all(), columns, registry)
+        packed_read = time.perf_counter() - start
+    finally:
+        db.close()
+        bench_table.drop(engine, checkfirst=True)
+    return {"json_bytes": float(json_bytes), "packed_bytes": float(packed_bytes),
+            "json_read": json_read, "packed_read": packed_read}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark JSON vs packed feature snapshots.")
+    parser.add_argument("--rows", default="10000,100000", help="comma-separated row counts")
+    parser.add_argument("--csv", default="", help="flow CSV to take real feature values from (default: synthetic)")
+    parser.add_argument("--db", action="store_true", help="also measure stored size and fetch+decode on the database")
+    args = parser.parse_args()
+
+    row_counts = [int(r) for r in args.rows.split(",") if r.strip()]
+    columns, all_raw = load_rows(args.csv, max(row_counts))
+    schema = schema_hash(columns)
+    registry = SchemaRegistry()
+    registry.register(schema, columns)
+    print(f"{len(columns)} features, values from {args.csv or 'synthetic lognormal rows'}")
+
+    print("-" * 92)
+    print(f"{'rows':>8} | {'format':<7} | {'bytes/row':>9} | {'encode s':>9} | {'decode s':>9} | "
+          f"{'stored B/row':>12} | {'fetch+decode s':>14}")
+    print("-" * 92)
+    for rows in row_counts:
+        raw = all_raw[:rows]
+        texts, json_encode = timed(encode_json, columns, raw)
+        blobs, packed_encode = timed(encode_rows, schema, raw)
+        json_matrix, json_decode = timed(decode_json, columns, texts)
+        packed_matrix, packed_decode = timed(decode_matrix, blobs, columns, registry)
+        if not np.array_equal(json_matrix, packed_matrix):
+            raise RuntimeError("JSON and packed snapshots decoded to different matrices")
+        stored = bench_db(columns, texts, blobs, registry) if args.db else None
+        for name, size, enc, dec in (
+            ("json", np.mean([len(t.encode("utf-8")) for t in texts]), json_encode, json_decode),
+            ("packed", len(blobs[0]), packed_encode, packed_decode),
+        ):
+            db_cols = f"{'-':>12} | {'-':>14}"
+            if stored:
+                db_cols = f"{stored[name + '_bytes']:>12.0f} | {stored[name + '_read']:>14.3f}"
+            print(f"{rows:>8} | {name:<7} | {size:>9.0f} | {enc:>9.3f} | {dec:>9.3f} | {db_cols}")
+        print(f"{'':>8} | speedup: encode {json_encode / packed_encode:.1f}x, decode {json_decode / packed_decode:.1f}x, "
+              f"size {np.mean([len(t) for t in texts]) / len(blobs[0]):.1f}x smaller")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Bulk row writer for the high-volume tables (traffic_logs and friends).
+
+On PostgreSQL with psycopg2, rows are streamed through
+`COPY <table> (<columns>) FROM STDIN WITH (FORMAT csv)` on the session's own
+connection, so they join the surrounding transaction and skip per-row INSERT
+parsing/planning. CSV is used rather than COPY's binary format: it needs no
+per-type binary encoders (bytea travels as \\x hex text) and NULL vs empty string stays unambiguous (NULL is an
+unquoted empty field, strings are always quoted). Every other backend/driver
+falls back to one executemany INSERT.
+"""
+
+from __future__ import annotations
+
+import io
+from datetime import date, datetime
+from typing import List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from db_capabilities import capabilities
+
+COPY_BATCH_BYTES = 8 << 20
+
+
+def supports_copy(session: Session) -> bool:
+    return capabilities(session.get_bind()).copy
+
+
+def _csv_field(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (int, float)):
+        return repr(value) if value == value else '"NaN"'
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    text = str(value)
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _quote_text(value) -> str:
+    if value is None:
+        return ""
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def _bytea_field(value) -> str:
+    if value is None:
+        return ""
+    return "\\x" + bytes(value).hex()
+
+
+def _column_encoder(column):
+    """Per-column CSV encoder, picked once from the column type (falls back to _csv_field)."""
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return _csv_field
+    if python_type is str:
+        return _quote_text
+    if python_type is bytes:
+        return _bytea_field
+    return _csv_field
+
+
+def _copy(session: Session, table, columns: List[str], rows: List[dict]) -> None:
+    dbapi_conn = session.connection().connection.dbapi_connection
+    sql = f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    encoders = [(name, _column_encoder(table.c[name])) for name in columns]
+    buf = io.StringIO()
+    with dbapi_conn.cursor() as cur:
+        for row in rows:
+            buf.write(",".join([encode(row.get(name)) for name, encode in encoders]))
+            buf.write("\n")
+            if buf.tell() >= COPY_BATCH_BYTES:
+                buf.seek(0)
+                cur.copy_expert(sql, buf)
+                buf = io.StringIO()
+        if buf.tell():
+            buf.seek(0)
+            cur.copy_expert(sql, buf)
+
+
+def write_rows(session: Session, model, rows: List[dict], use_copy: Optional[bool] = None) -> str:
+    """Insert plain row dicts for `model` (mapped class or Table) in the session's transaction.
+
+    Returns the method used: "copy", "executemany" or "none" (no rows).
+    """
+    if not rows:
+        return "none"
+    if use_copy is None:
+        use_copy = supports_copy(session)
+    if not use_copy:
+        session.execute(insert(model), rows)
+        return "executemany"
+    table = getattr(model, "__table__", model)
+    # Column defaults are applied by SQLAlchemy, not by the table, so fill them in for COPY.
+    columns = [c.name for c in table.columns if not c.primary_key]
+    defaults = {
+        c.name: c.default.arg for c in table.columns
+        if c.default is not None and c.default.is_scalar
+    }
+    callables = {
+        c.name: c.default.arg for c in table.columns
+        if c.default is not None and c.default.is_callable
+    }
+    if defaults or callables:
+        filled = []
+        for row in rows:
+            missing = {name: value for name, value in defaults.items() if name not in row}
+            missing.update({name: fn(None) for name, fn in callables.items() if name not in row})
+            filled.append({**row, **missing} if missing else row)
+        rows = filled
+    _copy(session, table, columns, rows)
+    return "copy"
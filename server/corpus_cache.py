@@ -0,0 +1,165 @@
+"""
+Columnar binary cache for the replay / training CSV.
+
+The first load streams the CSV in chunks and writes one raw binary file per
+column next to it (`<csv>.cache/`): numeric columns as float32, text columns
+(e.g. Attack Type) as int32 category codes. Column names are stripped once.
+Later loads memory-map those files, so startup skips CSV parsing and pages
+are shared with the OS cache instead of copied into float64 frames.
+
+The cache is rebuilt when the CSV size, mtime or content fingerprint (hash of
+the first and last MB) changes. Set CORPUS_CACHE=false to read the CSV directly.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+CACHE_FORMAT_VERSION = 1
+_FINGERPRINT_BYTES = 1 << 20
+
+
+def cache_enabled() -> bool:
+    return os.getenv("CORPUS_CACHE", "true").strip().lower() == "true"
+
+
+def default_cache_dir(csv_path: str) -> str:
+    return f"{csv_path}.cache"
+
+
+def _source_signature(csv_path: str) -> dict:
+    st = os.stat(csv_path)
+    digest = hashlib.blake2b(digest_size=16)
+    with open(csv_path, "rb") as f:
+        digest.update(f.read(_FINGERPRINT_BYTES))
+        if st.st_size > _FINGERPRINT_BYTES:
+            f.seek(max(_FINGERPRINT_BYTES, st.st_size - _FINGERPRINT_BYTES))
+            digest.update(f.read(_FINGERPRINT_BYTES))
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "fingerprint": digest.hexdigest()}
+
+
+def _read_meta(cache_dir: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(cache_dir, "meta.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_cache_valid(csv_path: str, cache_dir: Optional[str] = None) -> bool:
+    meta = _read_meta(cache_dir or default_cache_dir(csv_path))
+    if not meta or meta.get("format_version") != CACHE_FORMAT_VERSION:
+        return False
+    source = meta.get("source", {})
+    st = os.stat(csv_path)
+    if source.get("size") != st.st_size:
+        return False
+    if source.get("mtime_ns") == st.st_mtime_ns:
+        return True
+    # Touched but possibly unchanged (copied / checked out again): compare content.
+    return source.get("fingerprint") == _source_signature(csv_path)["fingerprint"]
+
+
+def build_cache(csv_path: str, cache_dir: Optional[str] = None, chunk_rows: int = 200_000) -> dict:
+    """Stream the CSV into per-column binary files; returns the cache metadata."""
+    cache_dir = cache_dir or default_cache_dir(csv_path)
+    tmp_dir = f"{cache_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    started = time.time()
+    signature = _source_signature(csv_path)
+
+    columns: List[dict] = []
+    handles = []
+    categories: List[dict] = []
+    rows = 0
+    try:
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_rows, low_memory=False):
+            chunk.columns = chunk.columns.str.strip()
+            if not columns:
+                for i, name in enumerate(chunk.columns):
+                    kind = "float32" if pd.api.types.is_numeric_dtype(chunk[name]) else "category"
+                    columns.append({"name": name, "file": f"col_{i:03d}.bin", "kind": kind})
+                    handles.append(open(os.path.join(tmp_dir, columns[-1]["file"]), "wb"))
+                    categories.append({})
+            for col, fh, cats in zip(columns, handles, categories):
+                values = chunk[col["name"]]
+                if col["kind"] == "float32":
+                    if not pd.api.types.is_numeric_dtype(values):
+                        values = pd.to_numeric(values, errors="coerce")
+                    fh.write(values.to_numpy(dtype=np.float32).tobytes())
+                else:
+                    text = values.astype(str)
+                    for value in text.unique():
+                        cats.setdefault(value, len(cats))
+                    fh.write(text.map(cats).to_numpy(dtype=np.int32).tobytes())
+            rows += len(chunk)
+    finally:
+        for fh in handles:
+            fh.close()
+
+    for col, cats in zip(columns, categories):
+        if col["kind"] == "category":
+            col["categories"] = list(cats)
+    meta = {
+        "format_version": CACHE_FORMAT_VERSION,
+        "rows": rows,
+        "columns": columns,
+        "source": {"path": os.path.abspath(csv_path), **signature},
+        "build_seconds": round(time.time() - started, 2),
+    }
+    with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.replace(tmp_dir, cache_dir)
+    print(f"Built corpus cache {cache_dir}: {rows} rows x {len(columns)} columns in {meta['build_seconds']}s")
+    return meta
+
+
+def load_cached_frame(cache_dir: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Memory-mapped DataFrame over the cache (read-only float32 columns, categorical text)."""
+    meta = _read_meta(cache_dir)
+    if meta is None:
+        raise FileNotFoundError(f"No corpus cache in {cache_dir}")
+    wanted = set(columns) if columns is not None else None
+    data = {}
+    for col in meta["columns"]:
+        if wanted is not None and col["name"] not in wanted:
+            continue
+        dtype = np.float32 if col["kind"] == "float32" else np.int32
+        if meta["rows"]:
+            values = np.memmap(os.path.join(cache_dir, col["file"]), dtype=dtype, mode="r", shape=(meta["rows"],))
+        else:
+            values = np.empty(0, dtype=dtype)  # an empty file cannot be memory-mapped
+        if col["kind"] == "category":
+            values = pd.Categorical.from_codes(values, col["categories"])
+        data[col["name"]] = values
+    return pd.DataFrame(data, copy=False)
+
+
+def load_corpus(csv_path: str, columns: Optional[List[str]] = None, cache_dir: Optional[str] = None) -> pd.DataFrame:
+    """Load the corpus CSV through the columnar cache, (re)building it when stale."""
+    if not cache_enabled():
+        df = pd.read_csv(csv_path)
+        df.columns = df.columns.str.strip()
+        return df[columns] if columns is not None else df
+
+    cache_dir = cache_dir or default_cache_dir(csv_path)
+    if not is_cache_valid(csv_path, cache_dir):
+        try:
+            build_cache(csv_path, cache_dir)
+        except OSError as e:
+            print(f"Corpus cache unavailable ({e}); reading {csv_path} directly.")
+            df = pd.read_csv(csv_path)
+            df.columns = df.columns.str.strip()
+            return df[columns] if columns is not None else df
+    return load_cached_frame(cache_dir, columns)
@@ -0,0 +1,37 @@
+"""
+What the configured database backend can do.
+
+The storage layer runs on PostgreSQL (production) or SQLite in WAL mode
+(single node, edge sensors, CI and benchmark runs; see database.py). The
+backend-specific fast paths ask capabilities() instead of testing dialect
+names inline, and fall back to portable SQL when a feature is missing.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from typing import NamedTuple
+
+
+class Capabilities(NamedTuple):
+    copy: bool             # COPY ... FROM STDIN bulk loads (bulk_ingest)
+    partitioning: bool     # declarative range partitions (partitioning)
+    partial_indexes: bool  # CREATE INDEX ... WHERE (migrations)
+    advisory_locks: bool   # pg_advisory_lock around migrations
+    async_commit: bool     # SET LOCAL synchronous_commit = off (relaxed write durability)
+
+
+def capabilities(bind) -> Capabilities:
+    """Capabilities of an Engine or Connection (Session.get_bind() works too)."""
+    dialect = bind.dialect
+    postgres = dialect.name == "postgresql"
+    sqlite = dialect.name == "sqlite"
+    # server_version_info is only known after the first connection; assume a current server until then.
+    pg_version = getattr(dialect, "server_version_info", None) or (16,)
+    return Capabilities(
+        copy=postgres and dialect.driver == "psycopg2",
+        partitioning=postgres and pg_version >= (11,),
+        partial_indexes=postgres or (sqlite and sqlite3.sqlite_version_info >= (3, 8, 0)),
+        advisory_locks=postgres,
+        async_commit=postgres,
+    )
@@ -0,0 +1,59 @@
+"""
+Batched tree-contribution explanations.
+
+One booster call covers the whole batch, either exact TreeSHAP
+(pred_contribs) or the much cheaper Saabas-style approximation
+(approx_contribs). Top-k contributors are selected for every row at once
+with array operations.
+"""
+
+from typing import List, Sequence
+
+import numpy as np
+
+EXPLANATION_MODES = ("exact", "approx")
+
+
+def contribution_matrix(booster, features: np.ndarray, class_idx: Sequence[int],
+                        feature_names: List[str], approximate: bool = False) -> np.ndarray:
+    """Per-row feature contributions (bias column dropped) toward each row's class."""
+    from xgboost import DMatrix  # deferred: importing xgboost is slow and only needed once a model is loaded
+
+    features = np.atleast_2d(features)
+    contrib = np.asarray(booster.predict(
+        DMatrix(features, feature_names=feature_names),
+        pred_contribs=True,
+        approx_contribs=approximate,
+    ))
+    if contrib.ndim == 3:
+        rows = np.arange(contrib.shape[0])
+        cls = np.clip(np.asarray(class_idx, dtype=int), 0, contrib.shape[1] - 1)
+        return contrib[rows, cls, :-1]
+    return contrib[:, :-1]
+
+
+def top_k_indices(values: np.ndarray, k: int) -> np.ndarray:
+    """Column indices of the k largest |values| per row, largest first."""
+    magnitude = np.abs(values)
+    k = max(1, min(k, magnitude.shape[1]))
+    if k < magnitude.shape[1]:
+        idx = np.argpartition(-magnitude, k - 1, axis=1)[:, :k]
+    else:
+        idx = np.tile(np.arange(k), (magnitude.shape[0], 1))
+    order = np.argsort(-np.take_along_axis(magnitude, idx, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(idx, order, axis=1)
+
+
+def format_top_contributors(contrib: np.ndarray, feature_names: List[str], top_k: int = 3) -> List[str]:
+    idx = top_k_indices(contrib, top_k)
+    vals = np.take_along_axis(contrib, idx, axis=1)
+    return [
+        "Top contributors: " + ", ".join(f"{feature_names[i]} ({v:+.3f})" for i, v in zip(row_idx, row_vals))
+        for row_idx, row_vals in zip(idx.tolist(), vals.tolist())
+    ]
+
+
+def format_top_features(features: np.ndarray, feature_names: List[str], top_k: int = 3) -> List[str]:
+    """Fallback when no booster is available: largest-magnitude model inputs."""
+    idx = top_k_indices(np.atleast_2d(features), top_k)
+    return [f"Top contributing features: {', '.join(feature_names[i] for i in row)}" for row in idx.tolist()]
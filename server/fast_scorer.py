@@ -0,0 +1,95 @@
+"""
+Lightweight scorer for the served CalibratedClassifierCV(XGBClassifier) model.
+
+Calls the booster directly on NumPy arrays (inplace_predict) and applies the
+fitted sigmoid calibration for all classes in one vectorized step, skipping
+sklearn input validation, DataFrame conversion and the per-class loop.
+Probabilities match CalibratedClassifierCV.predict_proba.
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+from scipy.special import expit
+
+SCORING_MODES = ("full", "cascade")
+
+
+class FastScorer:
+    def __init__(self, calibrated_model):
+        self.classes_ = np.asarray(calibrated_model.classes_)
+        self.n_classes = len(self.classes_)
+        self._members = []
+        for calibrated in calibrated_model.calibrated_classifiers_:
+            estimator = calibrated.estimator
+            try:
+                iteration_range = (0, estimator.best_iteration + 1)
+            except AttributeError:
+                iteration_range = (0, 0)
+            # Column k of the booster output belongs to class estimator.classes_[k].
+            columns = np.searchsorted(self.classes_, np.asarray(estimator.classes_))
+            a = np.array([c.a_ for c in calibrated.calibrators], dtype=np.float64)
+            b = np.array([c.b_ for c in calibrated.calibrators], dtype=np.float64)
+            self._members.append((estimator.get_booster(), iteration_range, columns, a, b))
+
+    @classmethod
+    def from_model(cls, model) -> Optional["FastScorer"]:
+        """Build a scorer when the model is a multi-class sigmoid-calibrated XGBoost, else None."""
+        calibrated_list = getattr(model, "calibrated_classifiers_", None)
+        if not calibrated_list or getattr(model, "method", None) != "sigmoid":
+            return None
+        if len(getattr(model, "classes_", [])) <= 2:
+            return None
+        for calibrated in calibrated_list:
+            estimator = calibrated.estimator
+            if not hasattr(estimator, "get_booster") or getattr(estimator, "objective", None) != "multi:softprob":
+                return None
+        return cls(model)
+
+    def set_threads(self, n: int) -> None:
+        """Limit every member booster to `n` threads."""
+        for booster, *_ in self._members:
+            booster.set_param({"nthread": int(n)})
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        mean_proba = np.zeros((X.shape[0], self.n_classes))
+        for booster, iteration_range, columns, a, b in self._members:
+            raw = booster.inplace_predict(
+                X, iteration_range=iteration_range, predict_type="value", validate_features=False
+            ).reshape(X.shape[0], -1)
+            proba = np.zeros((X.shape[0], self.n_classes))
+            proba[:, columns] = expit(-(raw * a + b))
+
+            denominator = proba.sum(axis=1, keepdims=True)
+            uniform_proba = np.full_like(proba, 1 / self.n_classes)
+            proba = np.divide(proba, denominator, out=uniform_proba, where=denominator != 0)
+            proba[(1.0 < proba) & (proba <= 1.0 + 1e-5)] = 1.0
+            mean_proba += proba
+        return mean_proba / len(self._members)
+
+
+class Prefilter:
+    """Stage-one cascade model: P(normal) from a few shallow trees, scored straight on the booster."""
+
+    def __init__(self, model, cutoff: float, normal_idx: int):
+        self.booster = model.get_booster()
+        self.cutoff = float(cutoff)
+        self.normal_idx = int(normal_idx)
+
+    def normal_probability(self, X: np.ndarray) -> np.ndarray:
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        return np.asarray(
+            self.booster.inplace_predict(X, predict_type="value", validate_features=False)
+        ).reshape(-1)
+
+    def confidently_normal(self, X: np.ndarray):
+        """(mask of rows that can skip the full model, their P(normal))."""
+        p_normal = self.normal_probability(X)
+        return p_normal > self.cutoff, p_normal
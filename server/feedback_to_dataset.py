@@ -6,14 +6,37 @@ Input:
 
 Output:
   feedback_training_rows.csv
+
+feature_snapshot holds either a packed snapshot in base64 (current server, see
+snapshots.py) or a JSON dict (older rows). Packed rows are decoded per feature
+schema in one vectorized call; schemas other than the local
+feature_columns.json are looked up in the feature_schemas table.
 """
 
+import base64
 import json
 import os
+from collections import defaultdict
+
 import pandas as pd
+from sqlalchemy.exc import SQLAlchemyError
+
+from snapshots import SchemaRegistry, blob_schema, decode_matrix, schema_hash
 
 FEEDBACK_FILE = "training_feedback.csv"
 OUT_FILE = "feedback_training_rows.csv"
+FEATURE_FILE = "feature_columns.json"
+
+
+def _schema_registry() -> SchemaRegistry:
+    from database import engine
+
+    registry = SchemaRegistry(engine)
+    if os.path.exists(FEATURE_FILE):
+        with open(FEATURE_FILE, "r", encoding="utf-8") as f:
+            columns = json.load(f)
+        registry.register(schema_hash(columns), columns)
+    return registry
 
 
 def main() -> None:
@@ -26,21 +49,56 @@ def main() -> None:
         print("Feedback file missing feature_snapshot column.")
         return
 
+    labels = df.get("corrected_type", df.get("predicted_type", pd.Series("Normal Traffic", index=df.index)))
+    versions = df.get("model_version", pd.Series("unknown", index=df.index))
+
+    frames = []
     records = []
-    for _, row in df.iterrows():
+    packed = defaultdict(list)  # feature schema -> [(row position, blob)]
+    for pos, value in enumerate(df["feature_snapshot"]):
+        if not isinstance(value, str) or not value:
+            continue
+        if value.startswith("{"):
+            try:
+                snap = json.loads(value)
+            except Exception:
+                continue
+            snap["Attack Type"] = labels.iloc[pos]
+            snap["model_version"] = versions.iloc[pos]
+            snap["_row"] = pos
+            records.append(snap)
+            continue
         try:
-            snap = json.loads(row["feature_snapshot"]) if isinstance(row["feature_snapshot"], str) else {}
-        except Exception:
+            blob = base64.b64decode(value, validate=True)
+        except ValueError:
             continue
-        snap["Attack Type"] = row.get("corrected_type", row.get("predicted_type", "Normal Traffic"))
-        snap["model_version"] = row.get("model_version", "unknown")
-        records.append(snap)
+        packed[blob_schema(blob)].append((pos, blob))
+
+    if packed:
+        registry = _schema_registry()
+        for schema, items in packed.items():
+            try:
+                columns = registry.columns(schema)
+            except SQLAlchemyError as e:
+                print(f"Feature schema {schema} lookup failed: {e}")
+                columns = None
+            if columns is None:
+                print(f"Skipping {len(items)} rows with unknown feature schema {schema}.")
+                continue
+            positions = [pos for pos, _ in items]
+            frame = pd.DataFrame(decode_matrix([blob for _, blob in items], columns, registry), columns=columns)
+            frame["Attack Type"] = labels.iloc[positions].to_numpy()
+            frame["model_version"] = versions.iloc[positions].to_numpy()
+            frame["_row"] = positions
+            frames.append(frame)
+    if records:
+        frames.append(pd.DataFrame(records))
 
-    if not records:
+    if not frames:
         print("No valid feedback snapshots to export.")
         return
 
-    out = pd.DataFrame(records)
+    out = pd.concat(frames, ignore_index=True).sort_values("_row", kind="stable").drop(columns="_row")
     out.to_csv(OUT_FILE, index=False)
     print(f"Saved {len(out)} feedback rows to {OUT_FILE}")
 
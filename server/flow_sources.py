@@ -0,0 +1,288 @@
+"""
+Live flow sources for the ingestion pipeline.
+
+Both sources deliver CICFlowMeter-style CSV records one line each, in
+bounded batches, so the scoring path sees the same columns as the replay CSV:
+  CsvTailSource    - follows a growing CSV file from a byte offset; partial
+                     trailing lines wait for the next read, truncation or
+                     rotation reopens the file from the start
+  SocketFlowSource - listens on a local UDP or TCP port for newline-delimited
+                     records; the first line of a TCP connection or of a
+                     datagram may be a header (mostly known column names)
+                     that sets the column order for that connection / peer
+Nothing is re-read, and at most one read chunk / `max_buffered_lines` records
+are held in memory; records arriving faster than that (or TCP lines longer
+than MAX_LINE_BYTES) are dropped and counted.
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import socket
+import threading
+from collections import deque
+from typing import List, NamedTuple, Optional
+
+import pandas as pd
+
+FLOW_SOURCE_KINDS = ("replay", "csv_tail", "udp", "tcp")
+MAX_LINE_BYTES = 1 << 20  # a TCP peer that sends this much without a newline is disconnected
+MAX_UDP_PEERS = 4096  # per-sender headers remembered for UDP
+
+
+class FlowBatch(NamedTuple):
+    header: List[str]
+    lines: List[str]
+
+
+def parse_header(line: str) -> List[str]:
+    return [c.strip() for c in line.strip().split(",")]
+
+
+def _looks_like_header(line: str, known_columns) -> bool:
+    """A header names mostly known columns; records such as CICFlowMeter's start with text fields too."""
+    fields = parse_header(line)
+    return sum(field in known_columns for field in fields) * 2 >= len(fields)
+
+
+def parse_flow_lines(batch: FlowBatch) -> pd.DataFrame:
+    """Parse one batch of CSV record lines; non-numeric cells in numeric columns become NaN."""
+    if not batch.lines:
+        return pd.DataFrame(columns=batch.header)
+    df = pd.read_csv(
+        io.StringIO("\n".join(batch.lines)),
+        header=None,
+        names=batch.header,
+        skipinitialspace=True,
+        on_bad_lines="skip",
+        engine="c",
+    )
+    for name in df.columns[df.dtypes == object]:
+        if name not in ("Label", "Attack Type", "Source IP", "Destination IP", "Timestamp", "Flow ID"):
+            df[name] = pd.to_numeric(df[name], errors="coerce")
+    return df
+
+
+class CsvTailSource:
+    def __init__(self, path: str, from_start: bool = True, chunk_bytes: int = 1 << 20):
+        self.path = path
+        self.from_start = from_start
+        self.chunk_bytes = chunk_bytes
+        self.header: Optional[List[str]] = None
+        self.offset = 0
+        self.records_read = 0
+        self.reopens = 0
+        self._fh = None
+        self._inode = None
+        self._partial = b""
+        self._ready = deque()
+
+    def _open(self, from_start: bool) -> bool:
+        if not os.path.exists(self.path):
+            return False
+        fh = open(self.path, "rb")
+        header_line = fh.readline()
+        if not header_line.endswith(b"\n"):
+            fh.close()  # header not fully written yet
+            return False
+        self.header = parse_header(header_line.decode("utf-8", errors="replace"))
+        if not from_start:
+            fh.seek(0, os.SEEK_END)
+        self._fh = fh
+        self._inode = os.fstat(fh.fileno()).st_ino
+        self.offset = fh.tell()
+        self._partial = b""
+        self._ready.clear()
+        return True
+
+    def _check_rotation(self) -> None:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return  # keep draining the old handle until a new file appears
+        if st.st_ino != self._inode or st.st_size < self.offset:
+            self.close()
+            self.reopens += 1
+            self._open(from_start=True)
+
+    def read_lines(self, max_lines: int) -> List[str]:
+        if self._fh is None and not self._open(self.from_start):
+            return []
+        self._check_rotation()
+        if self._fh is None:
+            return []
+        while len(self._ready) < max_lines:
+            chunk = self._fh.read(self.chunk_bytes)
+            if not chunk:
+                break
+            self.offset += len(chunk)
+            parts = (self._partial + chunk).split(b"\n")
+            self._partial = parts.pop()  # incomplete last line: finish it on a later read
+            self._ready.extend(p.decode("utf-8", errors="replace") for p in parts if p.strip())
+        n = min(max_lines, len(self._ready))
+        lines = [self._ready.popleft() for _ in range(n)]
+        self.records_read += n
+        return lines
+
+    def read_batch(self, max_lines: int, header: Optional[List[str]] = None) -> Optional[FlowBatch]:
+        """Up to `max_lines` records; with `header`, only if they share it (to extend a batch)."""
+        if header is not None and self.header != header:
+            return None
+        lines = self.read_lines(max_lines)
+        return FlowBatch(self.header, lines) if lines else None
+
+    def status(self) -> dict:
+        return {
+            "kind": "csv_tail",
+            "path": self.path,
+            "offset_bytes": self.offset,
+            "records_read": self.records_read,
+            "buffered_records": len(self._ready),
+            "reopens": self.reopens,
+        }
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+
+class SocketFlowSource:
+    def __init__(self, protocol: str, host: str, port: int, header: List[str],
+                 max_buffered_lines: int = 200_000):
+        if protocol not in ("udp", "tcp"):
+            raise ValueError(f"Unsupported protocol: {protocol}")
+        self.protocol = protocol
+        self.host = host
+        self.port = port
+        self.header = list(header)  # default column order; a stream's own header line overrides it
+        self._known_columns = set(self.header)
+        self._udp_headers = {}
+        self.max_buffered_lines = max_buffered_lines
+        self.records_received = 0
+        self.records_dropped = 0
+        self.records_read = 0
+        self._lines = deque()  # (header, record line)
+        self._stop = threading.Event()
+        kind = socket.SOCK_DGRAM if protocol == "udp" else socket.SOCK_STREAM
+        self._sock = socket.socket(socket.AF_INET, kind)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if protocol == "udp":
+            # Datagrams that overflow the kernel buffer are lost silently; give bursts room.
+            self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 << 20)
+        self._sock.bind((host, port))
+        self.port = self._sock.getsockname()[1]  # the one picked by the OS when `port` is 0
+        self._sock.settimeout(0.5)
+        if protocol == "tcp":
+            self._sock.listen()
+        target = self._udp_loop if protocol == "udp" else self._tcp_accept_loop
+        self._thread = threading.Thread(target=target, daemon=True, name=f"flow-{protocol}-{port}")
+        self._thread.start()
+
+    def _push(self, data: bytes, header: List[str], header_allowed: bool) -> List[str]:
+        """Queue the records in `data` under `header`; returns the header for the lines that follow.
+
+        Only the first line (`header_allowed`: start of a connection or datagram) may be a header.
+        """
+        for raw in data.split(b"\n"):
+            line = raw.decode("utf-8", errors="replace").strip()
+            if not line:
+                continue
+            if header_allowed:
+                header_allowed = False
+                if _looks_like_header(line, self._known_columns):
+                    header = parse_header(line)
+                    continue
+            self.records_received += 1
+            if len(self._lines) >= self.max_buffered_lines:
+                self.records_dropped += 1
+                continue
+            self._lines.append((header, line))
+        return header
+
+    def _udp_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                data, peer = self._sock.recvfrom(65535)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            header = self._push(data, self._udp_headers.get(peer, self.header), header_allowed=True)
+            if header is not self.header:
+                if peer not in self._udp_headers and len(self._udp_headers) >= MAX_UDP_PEERS:
+                    self._udp_headers.pop(next(iter(self._udp_headers)))
+                self._udp_headers[peer] = header
+
+    def _tcp_accept_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                conn, _ = self._sock.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            threading.Thread(target=self._tcp_conn_loop, args=(conn,), daemon=True).start()
+
+    def _tcp_conn_loop(self, conn: socket.socket) -> None:
+        conn.settimeout(0.5)
+        partial = b""
+        header = self.header
+        first = True
+        with conn:
+            while not self._stop.is_set():
+                try:
+                    data = conn.recv(1 << 16)
+                except socket.timeout:
+                    continue
+                except OSError:
+                    break
+                if not data:
+                    break
+                data = partial + data
+                cut = data.rfind(b"\n")
+                if cut < 0:
+                    partial = data
+                    if len(partial) > MAX_LINE_BYTES:
+                        self.records_dropped += 1
+                        partial = b""
+                        break
+                    continue
+                partial = data[cut + 1:]
+                header = self._push(data[:cut], header, first)
+                first = False
+            if partial.strip():
+                self._push(partial, header, first)
+
+    def read_batch(self, max_lines: int, header: Optional[List[str]] = None) -> Optional[FlowBatch]:
+        """Up to `max_lines` queued records that share one header (`header`, if given, else the next one's)."""
+        if not self._lines:
+            return None
+        if header is None:
+            header = self._lines[0][0]
+        lines = []
+        while self._lines and len(lines) < max_lines and self._lines[0][0] == header:
+            lines.append(self._lines.popleft()[1])
+        if not lines:
+            return None
+        self.records_read += len(lines)
+        return FlowBatch(header, lines)
+
+    def status(self) -> dict:
+        return {
+            "kind": self.protocol,
+            "listen": f"{self.host}:{self.port}",
+            "records_received": self.records_received,
+            "records_read": self.records_read,
+            "records_dropped": self.records_dropped,
+            "buffered_records": len(self._lines),
+        }
+
+    def close(self) -> None:
+        self._stop.set()
+        try:
+            self._sock.close()
+        except OSError:
+            pass
+        self._thread.join(timeout=2)
@@ -1,5 +1,7 @@
 from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from pydantic import BaseModel
 import pandas as pd
@@ -10,24 +12,39 @@ import random
 import time
 import asyncio
 import numpy as np
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timedelta
 import os
 import secrets
 import base64
 import hmac
 import hashlib
 import threading
+import atexit
+import tempfile
 from typing import Optional
-from xgboost import DMatrix
-from collections import deque
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from corpus_cache import load_corpus
+from fast_scorer import SCORING_MODES
+from model_artifacts import FEATURE_FILE, MODEL_METADATA_FILE, ModelArtifacts
+from scoring_pool import ScoringPool, ScoringPoolDead
+from pipeline import Stage, StagedPipeline
+from replay import REPLAY_PROFILES, ReplayScheduler
+from flow_sources import FLOW_SOURCE_KINDS, CsvTailSource, FlowBatch, SocketFlowSource, parse_flow_lines
+from shadow import ShadowEvaluator
+from prediction_cache import PredictionCache, scoring_scope
+from write_buffer import WRITE_DURABILITY_MODES, WriteBuffer
+from bulk_ingest import write_rows
+from db_capabilities import capabilities
+from pending_queue import pending_queue
+from overview_metrics import RollingOverview
+from partitioning import PartitionManager
+from migrations import drop_schema
+from snapshots import SchemaRegistry, decode_matrix, encode_rows
+from explanations import EXPLANATION_MODES, contribution_matrix, format_top_contributors, format_top_features
 
 # --- CONFIGURATION ---
-MODEL_FILE = 'multiclass_xgboost_ids.joblib'
-EXPLAIN_MODEL_FILE = 'xgboost_explainer.joblib'
-LABEL_ENCODER_FILE = 'label_encoder.joblib'
-FEATURE_FILE = 'feature_columns.json'
-MODEL_METADATA_FILE = 'model_metadata.json'
-FEATURE_BASELINE_FILE = 'feature_baseline.json'
 TRAINING_FEEDBACK_FILE = 'training_feedback.csv'
 CONFIG_STATE_FILE = 'config_state.json'
 SIMULATED_FILE = 'large_simulation_log.csv'
@@ -40,12 +57,11 @@ COUNTRY_COORDS = {
     "North Korea": [40.3399, 127.5101], "Unknown": [0, 0]
 }
 
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, undefer
 from fastapi import Depends
-from database import get_db, TrafficLog, AutoBlocked, ManualReview, init_db
-
-# Initialize DB on startup
-init_db()
+from database import async_engine, get_async_db, get_db, TrafficLog, AutoBlocked, ManualReview, init_db
 
 # --- GLOBAL STATE (Configuration Only) ---
 class SystemState:
@@ -69,7 +85,28 @@ class SystemState:
             "pending_auto_resolve_queue_trigger": 18,
             "pending_auto_resolve_delta": 0.03,
             "target_automation_min": 70.0,
-            "target_automation_max": 90.0
+            "target_automation_max": 90.0,
+            "inference_batch_size": 32,          # Max packets scored per model call
+            "inference_batch_max_wait_ms": 250.0, # Max time to hold a partial batch
+            "eager_explanations": False,         # True = explain every packet, not just ManualReview
+            "explanation_mode": "exact",         # "exact" TreeSHAP or "approx" Saabas contributions
+            "scoring_workers": 0,                # >0 = score in a process pool via shared memory
+            "scoring_mode": "full",              # "full" or "cascade" (prefilter skips confidently normal rows)
+            "prediction_cache_enabled": True,    # memoize scores/explanations of repeated feature vectors
+            "write_buffer_rows": 500,            # group commit: flush after this many packets...
+            "write_buffer_max_wait_ms": 200.0,   # ...or once the oldest buffered packet is this old
+            "write_durability": "buffered",      # "immediate", "buffered" or "relaxed" (see write_buffer.py)
+            "replay_target_pps": 0.0,            # 0 = derive from simulation_speed (1 / speed)
+            "replay_profile": "constant",        # "constant", "burst" or "diurnal"
+            "replay_burst_multiplier": 5.0,
+            "replay_burst_seconds": 10.0,
+            "replay_burst_period_seconds": 60.0,
+            "replay_diurnal_period_seconds": 86400.0,
+            "replay_diurnal_amplitude": 0.5,
+            "ingest_source": "replay",           # "replay", "csv_tail", "udp" or "tcp"
+            "ingest_csv_path": "live_flows.csv",
+            "ingest_socket_host": "127.0.0.1",
+            "ingest_socket_port": 9555
         }
         self._load_persisted_config()
         self.recent_threat_actions = deque(maxlen=400)
@@ -95,65 +132,69 @@ class SystemState:
 
 state = SystemState()
 
-# --- LOAD ASSETS ---
-print("Loading AI Models...")
-model = joblib.load(MODEL_FILE)
-explain_model = joblib.load(EXPLAIN_MODEL_FILE) if os.path.exists(EXPLAIN_MODEL_FILE) else model
-label_encoder = joblib.load(LABEL_ENCODER_FILE)
-scaler = joblib.load('scaler.joblib') if os.path.exists('scaler.joblib') else None
-with open(FEATURE_FILE, 'r') as f:
-    feature_columns = json.load(f)
-model_metadata = {}
-feature_baseline = {}
-if os.path.exists(MODEL_METADATA_FILE):
-    with open(MODEL_METADATA_FILE, 'r', encoding='utf-8') as f:
-        model_metadata = json.load(f)
-if os.path.exists(FEATURE_BASELINE_FILE):
-    with open(FEATURE_BASELINE_FILE, 'r', encoding='utf-8') as f:
-        feature_baseline = json.load(f)
-model_version = model_metadata.get("version", "unknown")
-
-
-def _add_engineered_features(row: pd.Series) -> dict:
-    """Create raw + engineered feature values from one traffic row."""
-    values = row.to_dict()
-    eps = 1e-6
-    values["feat_bytes_per_packet"] = float(values.get("Flow Bytes/s", 0.0)) / (float(values.get("Flow Packets/s", 0.0)) + eps)
-    values["feat_fwd_bwd_rate_ratio"] = float(values.get("Fwd Packets/s", 0.0)) / (float(values.get("Bwd Packets/s", 0.0)) + eps)
-    values["feat_flow_iat_range"] = float(values.get("Flow IAT Max", 0.0)) - float(values.get("Flow IAT Min", 0.0))
-    values["feat_packet_len_range"] = float(values.get("Max Packet Length", 0.0)) - float(values.get("Min Packet Length", 0.0))
-    values["feat_packet_length_cv"] = float(values.get("Packet Length Std", 0.0)) / (float(values.get("Packet Length Mean", 0.0)) + eps)
-    return values
-
-
-def _build_feature_frame(row: pd.Series) -> pd.DataFrame:
-    values = _add_engineered_features(row)
-    ordered = {col: values.get(col, 0.0) for col in feature_columns}
-    return pd.DataFrame([ordered], columns=feature_columns)
-
-
-def _generate_explanation(features_scaled: pd.DataFrame, pred_numeric: int) -> str:
-    """Generate tree contribution explanation using pred_contribs when possible."""
+# --- MODEL ASSETS ---
+# The current ModelArtifacts bundle (model, scaler, encoder, features, version and
+# the corpus in model space). Set once startup finishes and replaced as a whole by
+# hot reloads; code takes one reference per batch/request and uses only that.
+artifacts: Optional[ModelArtifacts] = None
+_artifacts_lock = threading.Lock()
+
+
+def _load_artifacts() -> ModelArtifacts:
+    print("Loading AI Models...")
+    bundle = ModelArtifacts.load(
+        prefer_unscaled=os.getenv("USE_UNSCALED_MODEL", "true").strip().lower() == "true",
+        use_fast_scorer=os.getenv("USE_FAST_SCORER", "true").strip().lower() == "true",
+    )
+    if bundle.scaler is None:
+        print("Using scaler-free model export.")
+    return bundle
+
+
+def _current_model_version() -> str:
+    bundle = artifacts
+    return bundle.version if bundle is not None else "unknown"
+
+
+def _require_model() -> ModelArtifacts:
+    bundle = artifacts
+    if bundle is None:
+        raise HTTPException(status_code=503, detail="Model artifacts are still loading")
+    return bundle
+
+
+def _generate_explanations(bundle: ModelArtifacts, features_scaled: np.ndarray, pred_numeric,
+                           mode: Optional[str] = None) -> list:
+    """Explain a batch with one booster call: exact TreeSHAP or approximate (Saabas) contributions."""
+    features_scaled = np.atleast_2d(features_scaled)
+    mode = mode or state.config.get("explanation_mode", "exact")
     try:
-        base = explain_model
-        if hasattr(base, "base_estimator"):
-            base = base.base_estimator
-        if not hasattr(base, "get_booster"):
-            raise ValueError("No xgboost booster found for explanation")
-        booster = base.get_booster()
-        contrib = booster.predict(DMatrix(features_scaled, feature_names=features_scaled.columns.tolist()), pred_contribs=True)
-        contrib_arr = np.array(contrib)
-        if contrib_arr.ndim == 3:
-            class_idx = max(0, min(pred_numeric, contrib_arr.shape[1] - 1))
-            contrib_row = contrib_arr[0, class_idx, :-1]
-        else:
-            contrib_row = contrib_arr[0, :-1]
-        top_idx = np.argsort(np.abs(contrib_row))[::-1][:3]
-        top = [f"{features_scaled.columns[i]} ({contrib_row[i]:+.3f})" for i in top_idx]
-        return "Top contributors: " + ", ".join(top)
+        contrib = contribution_matrix(
+            bundle.explanation_booster(), features_scaled, np.atleast_1d(pred_numeric),
+            bundle.feature_columns, approximate=(mode == "approx"),
+        )
+        return format_top_contributors(contrib, bundle.feature_columns, top_k=3)
     except Exception:
-        top_features = features_scaled.iloc[0].abs().sort_values(ascending=False).head(3).index.tolist()
-        return f"Top contributing features: {', '.join(top_features)}"
+        return format_top_features(features_scaled, bundle.feature_columns, top_k=3)
+
+
+def _generate_explanation(bundle: ModelArtifacts, features_scaled: np.ndarray, pred_numeric: int) -> str:
+    """Generate tree contribution explanation using pred_contribs when possible."""
+    return _generate_explanations(bundle, features_scaled, [pred_numeric])[0]
+
+
+EXPLANATION_CACHE_SIZE = 2048
+_explanation_cache = OrderedDict()
+_explanation_cache_lock = threading.Lock()
+
+
+def _explain_feature_snapshots(bundle: ModelArtifacts, snapshots: list, attack_types: list,
+                               mode: Optional[str] = None) -> list:
+    """Explain stored (packed) snapshots in one vectorized booster call."""
+    known = {label: idx for idx, label in enumerate(bundle.label_encoder.classes_)}
+    pred_numeric = [known.get(t, 0) for t in attack_types]
+    raw = decode_matrix(snapshots, bundle.feature_columns, snapshot_schemas)
+    return _generate_explanations(bundle, bundle.snapshots_to_model_input(raw), pred_numeric, mode=mode)
 
 
 def _compute_automation_rate() -> float:
@@ -163,22 +204,35 @@ def _compute_automation_rate() -> float:
     return 100.0 * state.stats["auto_blocked"] / threats_detected
 
 
-def _compute_automation_rate_24h(db: Session) -> float:
+async def _read_in_memory(component, read):
+    """`read()` from pending_queue / overview_metrics in an async handler.
+
+    Once startup has loaded the component this is a plain in-memory read. Before that, the read
+    would load it from the database on the sync engine (holding the lock _write_packets needs),
+    so that call goes to the threadpool instead of stalling the event loop.
+    """
+    if component.loaded:
+        return read()
+    return await run_in_threadpool(read)
+
+
+async def _compute_automation_rate_24h(db: AsyncSession) -> float:
     now = datetime.utcnow()
     # Prefer recent/current-model behavior so stale history doesn't dominate the score.
     day_ago = now - timedelta(hours=2)
-    threat_count = db.query(TrafficLog).filter(
+    version = _current_model_version()
+    threat_count = await db.scalar(select(func.count(TrafficLog.id)).where(
         TrafficLog.timestamp >= day_ago,
         TrafficLog.type != "Normal Traffic",
-        TrafficLog.model_version == model_version
-    ).count()
+        TrafficLog.model_version == version
+    ))
     if threat_count <= 0:
         return 0.0
-    auto_count = db.query(TrafficLog).filter(
+    auto_count = await db.scalar(select(func.count(TrafficLog.id)).where(
         TrafficLog.timestamp >= day_ago,
         TrafficLog.action == "AUTO_BLOCKED",
-        TrafficLog.model_version == model_version
-    ).count()
+        TrafficLog.model_version == version
+    ))
     return 100.0 * auto_count / threat_count
 
 
@@ -191,276 +245,935 @@ def _compute_health_score(pending_count: int, automation_rate: float) -> int:
     raw = 92.0 - (1.2 * pending_count) + min(8.0, automation_rate * 0.08)
     return int(max(65, min(99, round(raw))))
 
-# Load Traffic Data
-if os.path.exists(SIMULATED_FILE):
-    traffic_df = pd.read_csv(SIMULATED_FILE)
-    traffic_df.columns = traffic_df.columns.str.strip()
-    print(f"Loaded {len(traffic_df)} rows of traffic data.")
-else:
-    raise FileNotFoundError(f"Run 'mine_all_attacks.py' first!")
+# --- REPLAY CORPUS ---
+# Raw corpus rows (memory-mapped float32 columnar cache of the CSV, see corpus_cache).
+# Each ModelArtifacts bundle projects it into its own input space once, so the
+# simulator only indexes into a precomputed matrix.
+corpus_df: Optional[pd.DataFrame] = None
+corpus_header = []  # default column order for live socket records
+
+
+def _read_corpus() -> pd.DataFrame:
+    global corpus_df, corpus_header
+    if not os.path.exists(SIMULATED_FILE):
+        raise FileNotFoundError(f"Run 'mine_all_attacks.py' first!")
+    corpus_df = load_corpus(SIMULATED_FILE)
+    corpus_header = list(corpus_df.columns)
+    return corpus_df
+
+
+def _prepare_artifacts(bundle: ModelArtifacts) -> ModelArtifacts:
+    """Attach the corpus and warm the bundle up so it is ready to serve."""
+    bundle.attach_corpus(corpus_df)
+    bundle.warm_up()
+    print(f"Loaded {len(corpus_df)} rows of traffic data "
+          f"({bundle.corpus_features.nbytes / 1e6:.1f} MB feature matrix) for model {bundle.version}.")
+    return bundle
+
+
+def _publish_artifacts(bundle: ModelArtifacts) -> None:
+    global artifacts
+    with _artifacts_lock:
+        artifacts = bundle  # single reference swap: batches already running keep their bundle
+        prediction_cache.clear()
+    snapshot_schemas.register(bundle.feature_hash, bundle.feature_columns)
+
+
+# Memoized predictions keyed on (feature vector hash, model version + scoring mode); see prediction_cache.py.
+prediction_cache = PredictionCache(int(os.getenv("PREDICTION_CACHE_SIZE", "100000")))
+
+
+scoring_pool = None
+_scoring_pool_bundle = None
+# Each worker is a spawned process holding its own copy of the model; more than one per core only adds memory.
+MAX_SCORING_WORKERS = os.cpu_count() or 1
+_scoring_pool_lock = threading.Lock()
+
+
+def _get_scoring_pool(bundle: ModelArtifacts) -> Optional[ScoringPool]:
+    """Return the process pool matching config scoring_workers and this bundle (None = score in-process)."""
+    global scoring_pool, _scoring_pool_bundle
+    workers = min(int(state.config.get("scoring_workers", 0)), MAX_SCORING_WORKERS)
+    with _scoring_pool_lock:
+        if (scoring_pool is not None and scoring_pool.alive and scoring_pool.n_workers == workers
+                and _scoring_pool_bundle is bundle):
+            return scoring_pool
+        if scoring_pool is not None:
+            if not scoring_pool.alive:
+                print("Scoring pool lost a worker; restarting it.")
+            scoring_pool.close()
+            scoring_pool = None
+            _scoring_pool_bundle = None
+        if workers > 0:
+            # Workers load the bundle's own model object, not whatever is on disk right now.
+            fd, model_file = tempfile.mkstemp(prefix="scoring-pool-", suffix=".joblib")
+            os.close(fd)
+            try:
+                joblib.dump(bundle.model, model_file)
+                scoring_pool = ScoringPool(model_file, workers, len(bundle.feature_columns))
+                _scoring_pool_bundle = bundle
+                print(f"Scoring pool started with {workers} worker(s) for model {bundle.version}.")
+            except Exception as e:
+                print(f"Failed to start scoring pool, scoring in-process: {e}")
+                state.config["scoring_workers"] = 0
+            finally:
+                os.remove(model_file)  # every worker has loaded it once the pool is up
+        return scoring_pool
+
+
+def _close_scoring_pool():
+    global scoring_pool, _scoring_pool_bundle
+    with _scoring_pool_lock:
+        if scoring_pool is not None:
+            scoring_pool.close()
+            scoring_pool = None
+            _scoring_pool_bundle = None
+
+
+atexit.register(_close_scoring_pool)
+
+
+# Per-stage counters for scoring; stage two is the full model (every row in "full" mode).
+cascade_stats = {
+    "batches": 0,
+    "rows": 0,
+    "stage1_rows": 0,
+    "skipped_rows": 0,
+    "stage2_rows": 0,
+    "stage1_seconds": 0.0,
+    "stage2_seconds": 0.0,
+    "cached_rows": 0,  # answered by the prediction memo cache, never reach either stage
+}
+
+
+def _cascade_status() -> dict:
+    stats = dict(cascade_stats)
+    bundle = artifacts
+    prefilter = bundle.prefilter if bundle is not None else None
+    stats["scoring_mode"] = state.config.get("scoring_mode", "full")
+    stats["prefilter_loaded"] = prefilter is not None
+    stats["cutoff"] = prefilter.cutoff if prefilter is not None else None
+    stats["skip_fraction"] = round(stats["skipped_rows"] / stats["stage1_rows"], 4) if stats["stage1_rows"] else None
+    stats["stage1_us_per_row"] = (
+        round(1e6 * stats["stage1_seconds"] / stats["stage1_rows"], 2) if stats["stage1_rows"] else None
+    )
+    stats["stage2_us_per_row"] = (
+        round(1e6 * stats["stage2_seconds"] / stats["stage2_rows"], 2) if stats["stage2_rows"] else None
+    )
+    stats["stage1_seconds"] = round(stats["stage1_seconds"], 3)
+    stats["stage2_seconds"] = round(stats["stage2_seconds"], 3)
+    return stats
+
+
+def _score_batch(bundle: ModelArtifacts, features: np.ndarray, scoring_mode: Optional[str] = None):
+    """Score a batch once; returns (pred_idx, confidence, runner_up_idx, has_probs) arrays.
+
+    In "cascade" mode the prefilter answers rows it is confidently normal about and
+    only the rest go to the full model. `scoring_mode` defaults to the configured one.
+    """
+    cascade_stats["batches"] += 1
+    cascade_stats["rows"] += len(features)
+    prefilter = bundle.prefilter
+    if scoring_mode is None:
+        scoring_mode = state.config.get("scoring_mode", "full")
+    if scoring_mode != "cascade" or prefilter is None:
+        started = time.perf_counter()
+        result = _score_full(bundle, features)
+        cascade_stats["stage2_rows"] += len(features)
+        cascade_stats["stage2_seconds"] += time.perf_counter() - started
+        return result
+
+    started = time.perf_counter()
+    skip, p_normal = prefilter.confidently_normal(features)
+    cascade_stats["stage1_rows"] += len(features)
+    cascade_stats["skipped_rows"] += int(skip.sum())
+    cascade_stats["stage1_seconds"] += time.perf_counter() - started
+
+    pred_idx = np.full(len(features), prefilter.normal_idx, dtype=int)
+    confidence = p_normal.astype(float)
+    runner_up = pred_idx.copy()  # skipped rows have no runner-up; noise injection leaves them alone
+    has_probs = True
+    rest = np.flatnonzero(~skip)
+    if len(rest):
+        started = time.perf_counter()
+        rest_pred, rest_conf, rest_runner_up, has_probs = _score_full(bundle, features[rest])
+        cascade_stats["stage2_rows"] += len(rest)
+        cascade_stats["stage2_seconds"] += time.perf_counter() - started
+        pred_idx[rest] = rest_pred
+        confidence[rest] = rest_conf
+        runner_up[rest] = rest_runner_up
+    return pred_idx, confidence, runner_up, has_probs
+
+
+def _score_full(bundle: ModelArtifacts, features: np.ndarray):
+    pool = _get_scoring_pool(bundle)
+    if pool is not None:
+        try:
+            pred_idx, confidence, runner_up = pool.score(features)
+            return pred_idx, confidence, runner_up, True
+        except ScoringPoolDead as e:
+            # Score this batch in-process; the next _get_scoring_pool call replaces the pool.
+            print(f"{e}; scoring the batch in-process.")
+    if bundle.fast_scorer is not None or hasattr(bundle.model, "predict_proba"):
+        if bundle.fast_scorer is not None:
+            probs = bundle.fast_scorer.predict_proba(features)
+        else:
+            probs = np.asarray(bundle.model.predict_proba(features))
+        pred_idx = np.argmax(probs, axis=1)
+        confidence = probs[np.arange(len(probs)), pred_idx]
+        if probs.shape[1] > 1:
+            runner_up = np.argsort(probs, axis=1)[:, ::-1][:, 1]
+        else:
+            runner_up = pred_idx.copy()
+        return pred_idx.astype(int), confidence.astype(float), runner_up.astype(int), True
+    pred_idx = np.asarray(bundle.model.predict(features)).astype(int)
+    return pred_idx, np.ones(len(pred_idx), dtype=float), pred_idx.copy(), False
+
+
+def _score_memoized(bundle: ModelArtifacts, features: np.ndarray):
+    """_score_batch behind the prediction memo cache.
+
+    Also returns (row keys, cache generation, rows the model scored, seconds it took), the last two
+    covering cache misses only so model latency is not diluted by cache hits.
+    """
+    if not state.config.get("prediction_cache_enabled", True):
+        started = time.perf_counter()
+        result = _score_batch(bundle, features)
+        return (*result, None, None, len(features), time.perf_counter() - started)
+    # Read the mode once so a concurrent switch cannot store one mode's results under the other's scope.
+    scoring_mode = state.config.get("scoring_mode", "full")
+    prefilter = bundle.prefilter
+    scope = scoring_scope(bundle.version, scoring_mode, prefilter.cutoff if prefilter is not None else None)
+    generation, keys, found = prediction_cache.lookup(scope, features)
+    pred_idx = np.empty(len(features), dtype=int)
+    confidence = np.empty(len(features), dtype=float)
+    runner_up = np.empty(len(features), dtype=int)
+    has_probs = True
+    miss = []
+    for i, entry in enumerate(found):
+        if entry is None:
+            miss.append(i)
+            continue
+        pred_idx[i], confidence[i], runner_up[i] = entry[0], entry[1], entry[2]
+        has_probs = has_probs and entry[3]
+    cascade_stats["cached_rows"] += len(features) - len(miss)
+    model_seconds = 0.0
+    if miss:
+        started = time.perf_counter()
+        miss_pred, miss_conf, miss_runner_up, miss_has_probs = _score_batch(bundle, features[miss], scoring_mode)
+        model_seconds = time.perf_counter() - started
+        prediction_cache.store(generation, [keys[i] for i in miss], miss_pred, miss_conf, miss_runner_up,
+                               miss_has_probs)
+        pred_idx[miss] = miss_pred
+        confidence[miss] = miss_conf
+        runner_up[miss] = miss_runner_up
+        has_probs = has_probs and miss_has_probs
+    return pred_idx, confidence, runner_up, has_probs, keys, generation, len(miss), model_seconds
+
+
+def _inference_batch_settings():
+    batch_size = max(1, int(state.config.get("inference_batch_size", 1)))
+    max_wait = max(0.0, float(state.config.get("inference_batch_max_wait_ms", 0.0))) / 1000.0
+    return batch_size, max_wait
+
 
 # --- BACKGROUND SIMULATOR ---
-# This thread mimics live traffic coming into the router
-def traffic_simulator():
-    index = 0
-    # Create a dedicated session for the background thread
-    from database import SessionLocal
-    
+# This pipeline mimics live traffic coming into the router:
+#   source -> score -> decide -> enrich -> persist
+# Each stage hands whole micro-batches (lists of packet dicts) to the next one
+# through a bounded queue, so a slow DB commit no longer stalls inference.
+from database import Base, SessionLocal, engine
+
+_replay_index = 0
+# Analyst queue size without COUNT(*): rows decided PENDING are reserved in
+# pending_queue until their write commits, so the queue cap and thresholds see
+# them before the persist stage catches up.
+PENDING_RECONCILE_SECONDS = float(os.getenv("PENDING_RECONCILE_SECONDS", "60"))
+# Feature-schema hash -> column names for the packed feature snapshots.
+snapshot_schemas = SchemaRegistry(engine)
+# Storage mode for traffic_logs / auto_blocked: "daily" range-partitions them
+# by timestamp (PostgreSQL) with retention and a background maintenance job.
+PARTITION_MAINTENANCE_SECONDS = float(os.getenv("PARTITION_MAINTENANCE_SECONDS", "3600"))
+partitions = PartitionManager(
+    engine,
+    mode=os.getenv("TRAFFIC_PARTITIONING", "none").strip().lower(),
+    retention_days=int(os.getenv("PARTITION_RETENTION_DAYS", "30")),
+    retention_action=os.getenv("PARTITION_RETENTION_ACTION", "drop").strip().lower(),
+    premake_days=int(os.getenv("PARTITION_PREMAKE_DAYS", "3")),
+)
+# 24h overview counters fed by the write and resolve paths, so /api/metrics/overview
+# reads fixed-size buckets instead of the day's rows; reseeded from the database
+# every OVERVIEW_RESEED_SECONDS to pick up rows written by other processes.
+OVERVIEW_RESEED_SECONDS = float(os.getenv("OVERVIEW_RESEED_SECONDS", "900"))
+overview_metrics = RollingOverview(bucket_seconds=int(os.getenv("OVERVIEW_BUCKET_SECONDS", "60")))
+replay_scheduler = ReplayScheduler(state.config)
+
+
+flow_source = None
+_flow_source_key = None
+
+# Live sources open files and bind sockets, so the ingest_* settings are admin-only and confined
+# to these limits (checked again when a source starts, since config_state.json can carry any value).
+INGEST_CSV_DIR = os.path.realpath(os.getenv("INGEST_CSV_DIR", "."))
+INGEST_SOCKET_HOSTS = tuple(
+    h.strip() for h in os.getenv("INGEST_SOCKET_HOSTS", "127.0.0.1,localhost").split(",") if h.strip()
+)
+
+
+def _ingest_csv_path(path: str) -> Optional[str]:
+    """`path` resolved under INGEST_CSV_DIR, or None when it points outside it."""
+    resolved = os.path.realpath(os.path.join(INGEST_CSV_DIR, str(path)))
+    if os.path.commonpath([resolved, INGEST_CSV_DIR]) != INGEST_CSV_DIR:
+        return None
+    return resolved
+
+
+def _get_flow_source():
+    """Return the live flow source matching config ingest_* (None = replay the corpus)."""
+    global flow_source, _flow_source_key
+    kind = state.config.get("ingest_source", "replay")
+    if kind == "replay":
+        key = (kind,)
+    elif kind == "csv_tail":
+        key = (kind, state.config.get("ingest_csv_path"))
+    else:
+        key = (kind, state.config.get("ingest_socket_host"), int(state.config.get("ingest_socket_port", 0)))
+    if key == _flow_source_key:
+        return flow_source
+    if flow_source is not None:
+        flow_source.close()
+        flow_source = None
+    _flow_source_key = key
+    if kind == "replay":
+        return None
+    try:
+        if kind == "csv_tail":
+            path = _ingest_csv_path(key[1])
+            if path is None:
+                raise ValueError(f"ingest_csv_path must be inside {INGEST_CSV_DIR}")
+            flow_source = CsvTailSource(path)
+        else:
+            if key[1] not in INGEST_SOCKET_HOSTS:
+                raise ValueError(f"ingest_socket_host must be one of {', '.join(INGEST_SOCKET_HOSTS)}")
+            flow_source = SocketFlowSource(kind, key[1], key[2], header=corpus_header)
+        print(f"Live flow source ready: {flow_source.status()}")
+    except Exception as e:
+        print(f"Failed to start flow source {key}: {e}. Falling back to replay.")
+        state.config["ingest_source"] = "replay"
+        _flow_source_key = None
+    return flow_source
+
+
+async def _replay_source():
+    """Collect a micro-batch of replay rows paced by the replay scheduler."""
+    global _replay_index
+    batch_size, max_wait = _inference_batch_settings()
+    count = await replay_scheduler.take(batch_size, max_wait)
+    if count <= 0:
+        return None
+    positions = ((_replay_index + np.arange(count)) % len(corpus_df)).tolist()
+    _replay_index += count
+    return positions
+
+
+async def _live_source(source):
+    """Collect up to a micro-batch of live flow records: N records or max wait after the first one."""
+    batch_size, max_wait = _inference_batch_settings()
+    batch = None
+    deadline = None
+    idle_until = time.monotonic() + 0.5  # hand control back so config changes are picked up
+    while True:
+        more = source.read_batch(batch_size - (len(batch.lines) if batch else 0),
+                                 header=batch.header if batch else None)
+        if more is not None:
+            batch = more if batch is None else FlowBatch(batch.header, batch.lines + more.lines)
+            if deadline is None:
+                deadline = time.monotonic() + max_wait
+        if batch is not None and (len(batch.lines) >= batch_size or time.monotonic() >= deadline):
+            return batch
+        if batch is None and time.monotonic() >= idle_until:
+            return None
+        await asyncio.sleep(0.005 if batch is not None else 0.05)
+
+
+async def _ingest_source():
+    if not state.is_running:
+        await asyncio.sleep(0.1)
+        return None
+    source = _get_flow_source()
+    if source is None:
+        return await _replay_source()
+    return await _live_source(source)
+
+
+def _score_stage(item) -> list:
+    """Score a whole batch at once: replay positions (precomputed features) or parsed live flows."""
+    # One bundle for the whole batch, carried downstream so enrich/persist use the same model.
+    bundle = artifacts
+    if isinstance(item, FlowBatch):
+        flows = parse_flow_lines(item)
+        if flows.empty:
+            return None
+        features = bundle.to_model_input(flows)
+        if "Destination Port" in flows.columns:
+            ports = flows["Destination Port"].fillna(0).astype(int).tolist()
+        else:
+            ports = [0] * len(flows)
+    else:
+        features = bundle.corpus_features[item]
+        ports = bundle.corpus_ports[item].tolist()
+    raw_features = bundle.unscale(features)
+
+    # Use model probabilities for reliable confidence and class decision.
+    pred_idx, confidences, runner_up, has_probs, memo_keys, memo_generation, model_rows, model_seconds = (
+        _score_memoized(bundle, features)
+    )
+    evaluator = shadow
+    if evaluator is not None:
+        # Compare models before noise injection; the shadow worker copies nothing back.
+        evaluator.submit(bundle, raw_features, pred_idx.copy(), confidences.copy(),
+                         model_rows, model_seconds)
+
+    # Controlled uncertainty injection for realistic simulation behavior (after the cache lookup).
+    noise_rate = float(state.config.get("model_noise_rate", 0.0))
+    if noise_rate > 0 and has_probs:
+        for i in range(len(pred_idx)):
+            if random.random() < noise_rate and runner_up[i] != pred_idx[i]:
+                pred_idx[i] = runner_up[i]
+                confidences[i] = max(0.50, confidences[i] - random.uniform(0.10, 0.25))
+
+    pred_texts = bundle.label_encoder.inverse_transform(pred_idx)
+    snapshots = encode_rows(bundle.feature_hash, raw_features)
+    return [
+        {
+            "artifacts": bundle,
+            "features": features[i],
+            "feature_vector": snapshots[i],
+            "destination_port": ports[i],
+            "pred_idx": int(pred_idx[i]),
+            "pred_text": str(pred_texts[i]),
+            "confidence": float(confidences[i]),
+            "memo_key": memo_keys[i] if memo_keys is not None else None,
+            "memo_generation": memo_generation,
+        }
+        for i in range(len(pred_idx))
+    ]
+
+
+def _recent_automation_rate() -> Optional[float]:
+    if len(state.recent_threat_actions) < 40:
+        return None
+    auto_recent = sum(1 for a in state.recent_threat_actions if a == "AUTO")
+    return 100.0 * auto_recent / len(state.recent_threat_actions)
+
+
+def _decide_packet(packet: dict, pending_count: int) -> int:
+    """SOAR decision for one scored packet; returns the updated pending-queue size."""
+    pred_text = packet["pred_text"]
+    confidence = packet["confidence"]
+
+    # Dynamic Thresholding Adjustment
+    current_threshold = state.config["auto_block_threshold"]
+    if state.config["dynamic_threshold_enabled"]:
+        # Keep automation in a target band while considering queue pressure.
+        recent_rate = _recent_automation_rate()
+        target_min = float(state.config.get("target_automation_min", 70.0))
+        target_max = float(state.config.get("target_automation_max", 90.0))
+        if recent_rate is not None and recent_rate > target_max:
+            current_threshold = min(state.config["max_threshold"], current_threshold + 0.02)
+        elif recent_rate is not None and recent_rate < target_min:
+            # Recover quickly when automation is too low.
+            step = 0.02 if recent_rate < max(0.0, target_min - 20.0) else 0.01
+            current_threshold = max(state.config["min_threshold"], current_threshold - step)
+        elif pending_count > 20:
+            current_threshold = max(state.config["min_threshold"], current_threshold - 0.01)
+        elif pending_count < 6:
+            current_threshold = min(state.config["max_threshold"], current_threshold + 0.01)
+        state.config["auto_block_threshold"] = round(current_threshold, 2)
+
+    packet["action"] = "MONITOR"
+    packet["auto_block_reason"] = None
+    packet["review_status"] = None
+
+    # SOAR Logic (The Brain)
+    state.stats["scanned"] += 1
+    if pred_text == "Normal Traffic":
+        return pending_count
+
+    state.stats["threats_detected"] += 1
+    # Check Auto-Block Policy
+    if confidence >= state.config["auto_block_threshold"]:
+        packet["action"] = "AUTO_BLOCKED"
+        packet["auto_block_reason"] = f"Confidence > {state.config['auto_block_threshold']*100}%"
+        state.stats["auto_blocked"] += 1
+        state.recent_threat_actions.append("AUTO")
+        return pending_count
+
+    # Send to Portal B (Human Review)
+    packet["action"] = "PENDING_REVIEW"
+    state.recent_threat_actions.append("PENDING")
+    if pending_count >= 20: # cap pending queue
+        return pending_count
+    packet["review_status"] = "PENDING"
+    pending_count += 1
+
+    # Optional automatic queue relief: promote high-confidence pending events.
+    if state.config.get("auto_resolve_pending_enabled", True):
+        queue_trigger = int(state.config.get("pending_auto_resolve_queue_trigger", 10))
+        if pending_count >= queue_trigger:
+            promote_threshold = max(
+                state.config["min_threshold"],
+                current_threshold - float(state.config.get("pending_auto_resolve_delta", 0.10))
+            )
+            recent_rate = _recent_automation_rate()
+            target_max = float(state.config.get("target_automation_max", 90.0))
+            if confidence >= promote_threshold and (recent_rate is None or recent_rate <= target_max):
+                packet["review_status"] = "RESOLVED"
+                packet["action"] = "AUTO_BLOCKED"
+                packet["auto_block_reason"] = f"Queue relief: Confidence >= {promote_threshold*100:.1f}%"
+                state.stats["auto_blocked"] += 1
+                state.recent_threat_actions.append("AUTO")
+                pending_count -= 1
+    return pending_count
+
+
+def _decide_stage(packets: list) -> list:
+    pending_count = pending_queue.pending_count()
+    for packet in packets:
+        pending_count = _decide_packet(packet, pending_count)
+    pending_queue.reserve(p["pred_text"] for p in packets if p["review_status"] == "PENDING")
+    return packets
+
+
+def _enrich_packet(packet: dict) -> None:
+    """Attach simulated network/login context to a decided packet."""
+    pred_text = packet["pred_text"]
+    fake_country = random.choice(list(COUNTRY_COORDS.keys()))
+    packet["src_ip"] = f"192.168.1.{random.randint(10, 200)}"
+    packet["country"] = fake_country
+    packet["timestamp"] = datetime.utcnow() # UTC like every other stored timestamp (daily partitions are UTC days)
+
+    # --- NEW CONTEXT DATA GENERATION ---
+    # Traffic Volume
+    if "DoS" in pred_text:
+         traffic_volume = random.choices(["High", "Medium"], weights=[0.8, 0.2])[0]
+    elif pred_text == "Normal Traffic":
+         traffic_volume = random.choices(["Normal", "Low"], weights=[0.7, 0.3])[0]
+    else:
+         traffic_volume = random.choices(["Medium", "High"], weights=[0.6, 0.4])[0]
+
+    # Burst Score
+    if pred_text == "Normal Traffic":
+        burst_score = round(random.uniform(0.0, 1.4), 2)
+    else:
+        burst_score = round(random.uniform(1.5, 5.0), 2)
+
+    # Failed Attempts & Login Behavior
+    # Logic:
+    # - Brute Force / Bot / Web Attack -> "Detected" (High failed attempts, specific username)
+    # - DDoS / DoS / PortScan -> "Suspicious" (Some failed attempts, no specific username usually, but we can simmer it)
+    # - Normal -> "Normal"
+
+    is_brute_force = any(x in pred_text for x in ["Brute", "Force", "Patator", "Web Attack", "Sql", "XSS"])
+    is_bot = "Bot" in pred_text
+    is_dos = any(x in pred_text for x in ["DoS", "DDoS", "Heartbleed"])
+    is_scan = "Port" in pred_text or "Scan" in pred_text
+
+    target_username = None
+    if is_brute_force or is_bot:
+        failed_attempts = random.randint(5, 50)
+        login_behavior = "Detected"
+        target_username = random.choice(["admin", "root", "user1", "test_user", "service_account", "postgres", "manager"])
+    elif is_dos or is_scan:
+        failed_attempts = random.randint(1, 6) # DDoS doesn't necessarily fail logins, but might cause timeouts/errors
+        login_behavior = "Suspicious"
+    elif "Normal" in pred_text:
+        failed_attempts = random.randint(0, 3)
+        login_behavior = "Normal"
+    else:
+        # Fallback for other attacks
+        failed_attempts = random.randint(2, 10)
+        login_behavior = "Suspicious"
+
+    packet["target_username"] = target_username
+    packet["burst_score"] = burst_score
+    packet["failed_attempts"] = failed_attempts
+    packet["traffic_volume"] = traffic_volume
+    packet["login_behavior"] = login_behavior
+    packet["resolved_at"] = datetime.utcnow() if packet["review_status"] == "RESOLVED" else None
+
+
+def _enrich_stage(packets: list) -> list:
+    for packet in packets:
+        _enrich_packet(packet)
+
+    # Real model contribution explanation (with safe fallback), only for rows an
+    # analyst will see unless eager_explanations is on. One booster call per batch.
+    eager = state.config.get("eager_explanations", False)
+    to_explain = [p for p in packets if eager or p["review_status"] is not None]
+    if not to_explain:
+        return packets
+    mode = state.config.get("explanation_mode", "exact")
+    missing = []
+    for packet in to_explain:
+        cached = None
+        if packet["memo_key"] is not None:
+            cached = prediction_cache.get_explanation(packet["memo_key"], mode, packet["pred_idx"])
+        if cached is None:
+            missing.append(packet)
+        else:
+            packet["explanation"] = cached
+    if missing:
+        explanations = _generate_explanations(
+            missing[0]["artifacts"],
+            np.stack([p["features"] for p in missing]), [p["pred_idx"] for p in missing], mode=mode
+        )
+        for packet, explanation in zip(missing, explanations):
+            packet["explanation"] = explanation
+            if packet["memo_key"] is not None:
+                prediction_cache.put_explanation(packet["memo_generation"], packet["memo_key"], mode,
+                                                 packet["pred_idx"], explanation)
+    return packets
+
+
+def _write_packets(packets: list, relaxed: bool) -> None:
+    """Insert a group of decided packets (logs, auto blocks, review items) in one transaction."""
+    traffic_rows, blocked_rows, review_rows = [], [], []
+    for bundle in {id(p["artifacts"]): p["artifacts"] for p in packets}.values():
+        snapshot_schemas.ensure_stored(bundle.feature_hash, bundle.feature_columns)
+    for packet in packets:
+        snapshot = packet["feature_vector"]
+        explanation = packet.get("explanation")
+        model_version = packet["artifacts"].version
+        traffic_rows.append(dict(
+            timestamp=packet["timestamp"],
+            src_ip=packet["src_ip"],
+            country=packet["country"],
+            lat=COUNTRY_COORDS[packet["country"]][0],
+            lon=COUNTRY_COORDS[packet["country"]][1],
+            type=packet["pred_text"],
+            confidence=packet["confidence"],
+            destination_port=packet["destination_port"],
+            action=packet["action"],
+            target_username=packet["target_username"],
+            burst_score=packet["burst_score"],
+            failed_attempts=packet["failed_attempts"],
+            traffic_volume=packet["traffic_volume"],
+            login_behavior=packet["login_behavior"],
+            explanation=explanation,
+            feature_vector=snapshot,
+            model_version=model_version,
+        ))
+        if packet["auto_block_reason"]:
+            blocked_rows.append(dict(
+                timestamp=packet["timestamp"],
+                src_ip=packet["src_ip"],
+                country=packet["country"],
+                limit_reached=packet["auto_block_reason"],
+                confidence=packet["confidence"],
+                type=packet["pred_text"],
+                action="AUTO_BLOCKED",
+                model_version=model_version,
+            ))
+        if packet["review_status"]:
+            auto_resolved = packet["review_status"] == "RESOLVED"
+            review_rows.append(dict(
+                timestamp=packet["timestamp"],
+                src_ip=packet["src_ip"],
+                country=packet["country"],
+                type=packet["pred_text"],
+                confidence=packet["confidence"],
+                destination_port=packet["destination_port"],
+                status=packet["review_status"],
+                action_taken="AUTO_BLOCKED" if auto_resolved else None,
+                analyst_id="SYSTEM_AUTOMATION" if auto_resolved else None,
+                resolved_at=packet["resolved_at"],
+                is_correct=1,
+                target_username=packet["target_username"],
+                burst_score=packet["burst_score"],
+                failed_attempts=packet["failed_attempts"],
+                traffic_volume=packet["traffic_volume"],
+                login_behavior=packet["login_behavior"],
+                explanation=explanation,
+                feature_vector=snapshot,
+                model_version=model_version,
+            ))
+
+    pending_types = [p["pred_text"] for p in packets if p["review_status"] == "PENDING"]
+    db = SessionLocal()
+    try:
+        if relaxed and capabilities(db.get_bind()).async_commit:
+            # Commit returns before the WAL is flushed; a crash can lose the last few hundred ms.
+            db.execute(text("SET LOCAL synchronous_commit TO OFF"))
+        # COPY FROM STDIN on PostgreSQL, executemany elsewhere (see bulk_ingest.py).
+        for model, rows in ((TrafficLog, traffic_rows), (AutoBlocked, blocked_rows), (ManualReview, review_rows)):
+            write_rows(db, model, rows)
+        with pending_queue.mutation(), overview_metrics.mutation():
+            db.commit()
+            pending_queue.mark_committed(pending_types)
+            overview_metrics.record(
+                traffic=((row["timestamp"], row["type"]) for row in traffic_rows),
+                auto_blocked=(row["timestamp"] for row in blocked_rows),
+                resolved=((row["timestamp"], row["resolved_at"], row["action_taken"])
+                          for row in review_rows if row["status"] == "RESOLVED"),
+            )
+    except Exception:
+        db.rollback()
+        pending_queue.release(pending_types)  # dropped: these rows are no longer in flight
+        raise
+    finally:
+        db.close()
+
+
+write_buffer = WriteBuffer(state.config, _write_packets)
+
+
+def _persist_stage(packets: list) -> None:
+    write_buffer.submit(packets)
+
+
+ingest_pipeline = StagedPipeline(
+    _ingest_source,
+    [
+        Stage("score", _score_stage),
+        Stage("decide", _decide_stage),
+        Stage("enrich", _enrich_stage),
+        Stage("persist", _persist_stage),
+    ],
+    queue_size=int(os.getenv("PIPELINE_QUEUE_SIZE", "8")),
+)
+
+
+def _init_database():
+    partitions.create_tables(Base.metadata)
+    init_db()
     # --- OPTIONAL DB RESET FOR NEW SCHEMA (Drop and Recreate) ---
     # Disabled by default to preserve runtime history across restarts.
     reset_db_on_start = os.getenv("RESET_DB_ON_START", "false").strip().lower() == "true"
     if reset_db_on_start:
         print("RESET_DB_ON_START=true -> Resetting Database Schema...")
-        from database import Base, engine
-        Base.metadata.drop_all(bind=engine)
-        Base.metadata.create_all(bind=engine)
+        drop_schema(engine, Base.metadata)
+        partitions.create_tables(Base.metadata)
+        init_db()
         print("Database Reset Complete.")
     else:
         print("RESET_DB_ON_START=false -> Keeping existing database data.")
-    
-    while True:
-        if state.is_running:
-            db = SessionLocal()
-            try:
-                # 1. Get Next Packet
-                row = traffic_df.iloc[index % len(traffic_df)]
-                index += 1
-
-                # 2. Predict
-                features = _build_feature_frame(row)
-                features = features.replace([np.inf, -np.inf], np.nan).fillna(0.0)
-                feature_snapshot = features.iloc[0].to_dict()
-                if scaler is not None:
-                    features = pd.DataFrame(scaler.transform(features), columns=feature_columns)
-
-                # Use model probabilities for reliable confidence and class decision.
-                if hasattr(model, "predict_proba"):
-                    probs = model.predict_proba(features)[0]
-                    pred_numeric = int(np.argmax(probs))
-                    confidence = float(np.max(probs))
-                else:
-                    pred_numeric = int(model.predict(features)[0])
-                    confidence = 1.0
-
-                # Controlled uncertainty injection for realistic simulation behavior.
-                noise_rate = float(state.config.get("model_noise_rate", 0.0))
-                if noise_rate > 0 and random.random() < noise_rate and hasattr(model, "predict_proba"):
-                    ranked = np.argsort(probs)[::-1]
-                    if len(ranked) > 1:
-                        pred_numeric = int(ranked[1])
-                        confidence = max(0.50, confidence - random.uniform(0.10, 0.25))
-
-                pred_text = label_encoder.inverse_transform([pred_numeric])[0]
-                
-                # Dynamic Thresholding Adjustment
-                current_threshold = state.config["auto_block_threshold"]
-                if state.config["dynamic_threshold_enabled"]:
-                    # Keep automation in a target band while considering queue pressure.
-                    pending_count = db.query(ManualReview).filter(ManualReview.status == "PENDING").count()
-                    recent_rate = None
-                    if len(state.recent_threat_actions) >= 40:
-                        auto_recent = sum(1 for a in state.recent_threat_actions if a == "AUTO")
-                        recent_rate = 100.0 * auto_recent / len(state.recent_threat_actions)
-
-                    target_min = float(state.config.get("target_automation_min", 70.0))
-                    target_max = float(state.config.get("target_automation_max", 90.0))
-                    if recent_rate is not None and recent_rate > target_max:
-                        current_threshold = min(state.config["max_threshold"], current_threshold + 0.02)
-                    elif recent_rate is not None and recent_rate < target_min:
-                        # Recover quickly when automation is too low.
-                        step = 0.02 if recent_rate < max(0.0, target_min - 20.0) else 0.01
-                        current_threshold = max(state.config["min_threshold"], current_threshold - step)
-                    elif pending_count > 20:
-                        current_threshold = max(state.config["min_threshold"], current_threshold - 0.01)
-                    elif pending_count < 6:
-                        current_threshold = min(state.config["max_threshold"], current_threshold + 0.01)
-                    state.config["auto_block_threshold"] = round(current_threshold, 2)
-
-                # Real model contribution explanation (with safe fallback).
-                explanation = _generate_explanation(features, pred_numeric)
-                fake_ip = f"192.168.1.{random.randint(10, 200)}"
-                fake_country = random.choice(list(COUNTRY_COORDS.keys()))
-                timestamp = datetime.now() # Use datetime object for DB
-
-                # --- NEW CONTEXT DATA GENERATION ---
-                target_username = None
-                burst_score = 0.0
-                failed_attempts = 0
-                traffic_volume = "Normal"
-                login_behavior = "Normal"
-
-                # Traffic Volume
-                if "DoS" in pred_text:
-                     traffic_volume = random.choices(["High", "Medium"], weights=[0.8, 0.2])[0]
-                elif pred_text == "Normal Traffic":
-                     traffic_volume = random.choices(["Normal", "Low"], weights=[0.7, 0.3])[0]
-                else:
-                     traffic_volume = random.choices(["Medium", "High"], weights=[0.6, 0.4])[0]
-
-                # Burst Score
-                if pred_text == "Normal Traffic":
-                    burst_score = round(random.uniform(0.0, 1.4), 2)
-                else:
-                    burst_score = round(random.uniform(1.5, 5.0), 2)
-
-                # Failed Attempts & Login Behavior
-                # Logic:
-                # - Brute Force / Bot / Web Attack -> "Detected" (High failed attempts, specific username)
-                # - DDoS / DoS / PortScan -> "Suspicious" (Some failed attempts, no specific username usually, but we can simmer it)
-                # - Normal -> "Normal"
-
-                is_brute_force = any(x in pred_text for x in ["Brute", "Force", "Patator", "Web Attack", "Sql", "XSS"])
-                is_bot = "Bot" in pred_text
-                is_dos = any(x in pred_text for x in ["DoS", "DDoS", "Heartbleed"])
-                is_scan = "Port" in pred_text or "Scan" in pred_text
-
-                if is_brute_force or is_bot:
-                    failed_attempts = random.randint(5, 50)
-                    login_behavior = "Detected"
-                    target_username = random.choice(["admin", "root", "user1", "test_user", "service_account", "postgres", "manager"])
-                elif is_dos or is_scan:
-                    failed_attempts = random.randint(1, 6) # DDoS doesn't necessarily fail logins, but might cause timeouts/errors
-                    login_behavior = "Suspicious"
-                    target_username = None # Usually targeting infrastructure, not accounts
-                elif "Normal" in pred_text:
-                    failed_attempts = random.randint(0, 3)
-                    login_behavior = "Normal"
-                    target_username = None
-                else:
-                    # Fallback for other attacks
-                    failed_attempts = random.randint(2, 10)
-                    login_behavior = "Suspicious"
-                    target_username = None
-
-                # 4. Create Traffic Log Entry
-                traffic_log = TrafficLog(
-                    timestamp=timestamp,
-                    src_ip=fake_ip,
-                    country=fake_country,
-                    lat=COUNTRY_COORDS[fake_country][0],
-                    lon=COUNTRY_COORDS[fake_country][1],
-                    type=pred_text,
-                    confidence=confidence,
-                    destination_port=int(row.get("Destination Port", 0)),
-                    action="MONITOR",
-                    # New Fields
-                    target_username=target_username,
-                    burst_score=burst_score,
-                    failed_attempts=failed_attempts,
-                    traffic_volume=traffic_volume,
-                    login_behavior=login_behavior,
-                    feature_snapshot=json.dumps(feature_snapshot),
-                    model_version=model_version
-                )
-
-                # 5. SOAR Logic (The Brain)
-                state.stats["scanned"] += 1
-                
-                if pred_text != "Normal Traffic":
-                    state.stats["threats_detected"] += 1
-                    
-                    # Check Auto-Block Policy
-                    if confidence >= state.config["auto_block_threshold"]:
-                        traffic_log.action = "AUTO_BLOCKED"
-                        state.stats["auto_blocked"] += 1
-                        state.recent_threat_actions.append("AUTO")
-                        
-                        # Add to AutoBlocked Table
-                        auto_block_entry = AutoBlocked(
-                            timestamp=timestamp,
-                            src_ip=fake_ip,
-                            country=fake_country,
-                            limit_reached=f"Confidence > {state.config['auto_block_threshold']*100}%",
-                            confidence=confidence,
-                            type=pred_text,
-                            model_version=model_version
-                        )
-                        db.add(auto_block_entry)
-                        
-                    else:
-                        # Send to Portal B (Human Review)
-                        traffic_log.action = "PENDING_REVIEW"
-                        state.recent_threat_actions.append("PENDING")
-                        
-                        # Add to ManualReview Table (Only if not duplicate/flooding - simplified for DB)
-                        pending_count = db.query(ManualReview).filter(ManualReview.status == "PENDING").count()
-                        if pending_count < 20: # cap pending queue
-                            manual_entry = ManualReview(
-                                timestamp=timestamp,
-                                src_ip=fake_ip,
-                                country=fake_country,
-                                type=pred_text,
-                                confidence=confidence,
-                                destination_port=int(row.get("Destination Port", 0)),
-                                status="PENDING",
-                                # New Fields
-                                target_username=target_username,
-                                burst_score=burst_score,
-                                failed_attempts=failed_attempts,
-                                traffic_volume=traffic_volume,
-                                login_behavior=login_behavior,
-                                explanation=explanation,
-                                feature_snapshot=json.dumps(feature_snapshot),
-                                model_version=model_version
-                            )
-                            db.add(manual_entry)
-                            db.flush()
-
-                            # Optional automatic queue relief: promote high-confidence pending events.
-                            if state.config.get("auto_resolve_pending_enabled", True):
-                                queue_trigger = int(state.config.get("pending_auto_resolve_queue_trigger", 10))
-                                pending_after_insert = db.query(ManualReview).filter(ManualReview.status == "PENDING").count()
-                                if pending_after_insert >= queue_trigger:
-                                    promote_threshold = max(
-                                        state.config["min_threshold"],
-                                        current_threshold - float(state.config.get("pending_auto_resolve_delta", 0.10))
-                                    )
-                                    recent_rate = None
-                                    if len(state.recent_threat_actions) >= 40:
-                                        auto_recent = sum(1 for a in state.recent_threat_actions if a == "AUTO")
-                                        recent_rate = 100.0 * auto_recent / len(state.recent_threat_actions)
-                                    target_max = float(state.config.get("target_automation_max", 90.0))
-                                    if confidence >= promote_threshold and (recent_rate is None or recent_rate <= target_max):
-                                        manual_entry.status = "RESOLVED"
-                                        manual_entry.action_taken = "AUTO_BLOCKED"
-                                        manual_entry.analyst_id = "SYSTEM_AUTOMATION"
-                                        manual_entry.resolved_at = datetime.utcnow()
-
-                                        traffic_log.action = "AUTO_BLOCKED"
-                                        state.stats["auto_blocked"] += 1
-                                        state.recent_threat_actions.append("AUTO")
-
-                                        auto_block_entry = AutoBlocked(
-                                            timestamp=timestamp,
-                                            src_ip=fake_ip,
-                                            country=fake_country,
-                                            limit_reached=f"Queue relief: Confidence >= {promote_threshold*100:.1f}%",
-                                            confidence=confidence,
-                                            type=pred_text,
-                                            model_version=model_version
-                                        )
-                                        db.add(auto_block_entry)
-
-                # Save Traffic Log
-                traffic_log.explanation = explanation
-                db.add(traffic_log)
-                db.commit()
+    pending_queue.start(PENDING_RECONCILE_SECONDS)
+    overview_metrics.start(OVERVIEW_RESEED_SECONDS)
+    partitions.start(PARTITION_MAINTENANCE_SECONDS)
+
+
+def traffic_simulator():
+    asyncio.run(ingest_pipeline.run())
+
+
+sim_thread = None
+
+
+def _start_simulator():
+    global sim_thread
+    sim_thread = threading.Thread(target=traffic_simulator, daemon=True, name="traffic-simulator")
+    sim_thread.start()
+
+
+# --- STARTUP ---
+# Importing this module does no heavy work. The app lifespan starts one loader
+# thread that brings up the DB schema, model artifacts, replay corpus and RAG
+# embedding model in parallel, then starts the simulator. Progress and per-phase
+# timings are exposed at /api/system/ready.
+REQUIRED_STARTUP_PHASES = ("database", "model_artifacts", "corpus_read", "corpus_features", "simulator")
+startup_report = {"started_at": None, "ready_at": None, "total_seconds": None, "phases": {}}
+system_ready = threading.Event()
+_startup_thread = None
+_startup_lock = threading.Lock()
+
+
+def _run_startup_phase(name: str, fn, *args):
+    entry = {"status": "running", "seconds": None, "error": None}
+    startup_report["phases"][name] = entry
+    start = time.perf_counter()
+    try:
+        result = fn(*args)
+        entry["status"] = "ok"
+        return result
+    except Exception as e:
+        entry["status"] = "failed"
+        entry["error"] = str(e)
+        print(f"Startup phase '{name}' failed: {e}")
+        raise
+    finally:
+        entry["seconds"] = round(time.perf_counter() - start, 3)
+
+
+def _warm_rag():
+    from ai.router import get_rag
+    if get_rag() is None:
+        raise RuntimeError("RAG system unavailable")
+
+
+def _run_startup():
+    started = time.perf_counter()
+    startup_report["started_at"] = datetime.utcnow().isoformat()
+    loaders = ThreadPoolExecutor(max_workers=4, thread_name_prefix="startup")
+    try:
+        db_future = loaders.submit(_run_startup_phase, "database", _init_database)
+        assets_future = loaders.submit(_run_startup_phase, "model_artifacts", _load_artifacts)
+        corpus_future = loaders.submit(_run_startup_phase, "corpus_read", _read_corpus)
+        if os.getenv("PRELOAD_RAG", "true").strip().lower() == "true":
+            loaders.submit(_run_startup_phase, "rag", _warm_rag)  # optional; does not gate readiness
+
+        corpus_future.result()
+        _publish_artifacts(_run_startup_phase("corpus_features", _prepare_artifacts, assets_future.result()))
+        db_future.result()
+        _run_startup_phase("simulator", _start_simulator)
+    except Exception:
+        print("Startup incomplete; see /api/system/ready for details.")
+        return
+    finally:
+        loaders.shutdown(wait=False)
+
+    startup_report["total_seconds"] = round(time.perf_counter() - started, 3)
+    startup_report["ready_at"] = datetime.utcnow().isoformat()
+    system_ready.set()
+    if MODEL_WATCH_INTERVAL_SECONDS > 0:
+        threading.Thread(target=_watch_model_artifacts, daemon=True, name="model-watcher").start()
+    if os.getenv("SHADOW_MODEL_DIR"):
+        try:
+            start_shadow(os.environ["SHADOW_MODEL_DIR"])
+        except Exception as e:
+            print(f"Shadow model not started: {e}")
+    breakdown = ", ".join(
+        f"{name}={entry['seconds']}s" for name, entry in startup_report["phases"].items() if entry["seconds"] is not None
+    )
+    print(f"System ready in {startup_report['total_seconds']}s ({breakdown})")
+
+
+# --- MODEL HOT RELOAD ---
+# A reload loads the artifact set currently on disk into a new bundle, projects
+# the corpus and warms it up in the background, then publishes it with a single
+# reference swap. The score stage picks the bundle once per batch, so the swap
+# lands between batches and the running simulator/stats are untouched.
+model_reload_status = {
+    "state": "idle",           # idle | loading | swapped | failed
+    "trigger": None,
+    "started_at": None,
+    "finished_at": None,
+    "previous_version": None,
+    "model_version": None,
+    "error": None,
+    "reloads": 0,
+}
+_reload_lock = threading.Lock()
+MODEL_WATCH_INTERVAL_SECONDS = float(os.getenv("MODEL_WATCH_INTERVAL_SECONDS", "0"))  # 0 = no file watcher
+
+
+def _reload_model(trigger: str):
+    model_reload_status.update(state="loading", trigger=trigger, started_at=datetime.utcnow().isoformat(),
+                               finished_at=None, error=None)
+    try:
+        bundle = _prepare_artifacts(_load_artifacts())
+        previous = _current_model_version()
+        _publish_artifacts(bundle)
+        model_reload_status.update(state="swapped", previous_version=previous, model_version=bundle.version,
+                                   reloads=model_reload_status["reloads"] + 1)
+        print(f"Model hot-reloaded ({trigger}): {previous} -> {bundle.version}")
+    except Exception as e:
+        model_reload_status.update(state="failed", error=str(e))
+        print(f"Model reload failed ({trigger}), keeping {_current_model_version()}: {e}")
+    finally:
+        model_reload_status["finished_at"] = datetime.utcnow().isoformat()
+        _reload_lock.release()
+
+
+def request_model_reload(trigger: str) -> bool:
+    """Start a background reload; False if startup has not finished or a reload is running."""
+    if artifacts is None or not _reload_lock.acquire(blocking=False):
+        return False
+    threading.Thread(target=_reload_model, args=(trigger,), daemon=True, name="model-reload").start()
+    return True
+
+
+def _artifact_signature():
+    # train_model.py writes model_metadata.json after the model files, so it marks a complete set.
+    try:
+        return os.stat(MODEL_METADATA_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return None
 
-            except Exception as e:
-                print(f"Simulation Error: {e}")
-                db.rollback()
-            finally:
-                db.close() # Important to close session in thread loop
 
-        # Wait based on config speed
-        time.sleep(state.config["simulation_speed"])
+def _watch_model_artifacts():
+    current = _artifact_signature()
+    pending = None
+    while True:
+        time.sleep(MODEL_WATCH_INTERVAL_SECONDS)
+        signature = _artifact_signature()
+        if signature == current:
+            pending = None
+        elif signature != pending:
+            pending = signature  # wait one more interval for the writer to finish
+        elif request_model_reload("file watcher"):
+            current, pending = signature, None
+
+
+# --- SHADOW MODEL ---
+# A candidate artifact set (same file names as train_model.py writes, in its own
+# directory) scored on the same batches as the live model by a separate worker.
+# Results go to SHADOW_RESULTS_FILE and /api/model/shadow/compare; they never
+# influence AutoBlocked / ManualReview decisions.
+SHADOW_RESULTS_FILE = os.getenv("SHADOW_RESULTS_FILE", "shadow_predictions.csv")
+shadow: Optional[ShadowEvaluator] = None
+_shadow_lock = threading.Lock()
+
+
+def start_shadow(directory: str) -> ShadowEvaluator:
+    """Load the candidate in `directory` and start shadow-scoring live batches (replaces any running shadow)."""
+    global shadow
+    if not os.path.isdir(directory):
+        raise ValueError(f"Shadow model directory not found: {directory}")
+    candidate = ModelArtifacts.load(
+        directory,
+        prefer_unscaled=os.getenv("USE_UNSCALED_MODEL", "true").strip().lower() == "true",
+        use_fast_scorer=os.getenv("USE_FAST_SCORER", "true").strip().lower() == "true",
+    )
+    candidate.warm_up()
+    with _shadow_lock:
+        previous, shadow = shadow, ShadowEvaluator(candidate, SHADOW_RESULTS_FILE)
+    if previous is not None:
+        previous.close()
+    print(f"Shadow model {candidate.version} running from {directory}")
+    return shadow
+
+
+def stop_shadow() -> Optional[ShadowEvaluator]:
+    global shadow
+    with _shadow_lock:
+        previous, shadow = shadow, None
+    if previous is not None:
+        previous.close()
+    return previous
+
+
+def start_background_startup():
+    """Start loading assets in the background (idempotent)."""
+    global _startup_thread
+    with _startup_lock:
+        if _startup_thread is None:
+            _startup_thread = threading.Thread(target=_run_startup, daemon=True, name="startup-loader")
+            _startup_thread.start()
+    return _startup_thread
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_background_startup()
+    yield
+    ingest_pipeline.stop()
+    write_buffer.close()
+    await async_engine.dispose()
 
-# Start Simulation in Background Thread
-sim_thread = threading.Thread(target=traffic_simulator, daemon=True)
-sim_thread.start()
 
 # --- API ENDPOINTS ---
-app = FastAPI(title="Pixel Pioneers SOAR API")
+app = FastAPI(title="Pixel Pioneers SOAR API", lifespan=lifespan)
 from ai.router import router as ai_router
 
 # Allow Frontend (React/Next.js) to call this API
@@ -547,22 +1260,26 @@ def admin_login(body: AdminLoginRequest):
     }
 
 
-@app.get("/api/auth/admin/me")
-def admin_me(credentials: Optional[HTTPAuthorizationCredentials] = Depends(admin_auth_scheme)):
+def _require_admin(credentials: Optional[HTTPAuthorizationCredentials]):
     if not credentials or credentials.scheme.lower() != "bearer":
         raise HTTPException(status_code=401, detail="Admin authentication required")
     if not _is_admin_token_valid(credentials.credentials):
         raise HTTPException(status_code=401, detail="Invalid or expired admin token")
+
+
+@app.get("/api/auth/admin/me")
+def admin_me(credentials: Optional[HTTPAuthorizationCredentials] = Depends(admin_auth_scheme)):
+    _require_admin(credentials)
     return {"authenticated": True, "username": ADMIN_USERNAME}
 
 # === PORTAL A ENDPOINTS (Read-Only / Monitoring) ===
 
 @app.get("/api/system/health")
-def get_system_health(db: Session = Depends(get_db)):
+async def get_system_health(db: AsyncSession = Depends(get_async_db)):
     """For Page A0: System Overview"""
-    pending_count = db.query(ManualReview).filter(ManualReview.status == "PENDING").count()
+    pending_count = await _read_in_memory(pending_queue, pending_queue.committed_count)
     uptime_seconds = int(time.time() - state.stats["uptime_start"])
-    automation_rate = _compute_automation_rate_24h(db)
+    automation_rate = await _compute_automation_rate_24h(db)
     return {
         "status": _compute_system_status(pending_count),
         "uptime_seconds": uptime_seconds,
@@ -570,25 +1287,16 @@ def get_system_health(db: Session = Depends(get_db)):
         "automation_rate": f"{automation_rate:.1f}%"
     }
 
-def _severity_bucket(attack_type: str) -> str:
-    text = (attack_type or "").lower()
-    if "normal" in text:
-        return "low"
-    if any(token in text for token in ["ddos", "dos", "heartbleed", "infiltration", "botnet"]):
-        return "critical"
-    if any(token in text for token in ["brute", "patator", "sql", "xss", "web attack", "bot"]):
-        return "high"
-    if any(token in text for token in ["port", "scan"]):
-        return "medium"
-    return "medium"
-
-def _to_naive_utc(dt: Optional[datetime]) -> Optional[datetime]:
-    """Normalize DB datetimes so arithmetic/comparisons do not fail on tz-aware values."""
-    if dt is None:
-        return None
-    if dt.tzinfo is not None:
-        return dt.astimezone(timezone.utc).replace(tzinfo=None)
-    return dt
+
+@app.get("/api/system/ready")
+def get_system_ready():
+    """Readiness probe: 200 once models, corpus, DB and simulator are up, else 503 with progress."""
+    body = {
+        "ready": system_ready.is_set(),
+        "required_phases": list(REQUIRED_STARTUP_PHASES),
+        **startup_report,
+    }
+    return JSONResponse(status_code=200 if body["ready"] else 503, content=body)
 
 def _default_overview_metrics() -> dict:
     return {
@@ -612,112 +1320,56 @@ def _default_overview_metrics() -> dict:
         "review_threshold_percent": round(state.config["min_threshold"] * 100, 1),
         "db_latency_ms": 0.0,
         "api_latency_ms": 0.0,
-        "model_version": model_version,
+        "model_version": _current_model_version(),
     }
 
 @app.get("/api/metrics/overview")
-def get_overview_metrics(db: Session = Depends(get_db)):
+async def get_overview_metrics(db: AsyncSession = Depends(get_async_db)):
     """Unified metrics payload for client dashboards."""
     req_start = time.perf_counter()
     try:
-        now = datetime.utcnow()
-        day_ago = now - timedelta(hours=24)
-        half_day_ago = now - timedelta(hours=12)
-
         db_probe_start = time.perf_counter()
-        db.query(TrafficLog.id).limit(1).all()
+        await db.execute(select(TrafficLog.id).limit(1))
         db_latency_ms = round((time.perf_counter() - db_probe_start) * 1000, 1)
 
-        logs_24h = db.query(TrafficLog).filter(TrafficLog.timestamp >= day_ago).all()
-        logs_with_ts = []
-        for log in logs_24h:
-            ts = _to_naive_utc(log.timestamp)
-            if ts is None:
-                continue
-            logs_with_ts.append((log, ts))
-        threat_logs_24h = [log for log in logs_24h if log.type != "Normal Traffic"]
-
-        auto_24h = db.query(AutoBlocked).filter(AutoBlocked.timestamp >= day_ago).all()
-        auto_with_ts = [(_to_naive_utc(item.timestamp), item) for item in auto_24h]
-
-        manual_resolved_24h = db.query(ManualReview).filter(
-            ManualReview.status == "RESOLVED",
-            ManualReview.timestamp >= day_ago
-        ).all()
-        pending_count = db.query(ManualReview).filter(ManualReview.status == "PENDING").count()
-
-        traffic_last_12h = sum(1 for _, ts in logs_with_ts if ts >= half_day_ago)
-        traffic_prev_12h = len(logs_with_ts) - traffic_last_12h
+        rolling = await _read_in_memory(overview_metrics, overview_metrics.overview)
+        pending_count = await _read_in_memory(pending_queue, pending_queue.committed_count)
+
+        traffic_last_12h = rolling["traffic_last_12h"]
+        traffic_prev_12h = rolling["traffic_prev_12h"]
         if traffic_prev_12h == 0:
             traffic_change_percent = 100.0 if traffic_last_12h > 0 else 0.0
         else:
             traffic_change_percent = ((traffic_last_12h - traffic_prev_12h) / traffic_prev_12h) * 100.0
 
-        traffic_bars_24h = [0] * 12
-        for _, ts in logs_with_ts:
-            delta_hours = (now - ts).total_seconds() / 3600.0
-            if 0 <= delta_hours < 24:
-                idx = 11 - int(delta_hours // 2)
-                traffic_bars_24h[max(0, min(11, idx))] += 1
-
-        severity = {"critical": 0, "high": 0, "medium": 0, "low": 0}
-        for log in threat_logs_24h:
-            severity[_severity_bucket(log.type)] += 1
-
-        decision_velocity = []
-        for slot in range(6):
-            slot_end = now - timedelta(hours=slot * 4)
-            slot_start = slot_end - timedelta(hours=4)
-
-            automated = sum(
-                1 for ts, _ in auto_with_ts
-                if ts and slot_start <= ts < slot_end
-            )
-            human = 0
-            for item in manual_resolved_24h:
-                ts = _to_naive_utc(item.timestamp)
-                if ts and slot_start <= ts < slot_end:
-                    human += 1
-            decision_velocity.append({"automated": automated, "human": human})
-        decision_velocity.reverse()
-
-        response_times = []
-        false_positives = 0
-        for item in manual_resolved_24h:
-            ts_created = _to_naive_utc(item.timestamp)
-            ts_resolved = _to_naive_utc(item.resolved_at)
-            if ts_created and ts_resolved and ts_resolved >= ts_created:
-                response_times.append((ts_resolved - ts_created).total_seconds())
-            if item.action_taken == "FALSE_POSITIVE":
-                false_positives += 1
-        mean_time_to_respond_seconds = int(sum(response_times) / len(response_times)) if response_times else 0
-
-        automation_rate_value = _compute_automation_rate_24h(db)
+        auto_blocked_24h = rolling["auto_blocked"]
+        automation_rate_value = await _compute_automation_rate_24h(db)
         health_score = _compute_health_score(pending_count, automation_rate_value)
-        analyst_hours_saved = round((len(auto_24h) * 15) / 60.0, 1)
-        false_positive_rate = (100.0 * false_positives / len(manual_resolved_24h)) if manual_resolved_24h else 0.0
+        analyst_hours_saved = round((auto_blocked_24h * 15) / 60.0, 1)
+        resolved_24h = rolling["resolved"]
+        false_positive_rate = (100.0 * rolling["false_positives"] / resolved_24h) if resolved_24h else 0.0
 
         payload = {
             "status": _compute_system_status(pending_count),
             "traffic_processed": f"{state.stats['scanned'] / 1000:.1f}k",
             "traffic_change_percent": round(traffic_change_percent, 1),
-            "traffic_bars_24h": traffic_bars_24h,
+            "traffic_bars_24h": rolling["traffic_bars_24h"],
             "system_health_score": health_score,
             "automation_rate": f"{automation_rate_value:.1f}%",
             "automation_rate_value": round(automation_rate_value, 1),
-            "active_threats": len(threat_logs_24h),
-            "blocked_ips_24h": len(auto_24h),
-            "avg_blocked_per_hour": round(len(auto_24h) / 24.0, 1),
-            "mean_time_to_respond_seconds": mean_time_to_respond_seconds,
-            "severity_distribution": severity,
-            "decision_velocity": decision_velocity,
+            "active_threats": rolling["active_threats"],
+            "blocked_ips_24h": auto_blocked_24h,
+            "avg_blocked_per_hour": round(auto_blocked_24h / 24.0, 1),
+            "mean_time_to_respond_seconds": rolling["mean_time_to_respond_seconds"],
+            "severity_distribution": rolling["severity_distribution"],
+            "decision_velocity": rolling["decision_velocity"],
             "escalated_count": pending_count,
             "analyst_hours_saved": analyst_hours_saved,
             "false_positive_rate": round(false_positive_rate, 2),
             "auto_block_threshold_percent": round(state.config["auto_block_threshold"] * 100, 1),
             "review_threshold_percent": round(state.config["min_threshold"] * 100, 1),
             "db_latency_ms": db_latency_ms,
-            "model_version": model_version,
+            "model_version": _current_model_version(),
         }
         payload["api_latency_ms"] = round((time.perf_counter() - req_start) * 1000, 1)
         return payload
@@ -733,35 +1385,119 @@ def get_overview_metrics(db: Session = Depends(get_db)):
 @app.get("/api/model/info")
 def get_model_info():
     """Expose current model metadata/version for debugging and governance."""
+    bundle = artifacts
+    info = bundle.info() if bundle is not None else {"model_version": "unknown", "feature_count": 0}
     return {
-        "model_version": model_version,
-        "metadata": model_metadata,
-        "feature_count": len(feature_columns),
+        **info,
+        "metadata": bundle.metadata if bundle is not None else {},
         "feature_file": FEATURE_FILE,
+        "scoring_workers": scoring_pool.n_workers if scoring_pool is not None else 0,
+        "reload": model_reload_status,
     }
 
 
+@app.post("/api/model/reload", status_code=202)
+def reload_model(credentials: Optional[HTTPAuthorizationCredentials] = Depends(admin_auth_scheme)):
+    """Load the artifacts on disk in the background and swap them in between batches (admin only)."""
+    _require_admin(credentials)
+    _require_model()
+    if not request_model_reload("api"):
+        raise HTTPException(status_code=409, detail="A model reload is already in progress")
+    return {"status": "reloading", "reload": model_reload_status}
+
+
+class ShadowStartRequest(BaseModel):
+    directory: str
+
+
+@app.post("/api/model/shadow")
+def start_shadow_model(body: ShadowStartRequest,
+                       credentials: Optional[HTTPAuthorizationCredentials] = Depends(admin_auth_scheme)):
+    """Run the candidate artifacts in `directory` in shadow next to the live model (admin only)."""
+    _require_admin(credentials)
+    _require_model()
+    try:
+        evaluator = start_shadow(body.directory)
+    except (ValueError, OSError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "shadowing", **evaluator.compare()}
+
+
+@app.delete("/api/model/shadow")
+def stop_shadow_model(credentials: Optional[HTTPAuthorizationCredentials] = Depends(admin_auth_scheme)):
+    """Stop shadow scoring; returns the final comparison (admin only)."""
+    _require_admin(credentials)
+    evaluator = stop_shadow()
+    if evaluator is None:
+        raise HTTPException(status_code=404, detail="No shadow model running")
+    return {"status": "stopped", **evaluator.compare()}
+
+
+@app.get("/api/model/shadow/compare")
+def compare_shadow_model():
+    """Live vs shadow: agreement rate, per-class confusion and latency overhead."""
+    evaluator = shadow
+    if evaluator is None:
+        raise HTTPException(status_code=404, detail="No shadow model running")
+    return evaluator.compare()
+
+
+@app.get("/api/pipeline/status")
+def get_pipeline_status():
+    """Queue depth and latency per ingestion stage (source -> score -> decide -> enrich -> persist)."""
+    status = ingest_pipeline.status()
+    status["pending_in_flight"] = pending_queue.in_flight_count()
+    status["pending_queue"] = pending_queue.status()
+    status["overview_metrics"] = overview_metrics.status()
+    status["replay"] = replay_scheduler.status()
+    status["ingest_source"] = state.config.get("ingest_source", "replay")
+    status["live_source"] = flow_source.status() if flow_source is not None else None
+    status["scoring"] = _cascade_status()
+    status["prediction_cache"] = prediction_cache.status()
+    status["write_buffer"] = write_buffer.status()
+    return status
+
+
+@app.get("/api/storage/partitions")
+def get_storage_partitions():
+    """Partitioning mode, retention and per-table daily partitions of traffic_logs / auto_blocked."""
+    return partitions.status()
+
+
+@app.post("/api/storage/partitions/maintain")
+def run_partition_maintenance(credentials: Optional[HTTPAuthorizationCredentials] = Depends(admin_auth_scheme)):
+    """Create upcoming partitions and apply retention now instead of waiting for the job (admin only)."""
+    _require_admin(credentials)
+    if not partitions.active_tables:
+        raise HTTPException(status_code=409, detail="Daily partitioning is not active")
+    partitions.maintain()
+    return partitions.status()
+
+
 @app.get("/api/model/drift")
-def get_model_drift(db: Session = Depends(get_db)):
+async def get_model_drift(db: AsyncSession = Depends(get_async_db)):
     """Simple z-score drift monitor against training baseline."""
+    bundle = artifacts
+    feature_baseline = bundle.baseline if bundle is not None else {}
     if not feature_baseline or "mean" not in feature_baseline or "std" not in feature_baseline:
         return {"status": "unavailable", "reason": "feature baseline artifact missing"}
 
-    logs = db.query(TrafficLog).order_by(TrafficLog.timestamp.desc()).limit(200).all()
-    snapshots = []
-    for log in logs:
-        if not log.feature_snapshot:
-            continue
-        try:
-            snapshots.append(json.loads(log.feature_snapshot))
-        except Exception:
-            continue
-
-    if not snapshots:
+    rows = await db.run_sync(lambda session: partitions.newest_first(
+        session.query(TrafficLog.feature_vector).filter(TrafficLog.feature_vector.isnot(None)),
+        TrafficLog.timestamp, 200,
+    ))
+    if not rows:
         return {"status": "unavailable", "reason": "no feature snapshots available yet"}
 
-    live_df = pd.DataFrame(snapshots).replace([np.inf, -np.inf], np.nan).fillna(0.0)
-    live_means = live_df.mean(numeric_only=True).to_dict()
+    # Columns a stored row's schema lacks come back NaN and are left out of its mean.
+    live = decode_matrix([r.feature_vector for r in rows], bundle.feature_columns, snapshot_schemas, fill=np.nan)
+    live[np.isinf(live)] = 0.0
+    present = ~np.isnan(live)
+    counts = present.sum(axis=0)
+    sums = np.where(present, live, 0.0).sum(axis=0, dtype=np.float64)
+    live_means = {
+        name: sums[j] / counts[j] for j, name in enumerate(bundle.feature_columns) if counts[j] > 0
+    }
     train_mean = feature_baseline.get("mean", {})
     train_std = feature_baseline.get("std", {})
 
@@ -777,40 +1513,126 @@ def get_model_drift(db: Session = Depends(get_db)):
     avg = float(np.mean(list(drift_scores.values()))) if drift_scores else 0.0
     return {
         "status": "ok",
-        "model_version": model_version,
-        "sample_size": len(snapshots),
+        "model_version": bundle.version,
+        "sample_size": len(rows),
         "average_z_drift": round(avg, 4),
         "top_drift_features": [{"feature": k, "z_score": v} for k, v in top],
     }
 
 @app.get("/api/traffic/live")
-def get_live_traffic(db: Session = Depends(get_db)):
+async def get_live_traffic(db: AsyncSession = Depends(get_async_db)):
     """For Page A1: Command Center & A4: Event Stream"""
     # Get last 20 logs from DB
-    logs = db.query(TrafficLog).order_by(TrafficLog.timestamp.desc()).limit(20).all()
+    logs = await db.run_sync(
+        lambda session: partitions.newest_first(session.query(TrafficLog), TrafficLog.timestamp, 20)
+    )
     return logs
 
+@app.get("/api/traffic/{log_id}/explanation")
+def get_traffic_explanation(log_id: int, db: Session = Depends(get_db)):
+    """Compute (once), cache and store the model explanation for a traffic log."""
+    with _explanation_cache_lock:
+        cached = _explanation_cache.get(log_id)
+        if cached is not None:
+            _explanation_cache.move_to_end(log_id)
+    if cached is not None:
+        explanation, version = cached
+        return {"id": log_id, "explanation": explanation, "source": "cache", "model_version": version}
+
+    log = db.query(TrafficLog).filter(TrafficLog.id == log_id).first()
+    if not log:
+        raise HTTPException(status_code=404, detail="Traffic log not found")
+
+    source = "stored"
+    explanation = log.explanation
+    if not explanation:
+        if not log.feature_vector:
+            raise HTTPException(status_code=409, detail="No feature snapshot stored for this log")
+        bundle = _require_model()
+        explanation = _explain_feature_snapshots(bundle, [log.feature_vector], [log.type])[0]
+        log.explanation = explanation
+        db.commit()
+        source = "computed"
+
+    with _explanation_cache_lock:
+        _explanation_cache[log_id] = (explanation, log.model_version)
+        while len(_explanation_cache) > EXPLANATION_CACHE_SIZE:
+            _explanation_cache.popitem(last=False)
+    return {"id": log_id, "explanation": explanation, "source": source, "model_version": log.model_version}
+
+# Rows one backfill call may explain; larger backlogs take several calls.
+EXPLANATION_BACKFILL_MAX_ROWS = int(os.getenv("EXPLANATION_BACKFILL_MAX_ROWS", "2000"))
+
+
+class ExplanationBackfillRequest(BaseModel):
+    target: str = "manual_review" # "manual_review" or "traffic_logs"
+    limit: int = 500
+    mode: Optional[str] = None    # "exact" or "approx"; defaults to config explanation_mode
+
+
+@app.post("/api/explanations/backfill")
+def backfill_explanations(body: ExplanationBackfillRequest, db: Session = Depends(get_db),
+                          credentials: Optional[HTTPAuthorizationCredentials] = Depends(admin_auth_scheme)):
+    """Explain a backlog of rows (e.g. pending reviews, audit exports) in one batched call."""
+    _require_admin(credentials)
+    bundle = _require_model()
+    if not (1 <= body.limit <= EXPLANATION_BACKFILL_MAX_ROWS):
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {EXPLANATION_BACKFILL_MAX_ROWS}")
+    if body.mode is not None and body.mode not in EXPLANATION_MODES:
+        raise HTTPException(status_code=400, detail="Invalid explanation mode")
+    if body.target == "manual_review":
+        query = db.query(ManualReview).options(undefer(ManualReview.feature_vector))
+        query = query.order_by(ManualReview.timestamp.desc())
+        query = query.filter(ManualReview.explanation.is_(None), ManualReview.feature_vector.isnot(None))
+    elif body.target == "traffic_logs":
+        query = db.query(TrafficLog).options(undefer(TrafficLog.feature_vector))
+        query = query.order_by(TrafficLog.timestamp.desc())
+        query = query.filter(TrafficLog.explanation.is_(None), TrafficLog.feature_vector.isnot(None))
+    else:
+        raise HTTPException(status_code=400, detail="target must be manual_review or traffic_logs")
+
+    rows = query.limit(body.limit).all()
+    if not rows:
+        return {"status": "ok", "explained": 0}
+
+    start = time.perf_counter()
+    explanations = _explain_feature_snapshots(
+        bundle,
+        [r.feature_vector for r in rows], [r.type for r in rows], mode=body.mode
+    )
+    for row, explanation in zip(rows, explanations):
+        row.explanation = explanation
+    db.commit()
+    return {
+        "status": "ok",
+        "explained": len(rows),
+        "mode": body.mode or state.config.get("explanation_mode", "exact"),
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
+
 @app.get("/api/threats/map")
-def get_threat_map(db: Session = Depends(get_db)):
+async def get_threat_map(db: AsyncSession = Depends(get_async_db)):
     """For Page A3: Global Map"""
     # Filter only threats from last 100 logs
-    logs = db.query(TrafficLog).filter(TrafficLog.type != "Normal Traffic").order_by(TrafficLog.timestamp.desc()).limit(100).all()
+    logs = await db.run_sync(lambda session: partitions.newest_first(
+        session.query(TrafficLog).filter(TrafficLog.type != "Normal Traffic"), TrafficLog.timestamp, 100
+    ))
     return logs
 
 
 @app.get("/api/threats/map/batches")
-def get_threat_map_batches(batch_size: int = 10, limit: int = 200, db: Session = Depends(get_db)):
+async def get_threat_map_batches(batch_size: int = 10, limit: int = 200,
+                                 db: AsyncSession = Depends(get_async_db)):
     """Return threat-map events grouped into JSON batches (default 10 logs per batch)."""
     safe_batch = max(1, min(batch_size, 50))
     safe_limit = max(10, min(limit, 1000))
 
-    logs = (
-        db.query(TrafficLog)
-        .filter(TrafficLog.type != "Normal Traffic")
+    logs = (await db.scalars(
+        select(TrafficLog)
+        .where(TrafficLog.type != "Normal Traffic")
         .order_by(TrafficLog.timestamp.asc())
         .limit(safe_limit)
-        .all()
-    )
+    )).all()
 
     events = []
     for log in logs:
@@ -837,9 +1659,9 @@ def get_threat_map_batches(batch_size: int = 10, limit: int = 200, db: Session =
 # === PORTAL B ENDPOINTS (Admin / Action) ===
 
 @app.get("/api/incidents/pending")
-def get_pending_incidents(db: Session = Depends(get_db)):
+async def get_pending_incidents(db: AsyncSession = Depends(get_async_db)):
     """For Page B1 & B2: Analyst Queue"""
-    return db.query(ManualReview).filter(ManualReview.status == "PENDING").all()
+    return (await db.scalars(select(ManualReview).where(ManualReview.status == "PENDING"))).all()
 
 class ActionRequest(BaseModel):
     action: str # "BLOCK" or "IGNORE"
@@ -856,6 +1678,8 @@ def resolve_incident(packet_id: int, req: ActionRequest, db: Session = Depends(g
         raise HTTPException(status_code=404, detail="Incident not found or already resolved")
 
     # Update Status
+    was_pending = incident.status == "PENDING"
+    previous_resolution = None if was_pending else (incident.resolved_at, incident.action_taken)
     incident.status = "RESOLVED"
     incident.action_taken = "MANUAL_BLOCK" if req.action == "BLOCK" else "FALSE_POSITIVE"
     incident.analyst_id = req.analyst_id
@@ -876,7 +1700,10 @@ def resolve_incident(packet_id: int, req: ActionRequest, db: Session = Depends(g
         related_log.action = "MANUAL_BLOCK" if req.action == "BLOCK" else "FALSE_POSITIVE"
         # Capture analyst feedback for future retraining.
         try:
-            snap = json.loads(related_log.feature_snapshot) if related_log.feature_snapshot else {}
+            # Packed snapshot as base64 (self-describing: it starts with the feature-schema hash).
+            snapshot = ""
+            if related_log.feature_vector:
+                snapshot = base64.b64encode(bytes(related_log.feature_vector)).decode("ascii")
             feedback_label = "Normal Traffic" if req.action != "BLOCK" else incident.type
             row = {
                 "timestamp": datetime.utcnow().isoformat(),
@@ -885,8 +1712,8 @@ def resolve_incident(packet_id: int, req: ActionRequest, db: Session = Depends(g
                 "corrected_type": feedback_label,
                 "is_correct": req.is_correct,
                 "action_taken": incident.action_taken,
-                "model_version": related_log.model_version or model_version,
-                "feature_snapshot": json.dumps(snap),
+                "model_version": related_log.model_version or _current_model_version(),
+                "feature_snapshot": snapshot,
             }
             file_exists = os.path.exists(TRAINING_FEEDBACK_FILE)
             with open(TRAINING_FEEDBACK_FILE, "a", newline="", encoding="utf-8") as f:
@@ -897,16 +1724,21 @@ def resolve_incident(packet_id: int, req: ActionRequest, db: Session = Depends(g
         except Exception as e:
             print(f"Failed to append feedback row: {e}")
         
-    db.commit()
+    with pending_queue.mutation(), overview_metrics.mutation():
+        db.commit()
+        if was_pending:
+            pending_queue.mark_resolved(incident.type)
+        overview_metrics.record_resolution(incident.timestamp, incident.resolved_at, incident.action_taken,
+                                           previous=previous_resolution)
     
     return {"status": "success", "action_taken": req.action}
 
 @app.get("/api/logs/audit")
-def get_audit_log(db: Session = Depends(get_db)):
+async def get_audit_log(db: AsyncSession = Depends(get_async_db)):
     """For Page B3: Audit Logs"""
     # Fetch resolved manual reviews + auto blocked (limit 50 combined for now)
-    manual_logs = db.query(ManualReview).filter(ManualReview.status == "RESOLVED").limit(25).all()
-    auto_logs = db.query(AutoBlocked).limit(25).all()
+    manual_logs = (await db.scalars(select(ManualReview).where(ManualReview.status == "RESOLVED").limit(25))).all()
+    auto_logs = (await db.scalars(select(AutoBlocked).limit(25))).all()
     
     # We simulate a unified log structure for the frontend
     combined = []
@@ -956,18 +1788,46 @@ class ConfigUpdateBody(BaseModel):
     auto_resolve_pending_enabled: Optional[bool] = None
     pending_auto_resolve_queue_trigger: Optional[int] = None
     pending_auto_resolve_delta: Optional[float] = None
+    inference_batch_size: Optional[int] = None
+    inference_batch_max_wait_ms: Optional[float] = None
+    eager_explanations: Optional[bool] = None
+    explanation_mode: Optional[str] = None
+    scoring_workers: Optional[int] = None
+    scoring_mode: Optional[str] = None
+    prediction_cache_enabled: Optional[bool] = None
+    write_buffer_rows: Optional[int] = None
+    write_buffer_max_wait_ms: Optional[float] = None
+    write_durability: Optional[str] = None
+    simulation_speed: Optional[float] = None
+    replay_target_pps: Optional[float] = None
+    replay_profile: Optional[str] = None
+    replay_burst_multiplier: Optional[float] = None
+    replay_burst_seconds: Optional[float] = None
+    replay_burst_period_seconds: Optional[float] = None
+    replay_diurnal_period_seconds: Optional[float] = None
+    replay_diurnal_amplitude: Optional[float] = None
+    ingest_source: Optional[str] = None
+    ingest_csv_path: Optional[str] = None
+    ingest_socket_host: Optional[str] = None
+    ingest_socket_port: Optional[int] = None
 
 
 @app.get("/api/config/current")
 def get_current_config():
     return {
         "config": state.config,
-        "model_version": model_version,
+        "model_version": _current_model_version(),
     }
 
 
 @app.post("/api/config/update-body")
-def update_config_body(body: ConfigUpdateBody):
+def update_config_body(body: ConfigUpdateBody,
+                       credentials: Optional[HTTPAuthorizationCredentials] = Depends(admin_auth_scheme)):
+    # Settings that open files, bind sockets or start processes.
+    admin_keys = (body.ingest_source, body.ingest_csv_path, body.ingest_socket_host, body.ingest_socket_port,
+                  body.scoring_workers)
+    if any(value is not None for value in admin_keys):
+        _require_admin(credentials)
     if body.threshold is not None:
         if not (0.0 <= body.threshold <= 1.0):
             raise HTTPException(status_code=400, detail="Invalid threshold")
@@ -988,6 +1848,84 @@ def update_config_body(body: ConfigUpdateBody):
         state.config["pending_auto_resolve_queue_trigger"] = int(body.pending_auto_resolve_queue_trigger)
     if body.pending_auto_resolve_delta is not None:
         state.config["pending_auto_resolve_delta"] = float(body.pending_auto_resolve_delta)
+    if body.inference_batch_size is not None:
+        if not (1 <= body.inference_batch_size <= 4096):
+            raise HTTPException(status_code=400, detail="Invalid inference_batch_size")
+        state.config["inference_batch_size"] = int(body.inference_batch_size)
+    if body.inference_batch_max_wait_ms is not None:
+        if not (0.0 <= body.inference_batch_max_wait_ms <= 10000.0):
+            raise HTTPException(status_code=400, detail="Invalid inference_batch_max_wait_ms")
+        state.config["inference_batch_max_wait_ms"] = float(body.inference_batch_max_wait_ms)
+    if body.eager_explanations is not None:
+        state.config["eager_explanations"] = bool(body.eager_explanations)
+    if body.explanation_mode is not None:
+        if body.explanation_mode not in EXPLANATION_MODES:
+            raise HTTPException(status_code=400, detail="Invalid explanation_mode")
+        state.config["explanation_mode"] = body.explanation_mode
+    if body.scoring_workers is not None:
+        if not (0 <= body.scoring_workers <= MAX_SCORING_WORKERS):
+            raise HTTPException(status_code=400, detail=f"scoring_workers must be between 0 and {MAX_SCORING_WORKERS}")
+        state.config["scoring_workers"] = int(body.scoring_workers)
+    if body.scoring_mode is not None:
+        if body.scoring_mode not in SCORING_MODES:
+            raise HTTPException(status_code=400, detail="Invalid scoring_mode")
+        state.config["scoring_mode"] = body.scoring_mode
+    if body.prediction_cache_enabled is not None:
+        state.config["prediction_cache_enabled"] = bool(body.prediction_cache_enabled)
+    if body.write_buffer_rows is not None:
+        if not (1 <= body.write_buffer_rows <= 20000):
+            raise HTTPException(status_code=400, detail="Invalid write_buffer_rows")
+        state.config["write_buffer_rows"] = int(body.write_buffer_rows)
+    if body.write_buffer_max_wait_ms is not None:
+        if not (0.0 <= body.write_buffer_max_wait_ms <= 10000.0):
+            raise HTTPException(status_code=400, detail="Invalid write_buffer_max_wait_ms")
+        state.config["write_buffer_max_wait_ms"] = float(body.write_buffer_max_wait_ms)
+    if body.write_durability is not None:
+        if body.write_durability not in WRITE_DURABILITY_MODES:
+            raise HTTPException(status_code=400, detail="Invalid write_durability")
+        state.config["write_durability"] = body.write_durability
+    if body.simulation_speed is not None:
+        if not (0.0 <= body.simulation_speed <= 60.0):
+            raise HTTPException(status_code=400, detail="Invalid simulation_speed")
+        state.config["simulation_speed"] = float(body.simulation_speed)
+    if body.replay_target_pps is not None:
+        if not (0.0 <= body.replay_target_pps <= 1_000_000.0):
+            raise HTTPException(status_code=400, detail="Invalid replay_target_pps")
+        state.config["replay_target_pps"] = float(body.replay_target_pps)
+    if body.replay_profile is not None:
+        if body.replay_profile not in REPLAY_PROFILES:
+            raise HTTPException(status_code=400, detail="Invalid replay_profile")
+        state.config["replay_profile"] = body.replay_profile
+    if body.replay_burst_multiplier is not None:
+        if not (1.0 <= body.replay_burst_multiplier <= 1000.0):
+            raise HTTPException(status_code=400, detail="Invalid replay_burst_multiplier")
+        state.config["replay_burst_multiplier"] = float(body.replay_burst_multiplier)
+    for key in ("replay_burst_seconds", "replay_burst_period_seconds", "replay_diurnal_period_seconds"):
+        value = getattr(body, key)
+        if value is not None:
+            if value <= 0:
+                raise HTTPException(status_code=400, detail=f"Invalid {key}")
+            state.config[key] = float(value)
+    if body.replay_diurnal_amplitude is not None:
+        if not (0.0 <= body.replay_diurnal_amplitude <= 0.95):
+            raise HTTPException(status_code=400, detail="Invalid replay_diurnal_amplitude")
+        state.config["replay_diurnal_amplitude"] = float(body.replay_diurnal_amplitude)
+    if body.ingest_source is not None:
+        if body.ingest_source not in FLOW_SOURCE_KINDS:
+            raise HTTPException(status_code=400, detail="Invalid ingest_source")
+        state.config["ingest_source"] = body.ingest_source
+    if body.ingest_csv_path is not None:
+        if _ingest_csv_path(body.ingest_csv_path) is None:
+            raise HTTPException(status_code=400, detail=f"ingest_csv_path must be inside {INGEST_CSV_DIR}")
+        state.config["ingest_csv_path"] = body.ingest_csv_path
+    if body.ingest_socket_host is not None:
+        if body.ingest_socket_host not in INGEST_SOCKET_HOSTS:
+            raise HTTPException(status_code=400, detail="Invalid ingest_socket_host")
+        state.config["ingest_socket_host"] = body.ingest_socket_host
+    if body.ingest_socket_port is not None:
+        if not (1 <= body.ingest_socket_port <= 65535):
+            raise HTTPException(status_code=400, detail="Invalid ingest_socket_port")
+        state.config["ingest_socket_port"] = int(body.ingest_socket_port)
 
     if state.config["min_threshold"] > state.config["max_threshold"]:
         raise HTTPException(status_code=400, detail="min_threshold cannot exceed max_threshold")
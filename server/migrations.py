@@ -0,0 +1,173 @@
+"""
+Versioned schema migrations.
+
+init_db() runs migrate(): every migration in MIGRATIONS whose version is not
+yet recorded in schema_migrations runs in its own transaction together with
+the row that records it, so a failed migration leaves nothing half-applied and
+is retried on the next start. Version 1 is the baseline (create_all, a no-op
+on databases that already have the tables); schema changes after it are new
+entries at the end of MIGRATIONS, never edits to applied ones. Because a fresh
+database gets the current models from the baseline, later migrations must
+tolerate finding their tables/columns already there. On PostgreSQL an advisory lock
+serializes concurrent starts (several API workers).
+"""
+
+from __future__ import annotations
+
+import json
+from collections import defaultdict
+from datetime import datetime
+from typing import Callable, List, NamedTuple
+
+import numpy as np
+from sqlalchemy import Column, DateTime, Integer, LargeBinary, MetaData, String, Table, inspect, select, text
+
+from db_capabilities import capabilities
+from snapshots import encode_rows, schema_hash, store_schema
+
+MIGRATION_LOCK_ID = 4_010_021  # pg_advisory_lock key, any constant unique to this app
+
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("name", String),
+    Column("applied_at", DateTime),
+)
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    apply: Callable  # (connection, models metadata) -> None
+
+
+def _baseline(conn, metadata: MetaData) -> None:
+    metadata.create_all(bind=conn)
+
+
+# Matched to the hot dashboard queries; partial indexes keep the threat and
+# pending-queue indexes small because most rows are Normal Traffic / RESOLVED.
+# On partitioned tables, PostgreSQL creates them on every partition.
+# (name, table, columns, partial-index predicate or None)
+DASHBOARD_INDEXES = [
+    # /api/metrics/overview 24h windows, /api/traffic/live, drift sample
+    ("ix_traffic_logs_timestamp", "traffic_logs", "timestamp", None),
+    ("ix_auto_blocked_timestamp", "auto_blocked", "timestamp", None),
+    # get_threat_map / threat-map batches: type != 'Normal Traffic' ORDER BY timestamp
+    ("ix_traffic_logs_threats_ts", "traffic_logs", "timestamp", "type <> 'Normal Traffic'"),
+    # _compute_automation_rate_24h: threats and auto-blocks of one model version in a window
+    ("ix_traffic_logs_version_threats_ts", "traffic_logs", "model_version, timestamp", "type <> 'Normal Traffic'"),
+    ("ix_traffic_logs_version_action_ts", "traffic_logs", "model_version, action, timestamp", None),
+    # get_pending_incidents and the pending-queue reconcile (GROUP BY type)
+    ("ix_manual_review_pending_type", "manual_review", "type", "status = 'PENDING'"),
+    # overview: resolved reviews in the last 24h
+    ("ix_manual_review_status_ts", "manual_review", "status, timestamp", None),
+]
+
+
+def _dashboard_indexes(conn, metadata: MetaData) -> None:
+    partial = capabilities(conn).partial_indexes
+    for name, table, columns, where in DASHBOARD_INDEXES:
+        statement = f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"
+        if where and partial:
+            statement += f" WHERE {where}"  # without partial indexes: a full index on the same columns
+        conn.execute(text(statement))
+
+
+SNAPSHOT_TABLES = ("traffic_logs", "manual_review")
+SNAPSHOT_BATCH_ROWS = 5000
+
+
+def _pack_json_snapshots(conn, table: str) -> int:
+    """Re-encode legacy JSON feature_snapshot rows of `table` as packed feature_vector blobs."""
+    converted = 0
+    known_schemas = set()
+    last_id = 0
+    while True:
+        rows = conn.execute(text(
+            f"SELECT id, feature_snapshot FROM {table} "
+            f"WHERE id > :last_id AND feature_snapshot IS NOT NULL AND feature_vector IS NULL "
+            f"ORDER BY id LIMIT {SNAPSHOT_BATCH_ROWS}"
+        ), {"last_id": last_id}).all()
+        if not rows:
+            return converted
+        last_id = rows[-1][0]
+        by_schema = defaultdict(list)  # schema -> [(id, values)]
+        for row_id, snapshot in rows:
+            try:
+                snap = json.loads(snapshot)
+                columns = list(snap.keys())
+                values = [float(snap[name]) for name in columns]
+            except (ValueError, TypeError, AttributeError):
+                continue  # unreadable rows keep their JSON
+            schema = schema_hash(columns)
+            if schema not in known_schemas:
+                store_schema(conn, schema, columns)
+                known_schemas.add(schema)
+            by_schema[schema].append((row_id, values))
+        for schema, items in by_schema.items():
+            blobs = encode_rows(schema, np.array([values for _, values in items], dtype=np.float32))
+            conn.execute(
+                text(f"UPDATE {table} SET feature_vector = :blob, feature_snapshot = NULL WHERE id = :id"),
+                [{"id": row_id, "blob": blob} for (row_id, _), blob in zip(items, blobs)],
+            )
+            converted += len(items)
+
+
+def _packed_snapshots(conn, metadata: MetaData) -> None:
+    metadata.tables["feature_schemas"].create(bind=conn, checkfirst=True)
+    blob_type = LargeBinary().compile(dialect=conn.dialect)
+    for table in SNAPSHOT_TABLES:
+        if "feature_vector" not in {c["name"] for c in inspect(conn).get_columns(table)}:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN feature_vector {blob_type}"))
+        converted = _pack_json_snapshots(conn, table)
+        if converted:
+            print(f"Packed {converted} JSON feature snapshots in {table}.")
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "baseline tables", _baseline),
+    Migration(2, "dashboard query indexes", _dashboard_indexes),
+    Migration(3, "packed float32 feature snapshots", _packed_snapshots),
+]
+
+
+def applied_versions(conn) -> List[int]:
+    schema_migrations.create(bind=conn, checkfirst=True)
+    return sorted(conn.execute(select(schema_migrations.c.version)).scalars().all())
+
+
+def migrate(engine, metadata: MetaData) -> List[int]:
+    """Apply pending migrations in order; returns the versions applied now."""
+    applied_now = []
+    with engine.connect() as lock_conn:
+        use_lock = capabilities(engine).advisory_locks
+        if use_lock:
+            lock_conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+            lock_conn.commit()
+        try:
+            with engine.begin() as conn:
+                done = set(applied_versions(conn))
+            for migration in MIGRATIONS:
+                if migration.version in done:
+                    continue
+                with engine.begin() as conn:
+                    migration.apply(conn, metadata)
+                    conn.execute(schema_migrations.insert().values(
+                        version=migration.version, name=migration.name, applied_at=datetime.utcnow()
+                    ))
+                applied_now.append(migration.version)
+                print(f"Applied schema migration {migration.version}: {migration.name}")
+        finally:
+            if use_lock:
+                lock_conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+                lock_conn.commit()
+    return applied_now
+
+
+def drop_schema(engine, metadata: MetaData) -> None:
+    """Drop every model table and the migration history (RESET_DB_ON_START)."""
+    metadata.drop_all(bind=engine)
+    schema_migrations.drop(bind=engine, checkfirst=True)
+
@@ -0,0 +1,213 @@
+"""
+One consistent set of model artifacts.
+
+ModelArtifacts bundles everything that must change together on a model
+update: the calibrated model, explainer, scaler, label encoder, feature
+columns, metadata/version, the native fast scorer, the optional cascade
+prefilter and the replay corpus
+already projected into this model's input space. Readers take a reference to
+the current bundle once per batch, so a hot reload only has to swap that one
+reference and no batch can see a mix of old and new artifacts.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from datetime import datetime
+from typing import Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from fast_scorer import FastScorer, Prefilter
+from snapshots import schema_hash
+
+MODEL_FILE = 'multiclass_xgboost_ids.joblib'
+EXPLAIN_MODEL_FILE = 'xgboost_explainer.joblib'
+UNSCALED_MODEL_FILE = 'multiclass_xgboost_ids_unscaled.joblib'
+UNSCALED_EXPLAIN_MODEL_FILE = 'xgboost_explainer_unscaled.joblib'
+SCALER_FILE = 'scaler.joblib'
+LABEL_ENCODER_FILE = 'label_encoder.joblib'
+FEATURE_FILE = 'feature_columns.json'
+MODEL_METADATA_FILE = 'model_metadata.json'
+FEATURE_BASELINE_FILE = 'feature_baseline.json'
+PREFILTER_FILE = 'prefilter_xgboost.joblib'
+UNSCALED_PREFILTER_FILE = 'prefilter_xgboost_unscaled.joblib'
+
+
+class ModelArtifacts:
+    def __init__(self, model, explain_model, scaler, label_encoder, feature_columns: list,
+                 metadata: dict, baseline: dict, model_file: str, use_fast_scorer: bool = True,
+                 prefilter: Optional[Prefilter] = None):
+        self.model = model
+        self.explain_model = explain_model
+        self.scaler = scaler
+        self.label_encoder = label_encoder
+        self.feature_columns = feature_columns
+        self.metadata = metadata
+        self.baseline = baseline
+        self.model_file = model_file
+        self.version = metadata.get("version", "unknown")
+        # Key of this column layout in packed feature snapshots (model_metadata.json feature_hash).
+        self.feature_hash = schema_hash(feature_columns)
+        if metadata.get("feature_hash") not in (None, self.feature_hash):
+            print(f"model_metadata.json feature_hash does not match {FEATURE_FILE}; using {self.feature_hash}.")
+        # Native booster fast path (bypasses CalibratedClassifierCV + pandas); None if the model is not compatible.
+        self.fast_scorer = FastScorer.from_model(model) if use_fast_scorer else None
+        # Cascade stage one ("confidently normal" cutoff); None when train_model.py did not export one.
+        self.prefilter = prefilter
+        self.loaded_at = datetime.utcnow().isoformat()
+        self.corpus_features: Optional[np.ndarray] = None
+        self.corpus_ports: Optional[np.ndarray] = None
+
+    @classmethod
+    def load(cls, directory: str = ".", prefer_unscaled: bool = True, use_fast_scorer: bool = True) -> "ModelArtifacts":
+        """Load the artifact set found in `directory` (same file names train_model.py writes)."""
+        def path(name: str) -> str:
+            return os.path.join(directory, name)
+
+        metadata = {}
+        baseline = {}
+        if os.path.exists(path(MODEL_METADATA_FILE)):
+            with open(path(MODEL_METADATA_FILE), 'r', encoding='utf-8') as f:
+                metadata = json.load(f)
+        if os.path.exists(path(FEATURE_BASELINE_FILE)):
+            with open(path(FEATURE_BASELINE_FILE), 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        # Prefer the scaler-free export (scaler folded into split thresholds) when train_model.py verified it.
+        unscaled = (
+            prefer_unscaled
+            and metadata.get("scaler_folding", {}).get("exported", False)
+            and os.path.exists(path(UNSCALED_MODEL_FILE))
+        )
+        if unscaled:
+            model_file = path(UNSCALED_MODEL_FILE)
+            model = joblib.load(model_file)
+            explain_file = path(UNSCALED_EXPLAIN_MODEL_FILE)
+            explain_model = joblib.load(explain_file) if os.path.exists(explain_file) else model
+            scaler = None
+        else:
+            model_file = path(MODEL_FILE)
+            model = joblib.load(model_file)
+            explain_file = path(EXPLAIN_MODEL_FILE)
+            explain_model = joblib.load(explain_file) if os.path.exists(explain_file) else model
+            scaler = joblib.load(path(SCALER_FILE)) if os.path.exists(path(SCALER_FILE)) else None
+        label_encoder = joblib.load(path(LABEL_ENCODER_FILE))
+        with open(path(FEATURE_FILE), 'r') as f:
+            feature_columns = json.load(f)
+
+        prefilter = None
+        cascade = metadata.get("cascade", {})
+        prefilter_file = path(UNSCALED_PREFILTER_FILE if scaler is None else PREFILTER_FILE)
+        if cascade.get("exported") and (scaler is not None or cascade.get("unscaled_exported")) \
+                and os.path.exists(prefilter_file):
+            normal_idx = int(label_encoder.transform([cascade["normal_class"]])[0])
+            prefilter = Prefilter(joblib.load(prefilter_file), cascade["cutoff"], normal_idx)
+        return cls(model, explain_model, scaler, label_encoder, feature_columns,
+                   metadata, baseline, model_file, use_fast_scorer=use_fast_scorer, prefilter=prefilter)
+
+    def build_feature_frame(self, rows: pd.DataFrame) -> pd.DataFrame:
+        """Create raw + engineered feature values for a batch of traffic rows (feature_columns order)."""
+        eps = 1e-6
+
+        def col(name: str) -> pd.Series:
+            if name in rows.columns:
+                return rows[name].astype(float)
+            return pd.Series(0.0, index=rows.index)
+
+        values = rows.assign(**{
+            "feat_bytes_per_packet": col("Flow Bytes/s") / (col("Flow Packets/s") + eps),
+            "feat_fwd_bwd_rate_ratio": col("Fwd Packets/s") / (col("Bwd Packets/s") + eps),
+            "feat_flow_iat_range": col("Flow IAT Max") - col("Flow IAT Min"),
+            "feat_packet_len_range": col("Max Packet Length") - col("Min Packet Length"),
+            "feat_packet_length_cv": col("Packet Length Std") / (col("Packet Length Mean") + eps),
+        })
+        features = values.reindex(columns=self.feature_columns, fill_value=0.0).reset_index(drop=True)
+        return features.replace([np.inf, -np.inf], np.nan).fillna(0.0)
+
+    def to_model_input(self, df: pd.DataFrame, chunk_rows: int = 100_000) -> np.ndarray:
+        """Engineer, clean and scale traffic rows into one contiguous float32 matrix."""
+        matrix = np.empty((len(df), len(self.feature_columns)), dtype=np.float32)
+        for start in range(0, len(df), chunk_rows):
+            features = self.build_feature_frame(df.iloc[start:start + chunk_rows])
+            if self.scaler is not None:
+                matrix[start:start + len(features)] = self.scaler.transform(features)
+            else:
+                matrix[start:start + len(features)] = features.to_numpy(dtype=np.float64)
+        return matrix
+
+    def snapshots_to_model_input(self, raw: np.ndarray) -> np.ndarray:
+        """Decoded raw feature snapshots (feature_columns order) -> model-space float32 matrix."""
+        raw = np.nan_to_num(np.asarray(raw, dtype=np.float64), nan=0.0, posinf=0.0, neginf=0.0)
+        if self.scaler is not None:
+            raw = self.scaler.transform(pd.DataFrame(raw, columns=self.feature_columns))
+        return np.asarray(raw, dtype=np.float32)
+
+    def project_raw(self, raw: np.ndarray, columns: list) -> np.ndarray:
+        """Raw feature rows laid out as `columns` -> this bundle's model-space float32 matrix."""
+        if list(columns) != list(self.feature_columns):
+            index = {name: i for i, name in enumerate(columns)}
+            aligned = np.zeros((len(raw), len(self.feature_columns)), dtype=np.float64)
+            for j, name in enumerate(self.feature_columns):
+                if name in index:
+                    aligned[:, j] = raw[:, index[name]]
+            raw = aligned
+        if self.scaler is not None:
+            raw = self.scaler.transform(pd.DataFrame(raw, columns=self.feature_columns))
+        return np.ascontiguousarray(raw, dtype=np.float32)
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        if self.fast_scorer is not None:
+            return self.fast_scorer.predict_proba(features)
+        return np.asarray(self.model.predict_proba(features))
+
+    def unscale(self, features: np.ndarray) -> np.ndarray:
+        """Map model-space rows back to raw feature values (for feature snapshots)."""
+        if self.scaler is None:
+            return features
+        return features * self.scaler.scale_.astype(np.float32) + self.scaler.mean_.astype(np.float32)
+
+    def explanation_booster(self):
+        base = self.explain_model
+        if hasattr(base, "base_estimator"):
+            base = base.base_estimator
+        if not hasattr(base, "get_booster"):
+            raise ValueError("No xgboost booster found for explanation")
+        return base.get_booster()
+
+    def attach_corpus(self, traffic_df: pd.DataFrame) -> None:
+        """Project the raw replay corpus into this model's input space."""
+        self.corpus_features = self.to_model_input(traffic_df)
+        if "Destination Port" in traffic_df.columns:
+            self.corpus_ports = traffic_df["Destination Port"].fillna(0).to_numpy(dtype=np.int32)
+        else:
+            self.corpus_ports = np.zeros(len(traffic_df), dtype=np.int32)
+
+    def warm_up(self, rows: int = 64) -> None:
+        """Run a few predictions so the first live batch does not pay one-off setup costs."""
+        if self.corpus_features is not None and len(self.corpus_features):
+            sample = self.corpus_features[:rows]
+        else:
+            sample = np.zeros((1, len(self.feature_columns)), dtype=np.float32)
+        if self.fast_scorer is not None:
+            self.fast_scorer.predict_proba(sample)
+        elif hasattr(self.model, "predict_proba"):
+            self.model.predict_proba(sample)
+        else:
+            self.model.predict(sample)
+        if self.prefilter is not None:
+            self.prefilter.normal_probability(sample)
+        self.label_encoder.inverse_transform([0])
+
+    def info(self) -> dict:
+        return {
+            "model_version": self.version,
+            "model_file": self.model_file,
+            "loaded_at": self.loaded_at,
+            "feature_count": len(self.feature_columns),
+            "scaler_free": self.scaler is None,
+            "fast_scorer": self.fast_scorer is not None,
+            "prefilter": self.prefilter is not None,
+        }
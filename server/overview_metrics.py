@@ -0,0 +1,328 @@
+"""
+Rolling 24h counters behind /api/metrics/overview.
+
+Instead of loading every traffic_logs / auto_blocked / resolved manual_review
+row of the last 24h on each poll, the write path feeds this aggregator as rows
+commit, and the overview is read from fixed-size time buckets:
+  record()            - _write_packets: traffic rows, auto blocks and reviews
+                        resolved at ingest, after the INSERT commits
+  record_resolution() - an analyst resolved (or re-resolved) an incident
+Each bucket covers `bucket_seconds`; a ring of window / bucket_seconds rows
+(one numpy row per bucket) holds the counts, so an overview is a few sums
+over O(buckets) no matter how much traffic came in. Windows such as the 2h
+traffic bars are aligned to bucket boundaries (off by at most one bucket).
+
+seed() rebuilds the ring from the database with GROUP BY bucket queries (no
+rows are loaded) on startup and every `interval` seconds after that. Writers
+run commit + record inside mutation(), which seed() also takes, so a row is
+never counted both by the seed query and by the write that committed it.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import Integer, case, cast, func
+
+from database import AutoBlocked, ManualReview, SessionLocal, TrafficLog
+
+EPOCH = datetime(1970, 1, 1)
+SEVERITIES = ("critical", "high", "medium", "low")
+
+# Ring buffer columns.
+TRAFFIC = 0
+SEVERITY = {name: 1 + i for i, name in enumerate(SEVERITIES)}  # threats (type != Normal Traffic) by severity
+AUTO_BLOCKED = 5
+RESOLVED = 6          # manual_review rows RESOLVED, by creation time
+FALSE_POSITIVES = 7
+RESPONSE_SECONDS = 8  # sum of resolved_at - timestamp over resolved rows with resolved_at >= timestamp
+RESPONSES = 9
+N_COLUMNS = 10
+
+TRAFFIC_BARS = 12        # 2h bars over 24h
+VELOCITY_SLOTS = 6       # 4h decision-velocity slots over 24h
+
+
+def severity_bucket(attack_type: str) -> str:
+    text = (attack_type or "").lower()
+    if "normal" in text:
+        return "low"
+    if any(token in text for token in ["ddos", "dos", "heartbleed", "infiltration", "botnet"]):
+        return "critical"
+    if any(token in text for token in ["brute", "patator", "sql", "xss", "web attack", "bot"]):
+        return "high"
+    if any(token in text for token in ["port", "scan"]):
+        return "medium"
+    return "medium"
+
+
+def to_naive_utc(dt: Optional[datetime]) -> Optional[datetime]:
+    """Normalize DB datetimes so arithmetic/comparisons do not fail on tz-aware values."""
+    if dt is None:
+        return None
+    if dt.tzinfo is not None:
+        return dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def _epoch_seconds(column, dialect: str):
+    """SQL for a naive timestamp column as seconds since 1970 (the same clock as EPOCH)."""
+    if dialect == "postgresql":
+        return func.extract("epoch", column)
+    if dialect == "sqlite":
+        return cast(func.strftime("%s", column), Integer)
+    raise ValueError(f"Overview buckets are not implemented for {dialect} databases")
+
+
+class RollingOverview:
+    def __init__(self, session_factory=SessionLocal, window_hours: int = 24, bucket_seconds: int = 60):
+        window_seconds = window_hours * 3600
+        if bucket_seconds <= 0 or 7200 % bucket_seconds:
+            raise ValueError("bucket_seconds must divide the 2h traffic bar")
+        self.session_factory = session_factory
+        self.bucket_seconds = bucket_seconds
+        self.window_seconds = window_seconds
+        self.n_buckets = window_seconds // bucket_seconds
+        self._counts = np.zeros((self.n_buckets, N_COLUMNS), dtype=np.float64)
+        self._bucket_ids = np.full(self.n_buckets, -1, dtype=np.int64)  # bucket number held by each slot
+        self._lock = threading.Lock()            # guards the ring (held for microseconds)
+        self._mutation_lock = threading.RLock()  # commit + record vs seed
+        self.loaded = False
+        self.seeds = 0
+        self.last_seeded_at: Optional[str] = None
+        self.last_seed_ms = 0.0
+        self.recorded = 0
+        self.dropped = 0  # events older than the window when recorded
+        self._thread: Optional[threading.Thread] = None
+
+    def mutation(self):
+        """Hold around `commit(); record*()` so a seed cannot run in between."""
+        return self._mutation_lock
+
+    def _bucket(self, ts: datetime) -> int:
+        return int((to_naive_utc(ts) - EPOCH).total_seconds() // self.bucket_seconds)
+
+    def _now_bucket(self, now: Optional[datetime] = None) -> int:
+        return self._bucket(now or datetime.utcnow())
+
+    def _slot(self, bucket: int, now_bucket: int) -> Optional[int]:
+        """Ring row for `bucket` (reset if it still holds an expired bucket); None if outside the window."""
+        # Rows stamped ahead of the clock (e.g. local-time timestamps) count in the current bucket.
+        bucket = min(bucket, now_bucket)
+        if bucket <= now_bucket - self.n_buckets:
+            return None
+        slot = bucket % self.n_buckets
+        if self._bucket_ids[slot] != bucket:
+            self._counts[slot] = 0.0
+            self._bucket_ids[slot] = bucket
+        return slot
+
+    def _event_row(self, ts: Optional[datetime], now_bucket: int) -> Optional[np.ndarray]:
+        slot = self._slot(self._bucket(ts), now_bucket) if ts is not None else None
+        if slot is None:
+            self.dropped += 1
+            return None
+        return self._counts[slot]
+
+    def _add_resolved(self, created: Optional[datetime], resolved_at: Optional[datetime],
+                      action_taken: Optional[str], sign: int, now_bucket: int) -> None:
+        row = self._event_row(created, now_bucket)
+        if row is None:
+            return
+        row[RESOLVED] += sign
+        if action_taken == "FALSE_POSITIVE":
+            row[FALSE_POSITIVES] += sign
+        created, resolved_at = to_naive_utc(created), to_naive_utc(resolved_at)
+        if resolved_at is not None and resolved_at >= created:
+            row[RESPONSE_SECONDS] += sign * (resolved_at - created).total_seconds()
+            row[RESPONSES] += sign
+
+    def record(self, traffic: Iterable[Tuple[datetime, str]] = (), auto_blocked: Iterable[datetime] = (),
+               resolved: Iterable[Tuple[datetime, Optional[datetime], Optional[str]]] = ()) -> None:
+        """Count committed rows: traffic (timestamp, type), auto blocks (timestamp) and
+        reviews written as RESOLVED (timestamp, resolved_at, action_taken)."""
+        now_bucket = self._now_bucket()
+        with self._lock:
+            for ts, attack_type in traffic:
+                self.recorded += 1
+                row = self._event_row(ts, now_bucket)
+                if row is None:
+                    continue
+                row[TRAFFIC] += 1
+                if attack_type != "Normal Traffic":
+                    row[SEVERITY[severity_bucket(attack_type)]] += 1
+            for ts in auto_blocked:
+                self.recorded += 1
+                row = self._event_row(ts, now_bucket)
+                if row is not None:
+                    row[AUTO_BLOCKED] += 1
+            for created, resolved_at, action_taken in resolved:
+                self._add_resolved(created, resolved_at, action_taken, 1, now_bucket)
+                self.recorded += 1
+
+    def record_resolution(self, created: datetime, resolved_at: Optional[datetime], action_taken: Optional[str],
+                          previous: Optional[Tuple[Optional[datetime], Optional[str]]] = None) -> None:
+        """An incident created at `created` was resolved; `previous` is its earlier
+        (resolved_at, action_taken) when it had already been resolved before."""
+        now_bucket = self._now_bucket()
+        with self._lock:
+            if previous is not None:
+                self._add_resolved(created, previous[0], previous[1], -1, now_bucket)
+            self._add_resolved(created, resolved_at, action_taken, 1, now_bucket)
+            self.recorded += 1
+
+    def _seed_rows(self, db, since: datetime):
+        dialect = db.get_bind().dialect.name
+        bs = self.bucket_seconds
+
+        def bucket(column):
+            seconds = _epoch_seconds(column, dialect)
+            if dialect == "sqlite":
+                return (seconds // bs).label("bucket")
+            return cast(func.floor(seconds / bs), Integer).label("bucket")
+
+        traffic_bucket = bucket(TrafficLog.timestamp)
+        traffic = (
+            db.query(traffic_bucket, TrafficLog.type, func.count(TrafficLog.id))
+            .filter(TrafficLog.timestamp >= since)
+            .group_by(traffic_bucket, TrafficLog.type)
+            .all()
+        )
+        blocked_bucket = bucket(AutoBlocked.timestamp)
+        blocked = (
+            db.query(blocked_bucket, func.count(AutoBlocked.id))
+            .filter(AutoBlocked.timestamp >= since)
+            .group_by(blocked_bucket)
+            .all()
+        )
+        responded = ManualReview.resolved_at >= ManualReview.timestamp
+        response = _epoch_seconds(ManualReview.resolved_at, dialect) - _epoch_seconds(ManualReview.timestamp, dialect)
+        review_bucket = bucket(ManualReview.timestamp)
+        reviews = (
+            db.query(
+                review_bucket,
+                func.count(ManualReview.id),
+                func.count(case((ManualReview.action_taken == "FALSE_POSITIVE", 1))),
+                func.coalesce(func.sum(case((responded, response))), 0),
+                func.count(case((responded, 1))),
+            )
+            .filter(ManualReview.status == "RESOLVED", ManualReview.timestamp >= since)
+            .group_by(review_bucket)
+            .all()
+        )
+        return traffic, blocked, reviews
+
+    def seed(self) -> None:
+        """Rebuild the ring from the database (the last `window` of traffic, blocks and resolved reviews)."""
+        start = time.perf_counter()
+        with self._mutation_lock:
+            now_bucket = self._now_bucket()
+            first = now_bucket - self.n_buckets + 1
+            since = EPOCH + timedelta(seconds=first * self.bucket_seconds)
+            db = self.session_factory()
+            try:
+                traffic, blocked, reviews = self._seed_rows(db, since)
+            finally:
+                db.close()
+            counts = np.zeros_like(self._counts)
+            # Slot i holds the bucket b in [first, now_bucket] with b % n_buckets == i.
+            bucket_ids = first + (np.arange(self.n_buckets, dtype=np.int64) - first) % self.n_buckets
+
+            def slot(b) -> Optional[int]:
+                b = min(int(b), now_bucket)
+                return b % self.n_buckets if b >= first else None
+
+            for b, attack_type, n in traffic:
+                i = slot(b)
+                if i is None:
+                    continue
+                counts[i, TRAFFIC] += n
+                if attack_type != "Normal Traffic":
+                    counts[i, SEVERITY[severity_bucket(attack_type)]] += n
+            for b, n in blocked:
+                i = slot(b)
+                if i is not None:
+                    counts[i, AUTO_BLOCKED] += n
+            for b, n, false_positives, response_seconds, responses in reviews:
+                i = slot(b)
+                if i is None:
+                    continue
+                counts[i, RESOLVED] += n
+                counts[i, FALSE_POSITIVES] += false_positives
+                counts[i, RESPONSE_SECONDS] += float(response_seconds)
+                counts[i, RESPONSES] += responses
+            with self._lock:
+                self._counts = counts
+                self._bucket_ids = bucket_ids
+                self.loaded = True
+        self.seeds += 1
+        self.last_seed_ms = round((time.perf_counter() - start) * 1000, 1)
+        self.last_seeded_at = datetime.utcnow().isoformat()
+
+    def overview(self, now: Optional[datetime] = None) -> dict:
+        """Traffic, threat, block and review aggregates over the window ending at `now`."""
+        if not self.loaded:
+            self.seed()
+        now_bucket = self._now_bucket(now)
+        with self._lock:
+            counts = self._counts.copy()
+            ages = now_bucket - self._bucket_ids
+        live = (ages >= 0) & (ages < self.n_buckets)
+        counts, age_seconds = counts[live], ages[live] * self.bucket_seconds
+
+        totals = counts.sum(axis=0)
+        bars = np.zeros(TRAFFIC_BARS, dtype=np.int64)
+        np.add.at(bars, TRAFFIC_BARS - 1 - age_seconds // 7200, counts[:, TRAFFIC].astype(np.int64))
+        last_12h = int(counts[age_seconds < 12 * 3600, TRAFFIC].sum())
+        slots = age_seconds // (4 * 3600)
+        velocity = []
+        for s in reversed(range(VELOCITY_SLOTS)):
+            in_slot = slots == s
+            velocity.append({"automated": int(counts[in_slot, AUTO_BLOCKED].sum()),
+                             "human": int(counts[in_slot, RESOLVED].sum())})
+        responses = totals[RESPONSES]
+        return {
+            "traffic_total": int(totals[TRAFFIC]),
+            "traffic_last_12h": last_12h,
+            "traffic_prev_12h": int(totals[TRAFFIC]) - last_12h,
+            "traffic_bars_24h": bars.tolist(),
+            "severity_distribution": {name: int(totals[SEVERITY[name]]) for name in SEVERITIES},
+            "active_threats": int(sum(totals[SEVERITY[name]] for name in SEVERITIES)),
+            "auto_blocked": int(totals[AUTO_BLOCKED]),
+            "decision_velocity": velocity,
+            "resolved": int(totals[RESOLVED]),
+            "false_positives": int(totals[FALSE_POSITIVES]),
+            "mean_time_to_respond_seconds": int(totals[RESPONSE_SECONDS] / responses) if responses else 0,
+        }
+
+    def _run(self, interval: float) -> None:
+        while True:
+            time.sleep(interval)
+            try:
+                self.seed()
+            except Exception as e:
+                print(f"Overview metrics reseed failed: {e}")
+
+    def start(self, interval: float) -> None:
+        """Seed now and reseed every `interval` seconds (0 = only now)."""
+        self.seed()
+        if interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._run, args=(interval,), daemon=True,
+                                            name="overview-metrics-reseed")
+            self._thread.start()
+
+    def status(self) -> dict:
+        return {
+            "bucket_seconds": self.bucket_seconds,
+            "buckets": self.n_buckets,
+            "loaded": self.loaded,
+            "recorded": self.recorded,
+            "dropped": self.dropped,
+            "seeds": self.seeds,
+            "last_seeded_at": self.last_seeded_at,
+            "last_seed_ms": self.last_seed_ms,
+        }
@@ -0,0 +1,302 @@
+"""
+Daily range partitioning of the append-only event tables (PostgreSQL only).
+
+With TRAFFIC_PARTITIONING=daily, traffic_logs and auto_blocked are created as
+`PARTITION BY RANGE (timestamp)` parents with one partition per UTC day
+(<table>_pYYYYMMDD) plus a DEFAULT partition that catches rows outside every
+daily range, so an insert never fails for lack of a partition. A maintenance
+thread keeps partitions created `premake_days` ahead (each in its own
+transaction, first moving that day's rows out of DEFAULT) and applies
+retention: partitions older than `retention_days` are rolled up into
+traffic_daily_rollup (traffic_logs only) and then dropped or, with
+retention_action "detach", detached and left in place as plain tables for
+archiving; expired DEFAULT rows are rolled up the same way and deleted or
+moved to <table>_default_archive. Queries that filter on timestamp only scan the matching partitions;
+newest_first() gives the "latest N rows" endpoints such a filter.
+
+PostgreSQL requires the partition key in every unique constraint, so the
+partitioned tables use PRIMARY KEY (id, timestamp); the ORM keeps mapping `id`
+alone, which stays unique through its sequence. Existing unpartitioned tables
+are left untouched (recreate them to switch modes).
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import MetaData, Table, inspect, text
+
+from db_capabilities import capabilities
+
+PARTITIONING_MODES = ("none", "daily")
+RETENTION_ACTIONS = ("drop", "detach")
+PARTITIONED_TABLES = ("traffic_logs", "auto_blocked")
+ROLLUP_TABLES = {"traffic_logs": "traffic_daily_rollup"}
+PARTITION_KEY = "timestamp"
+_KEY = f'"{PARTITION_KEY}"'  # quoted: timestamp is also a type name
+
+
+def _day_start(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day)
+
+
+def partition_name(table: str, day: date) -> str:
+    return f"{table}_p{day:%Y%m%d}"
+
+
+def _partition_day(table: str, name: str) -> Optional[date]:
+    prefix = f"{table}_p"
+    if not name.startswith(prefix):
+        return None
+    try:
+        return datetime.strptime(name[len(prefix):], "%Y%m%d").date()
+    except ValueError:
+        return None
+
+
+def partitioned_definition(table: Table) -> Table:
+    """Copy of `table` partitioned by day on timestamp, with the key added to the primary key."""
+    columns = []
+    for column in table.columns:
+        copy = column._copy()
+        if column.name == PARTITION_KEY:
+            copy.primary_key = True
+            copy.nullable = False
+        elif column.primary_key:
+            copy.autoincrement = True  # keep SERIAL now that the primary key is composite
+        columns.append(copy)
+    return Table(table.name, MetaData(), *columns, postgresql_partition_by=f"RANGE ({PARTITION_KEY})")
+
+
+class PartitionManager:
+    def __init__(self, engine, mode: str = "none", retention_days: int = 30,
+                 retention_action: str = "drop", premake_days: int = 3):
+        if mode not in PARTITIONING_MODES:
+            raise ValueError(f"Unknown partitioning mode {mode!r}; expected one of {PARTITIONING_MODES}")
+        if retention_action not in RETENTION_ACTIONS:
+            raise ValueError(f"Unknown retention action {retention_action!r}; expected one of {RETENTION_ACTIONS}")
+        self.engine = engine
+        self.mode = mode
+        self.retention_days = retention_days
+        self.retention_action = retention_action
+        self.premake_days = premake_days
+        self.unpartitioned: List[str] = []
+        self.runs = 0
+        self.created = 0
+        self.retired = 0
+        self.rows_rolled_up = 0
+        self.default_rows_moved = 0
+        self.default_rows_retired = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.last_run_at: Optional[str] = None
+        self.last_run_ms = 0.0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode == "daily" and capabilities(self.engine).partitioning
+
+    @property
+    def active_tables(self) -> List[str]:
+        return [name for name in PARTITIONED_TABLES if name not in self.unpartitioned] if self.enabled else []
+
+    def create_tables(self, metadata: MetaData) -> None:
+        """Create the partitioned parents before metadata.create_all() creates plain ones."""
+        if self.mode == "daily" and not self.enabled:
+            print(f"TRAFFIC_PARTITIONING=daily needs PostgreSQL 11+; {self.engine.dialect.name} tables stay unpartitioned.")
+        if not self.enabled:
+            return
+        self.unpartitioned = []
+        existing = set(inspect(self.engine).get_table_names())
+        with self.engine.begin() as conn:
+            for name in PARTITIONED_TABLES:
+                if name not in existing:
+                    partitioned_definition(metadata.tables[name]).create(conn)
+                    print(f"Created {name} partitioned by day on {PARTITION_KEY}.")
+                    continue
+                is_partitioned = conn.execute(
+                    text("SELECT c.relkind = 'p' FROM pg_class c WHERE c.oid = to_regclass(:name)"),
+                    {"name": name},
+                ).scalar()
+                if not is_partitioned:
+                    self.unpartitioned.append(name)
+                    print(f"{name} already exists unpartitioned; recreate it to enable daily partitions.")
+
+    def partitions(self, table: str) -> List[dict]:
+        with self.engine.connect() as conn:
+            rows = conn.execute(text(
+                "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint "
+                "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = to_regclass(:table) ORDER BY c.relname"
+            ), {"table": table}).all()
+        return [{"name": name, "bounds": bounds, "estimated_rows": max(0, int(estimate))}
+                for name, bounds, estimate in rows]
+
+    def _failed(self, what: str, error: Exception) -> None:
+        self.errors += 1
+        self.last_error = str(error)
+        print(f"Partition maintenance: {what} failed: {error}")
+
+    def _create_partition(self, table: str, day: date) -> None:
+        """Create one daily partition; rows of that day already in DEFAULT are moved into it first,
+        since PostgreSQL refuses a new partition whose range still has rows in the default one."""
+        name = partition_name(table, day)
+        bounds = {"lo": _day_start(day), "hi": _day_start(day + timedelta(days=1))}
+        values = f"FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+        in_range = f"{_KEY} >= :lo AND {_KEY} < :hi"
+        with self.engine.begin() as conn:
+            stray = conn.execute(text(f"SELECT 1 FROM {table}_default WHERE {in_range} LIMIT 1"), bounds).first()
+            if stray is None:
+                conn.execute(text(f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES {values}"))
+                return
+            conn.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+            moved = conn.execute(text(
+                f"WITH moved AS (DELETE FROM {table}_default WHERE {in_range} RETURNING *) "
+                f"INSERT INTO {name} SELECT * FROM moved"
+            ), bounds)
+            conn.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES {values}"))
+        self.default_rows_moved += max(0, moved.rowcount or 0)
+        print(f"Partition {name} created with {moved.rowcount} rows moved from {table}_default.")
+
+    def _ensure_partitions(self, table: str, today: date) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(text(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT"))
+        existing = {row["name"] for row in self.partitions(table)}
+        for offset in range(-1, self.premake_days + 1):
+            day = today + timedelta(days=offset)
+            name = partition_name(table, day)
+            if name in existing:
+                continue
+            # One transaction per partition: a failure leaves the other days unaffected.
+            try:
+                self._create_partition(table, day)
+                self.created += 1
+            except Exception as e:
+                self._failed(f"creating {name}", e)
+
+    def _rollup(self, conn, table: str, name: str, day: date) -> None:
+        rollup = ROLLUP_TABLES.get(table)
+        if rollup is None:
+            return
+        conn.execute(text(f"DELETE FROM {rollup} WHERE day = :day"), {"day": day})
+        result = conn.execute(text(
+            f"INSERT INTO {rollup} (day, type, action, model_version, events, avg_confidence, rolled_up_at) "
+            f"SELECT :day, type, action, model_version, count(*), avg(confidence), :now "
+            f"FROM {name} GROUP BY type, action, model_version"
+        ), {"day": day, "now": datetime.utcnow()})
+        self.rows_rolled_up += max(0, result.rowcount or 0)
+
+    def _retire_expired(self, table: str, today: date) -> None:
+        cutoff = today - timedelta(days=self.retention_days)
+        for partition in self.partitions(table):
+            day = _partition_day(table, partition["name"])
+            if day is None or day >= cutoff:
+                continue
+            # One transaction per partition: the rollup lands only if the partition goes.
+            with self.engine.begin() as conn:
+                self._rollup(conn, table, partition["name"], day)
+                if self.retention_action == "detach":
+                    conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {partition['name']}"))
+                else:
+                    conn.execute(text(f"DROP TABLE {partition['name']}"))
+            self.retired += 1
+            verb = "detached" if self.retention_action == "detach" else "dropped"
+            print(f"Partition {partition['name']} {verb} (older than {self.retention_days} days).")
+        self._retire_expired_default(table, cutoff)
+
+    def _retire_expired_default(self, table: str, cutoff: date) -> None:
+        """Apply retention to DEFAULT rows older than `cutoff`: roll up, then delete or archive them."""
+        default = f"{table}_default"
+        expired = {"cutoff": _day_start(cutoff)}
+        with self.engine.begin() as conn:
+            rollup = ROLLUP_TABLES.get(table)
+            if rollup is not None:
+                # Added to (not replacing) the day's rollup: that day's partition, if any, was retired already.
+                result = conn.execute(text(
+                    f"INSERT INTO {rollup} (day, type, action, model_version, events, avg_confidence, rolled_up_at) "
+                    f"SELECT CAST({_KEY} AS DATE), type, action, model_version, count(*), avg(confidence), :now "
+                    f"FROM {default} WHERE {_KEY} < :cutoff GROUP BY 1, type, action, model_version"
+                ), {**expired, "now": datetime.utcnow()})
+                self.rows_rolled_up += max(0, result.rowcount or 0)
+            if self.retention_action == "detach":
+                conn.execute(text(f"CREATE TABLE IF NOT EXISTS {default}_archive (LIKE {table})"))
+                result = conn.execute(text(
+                    f"WITH expired AS (DELETE FROM {default} WHERE {_KEY} < :cutoff RETURNING *) "
+                    f"INSERT INTO {default}_archive SELECT * FROM expired"
+                ), expired)
+            else:
+                result = conn.execute(text(f"DELETE FROM {default} WHERE {_KEY} < :cutoff"), expired)
+        retired = max(0, result.rowcount or 0)
+        self.default_rows_retired += retired
+        if retired:
+            verb = "archived" if self.retention_action == "detach" else "deleted"
+            print(f"{retired} rows {verb} from {default} (older than {self.retention_days} days).")
+
+    def maintain(self, today: Optional[date] = None) -> None:
+        """Create upcoming daily partitions and retire the ones past retention."""
+        if not self.active_tables:
+            return
+        today = today or datetime.utcnow().date()
+        started = time.perf_counter()
+        with self._lock:
+            for table in self.active_tables:
+                try:
+                    self._ensure_partitions(table, today)
+                    if self.retention_days > 0:
+                        self._retire_expired(table, today)
+                except Exception as e:
+                    self._failed(f"maintenance of {table}", e)
+            self.runs += 1
+            self.last_run_at = datetime.utcnow().isoformat()
+            self.last_run_ms = (time.perf_counter() - started) * 1000.0
+
+    def newest_first(self, query, column, limit: int, window_days: int = 1) -> list:
+        """`query` ordered by `column` desc, limited; tries the last `window_days` partitions first."""
+        if self.active_tables:
+            since = datetime.combine(datetime.utcnow().date() - timedelta(days=window_days), datetime.min.time())
+            rows = query.filter(column >= since).order_by(column.desc()).limit(limit).all()
+            if len(rows) >= limit:
+                return rows
+        return query.order_by(column.desc()).limit(limit).all()
+
+    def _run(self, interval: float) -> None:
+        while True:
+            time.sleep(interval)
+            self.maintain()
+
+    def start(self, interval: float) -> None:
+        """Run maintenance now and every `interval` seconds (0 = only now)."""
+        self.maintain()
+        if self.active_tables and interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._run, args=(interval,), daemon=True,
+                                            name="partition-maintenance")
+            self._thread.start()
+
+    def status(self) -> dict:
+        status = {
+            "mode": self.mode,
+            "enabled": self.enabled,
+            "tables": self.active_tables,
+            "unpartitioned": self.unpartitioned,
+            "retention_days": self.retention_days,
+            "retention_action": self.retention_action,
+            "premake_days": self.premake_days,
+            "runs": self.runs,
+            "partitions_created": self.created,
+            "partitions_retired": self.retired,
+            "rollup_rows": self.rows_rolled_up,
+            "default_rows_moved": self.default_rows_moved,
+            "default_rows_retired": self.default_rows_retired,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "last_run_at": self.last_run_at,
+            "last_run_ms": round(self.last_run_ms, 2),
+        }
+        if self.active_tables:
+            status["partitions"] = {table: self.partitions(table) for table in self.active_tables}
+        return status
@@ -0,0 +1,160 @@
+"""
+In-memory state of the analyst queue (manual_review rows with status PENDING).
+
+Keeps the pending total and per-attack-type counts so the decide stage, the
+health/overview endpoints and the AI context builder read them in O(1)
+instead of running COUNT(*) on manual_review:
+  reserve()        - decide stage: rows decided PENDING, not committed yet
+  mark_committed() - after the INSERT transaction commits
+  release()        - the INSERT failed; the reserved rows never landed
+  mark_resolved()  - an analyst (or automation) resolved a committed row
+A background thread reconciles the committed counts with the database every
+`interval` seconds (and records any drift). Writers run commit + counter
+update inside mutation(), which reconcile() also takes, so a reconcile can
+never count a row both in the database result and in flight.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import func
+
+from database import ManualReview, SessionLocal
+
+
+class PendingQueueState:
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self._committed: Counter = Counter()
+        self._in_flight: Counter = Counter()
+        self._committed_total = 0
+        self._in_flight_total = 0
+        self._lock = threading.Lock()            # guards the counters (held for microseconds)
+        self._mutation_lock = threading.RLock()  # commit + counter update vs reconcile
+        self.loaded = False
+        self.reconciles = 0
+        self.last_reconciled_at: Optional[str] = None
+        self.last_drift = 0
+        self.total_drift = 0
+        self._thread: Optional[threading.Thread] = None
+
+    def mutation(self):
+        """Hold around `commit(); mark_*()` so a reconcile cannot run in between."""
+        return self._mutation_lock
+
+    def _ensure_loaded(self) -> None:
+        if not self.loaded:
+            self.reconcile()
+
+    def committed_count(self) -> int:
+        self._ensure_loaded()
+        return self._committed_total
+
+    def pending_count(self) -> int:
+        """Committed PENDING rows plus rows decided PENDING that are still being written."""
+        self._ensure_loaded()
+        return self._committed_total + self._in_flight_total
+
+    def in_flight_count(self) -> int:
+        return self._in_flight_total
+
+    def by_type(self) -> Dict[str, int]:
+        self._ensure_loaded()
+        with self._lock:
+            return {t: n for t, n in self._committed.items() if n > 0}
+
+    def reserve(self, types: Iterable[str]) -> None:
+        types = list(types)
+        if not types:
+            return
+        with self._lock:
+            self._in_flight.update(types)
+            self._in_flight_total += len(types)
+
+    def _leave_in_flight(self, types: list) -> None:
+        self._in_flight.subtract(types)
+        self._in_flight_total -= len(types)
+
+    def mark_committed(self, types: Iterable[str]) -> None:
+        types = list(types)
+        if not types:
+            return
+        with self._lock:
+            self._leave_in_flight(types)
+            self._committed.update(types)
+            self._committed_total += len(types)
+
+    def release(self, types: Iterable[str]) -> None:
+        types = list(types)
+        if not types:
+            return
+        with self._lock:
+            self._leave_in_flight(types)
+
+    def mark_resolved(self, attack_type: str) -> None:
+        with self._lock:
+            if self._committed[attack_type] > 0:
+                self._committed[attack_type] -= 1
+                self._committed_total -= 1
+
+    def reconcile(self) -> int:
+        """Reload committed counts from the database; returns the drift (db - memory) found."""
+        with self._mutation_lock:
+            db = self.session_factory()
+            try:
+                rows = (
+                    db.query(ManualReview.type, func.count(ManualReview.id))
+                    .filter(ManualReview.status == "PENDING")
+                    .group_by(ManualReview.type)
+                    .all()
+                )
+            finally:
+                db.close()
+            counts = Counter({t or "Unknown": int(n) for t, n in rows})
+            with self._lock:
+                drift = sum(counts.values()) - self._committed_total if self.loaded else 0
+                self._committed = counts
+                self._committed_total = sum(counts.values())
+                self.loaded = True
+        self.reconciles += 1
+        self.last_drift = drift
+        self.total_drift += abs(drift)
+        self.last_reconciled_at = datetime.utcnow().isoformat()
+        if drift:
+            print(f"Pending queue counter drifted by {drift:+d}; reconciled with the database.")
+        return drift
+
+    def _run(self, interval: float) -> None:
+        while True:
+            time.sleep(interval)
+            try:
+                self.reconcile()
+            except Exception as e:
+                print(f"Pending queue reconcile failed: {e}")
+
+    def start(self, interval: float) -> None:
+        """Load the counts now and reconcile every `interval` seconds (0 = never)."""
+        self.reconcile()
+        if interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._run, args=(interval,), daemon=True,
+                                            name="pending-queue-reconcile")
+            self._thread.start()
+
+    def status(self) -> dict:
+        return {
+            "pending": self._committed_total,
+            "in_flight": self._in_flight_total,
+            "by_type": self.by_type() if self.loaded else {},
+            "reconciles": self.reconciles,
+            "last_reconciled_at": self.last_reconciled_at,
+            "last_drift": self.last_drift,
+            "total_drift": self.total_drift,
+        }
+
+
+pending_queue = PendingQueueState()
@@ -0,0 +1,143 @@
+"""
+Staged asyncio ingestion pipeline.
+
+A source coroutine feeds a chain of stages joined by bounded asyncio queues.
+Blocking stages (model calls, DB round-trips) run in their own thread so a slow
+stage only fills its own input queue; once the queues are full the source
+blocks on put(), which slows ingestion down instead of growing memory.
+Every stage reports its queue depth so the bottleneck is visible.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, List, Optional
+
+
+class Stage:
+    def __init__(self, name: str, fn: Callable[[Any], Any], blocking: bool = True):
+        self.name = name
+        self.fn = fn
+        self.blocking = blocking
+        self.queue: Optional[asyncio.Queue] = None
+        # One thread per stage: items inside a stage stay strictly ordered.
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"pipeline-{name}") if blocking else None
+        self.processed = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self.last_latency_ms = 0.0
+
+    def status(self, uptime: float) -> dict:
+        return {
+            "stage": self.name,
+            "queue_depth": self.queue.qsize() if self.queue is not None else 0,
+            "queue_capacity": self.queue.maxsize if self.queue is not None else 0,
+            "processed": self.processed,
+            "errors": self.errors,
+            "avg_latency_ms": round(1000.0 * self.busy_seconds / self.processed, 2) if self.processed else 0.0,
+            "last_latency_ms": round(self.last_latency_ms, 2),
+            "utilization": round(self.busy_seconds / uptime, 3) if uptime > 0 else 0.0,
+            "blocked_on_downstream_seconds": round(self.blocked_seconds, 2),
+        }
+
+
+class StagedPipeline:
+    def __init__(self, source: Callable[[], Awaitable[Any]], stages: List[Stage], queue_size: int = 8):
+        self.source = source
+        self.stages = stages
+        self.queue_size = max(1, int(queue_size))
+        self.source_items = 0
+        self.source_blocked_seconds = 0.0
+        self.started_at: Optional[float] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop: Optional[asyncio.Event] = None
+
+    async def run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        self.started_at = time.monotonic()
+        for stage in self.stages:
+            stage.queue = asyncio.Queue(maxsize=self.queue_size)
+
+        tasks = [asyncio.create_task(self._run_source(self.stages[0].queue))]
+        for i, stage in enumerate(self.stages):
+            downstream = self.stages[i + 1].queue if i + 1 < len(self.stages) else None
+            tasks.append(asyncio.create_task(self._run_stage(stage, downstream)))
+        try:
+            await self._stop.wait()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stop(self) -> None:
+        """Thread-safe shutdown request."""
+        if self._loop is not None and self._stop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+
+    async def _run_source(self, out_queue: asyncio.Queue) -> None:
+        while True:
+            try:
+                item = await self.source()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Pipeline source error: {e}")
+                await asyncio.sleep(1.0)
+                continue
+            if item is None:
+                continue
+            self.source_items += 1
+            start = time.perf_counter()
+            await out_queue.put(item)  # blocks when downstream is saturated (backpressure)
+            self.source_blocked_seconds += time.perf_counter() - start
+
+    async def _run_stage(self, stage: Stage, out_queue: Optional[asyncio.Queue]) -> None:
+        while True:
+            item = await stage.queue.get()
+            start = time.perf_counter()
+            if stage.blocking:
+                try:
+                    future = self._loop.run_in_executor(stage.executor, stage.fn, item)
+                except RuntimeError:
+                    return  # executor refused work: interpreter is shutting down
+            try:
+                if stage.blocking:
+                    result = await future
+                else:
+                    result = stage.fn(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                stage.errors += 1
+                print(f"Pipeline stage '{stage.name}' error: {e}")
+                result = None
+            finally:
+                stage.queue.task_done()
+            elapsed = time.perf_counter() - start
+            stage.busy_seconds += elapsed
+            stage.last_latency_ms = elapsed * 1000.0
+            stage.processed += 1
+
+            if result is not None and out_queue is not None:
+                start = time.perf_counter()
+                await out_queue.put(result)
+                stage.blocked_seconds += time.perf_counter() - start
+
+    def status(self) -> dict:
+        uptime = time.monotonic() - self.started_at if self.started_at is not None else 0.0
+        stages = [stage.status(uptime) for stage in self.stages]
+        bottleneck = max(stages, key=lambda s: s["utilization"])["stage"] if stages and uptime > 0 else None
+        return {
+            "running": self._stop is not None and not self._stop.is_set(),
+            "uptime_seconds": round(uptime, 1),
+            "source": {
+                "batches_emitted": self.source_items,
+                "blocked_on_backpressure_seconds": round(self.source_blocked_seconds, 2),
+            },
+            "stages": stages,
+            "bottleneck": bottleneck,
+        }
@@ -0,0 +1,143 @@
+"""
+Content-addressed memo cache for flow predictions.
+
+Replayed and real traffic repeat the exact same feature vectors (scans,
+floods, the replay loop itself), so the score stage looks each row up by a
+blake2b hash of its final float32 feature vector plus the scoring scope
+(model version, and in cascade mode the prefilter cutoff, see scoring_scope)
+before calling the model, and the enrich stage reuses explanations the same
+way (per explanation mode and predicted class, since noise injection can
+change the class after the lookup). The cache is a bounded LRU; clear() bumps
+a generation so results computed by a batch that started before a model swap
+are never stored under the new model.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# OrderedDict node + entry list + the small ints/floats it holds, measured once.
+_ENTRY_OVERHEAD = 104 + sys.getsizeof([0, 0.0, 0, True, None]) + 3 * 32
+
+
+def scoring_scope(version: str, scoring_mode: str = "full", cutoff: Optional[float] = None) -> str:
+    """Cache namespace for one way of scoring: cascade results (prefilter answers) never serve full mode."""
+    if scoring_mode != "cascade" or cutoff is None:
+        return version
+    return f"{version}|cascade|{float(cutoff)!r}"
+
+
+def feature_key(version: str, row: np.ndarray) -> bytes:
+    digest = hashlib.blake2b(np.ascontiguousarray(row, dtype=np.float32).tobytes(), digest_size=16)
+    digest.update(version.encode("utf-8"))
+    return digest.digest()
+
+
+class PredictionCache:
+    def __init__(self, max_entries: int = 100_000):
+        self.max_entries = max_entries
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.explanation_hits = 0
+        self.explanation_misses = 0
+        self.evictions = 0
+        self.memory_bytes = 0
+        # key -> [pred_idx, confidence, runner_up_idx, has_probs, {(mode, pred_idx): explanation} | None]
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _entry_size(self, key: bytes, entry: list) -> int:
+        size = _ENTRY_OVERHEAD + sys.getsizeof(key)
+        if entry[4]:
+            size += sys.getsizeof(entry[4]) + sum(sys.getsizeof(text) + 64 for text in entry[4].values())
+        return size
+
+    def lookup(self, version: str, features: np.ndarray) -> Tuple[int, List[bytes], List[Optional[list]]]:
+        """(generation, row keys, cached [pred, conf, runner_up, has_probs, ...] entry or None per row)."""
+        keys = [feature_key(version, row) for row in features]
+        found = []
+        with self._lock:
+            generation = self.generation
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                found.append(entry)
+            hits = sum(1 for entry in found if entry is not None)
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return generation, keys, found
+
+    def store(self, generation: int, keys: List[bytes], pred_idx, confidence, runner_up, has_probs: bool) -> None:
+        with self._lock:
+            if generation != self.generation:
+                return  # scored by a model that has since been swapped out
+            for key, p, c, r in zip(keys, pred_idx, confidence, runner_up):
+                if key in self._entries:
+                    continue
+                entry = [int(p), float(c), int(r), bool(has_probs), None]
+                self._entries[key] = entry
+                self.memory_bytes += self._entry_size(key, entry)
+            self._evict()
+
+    def get_explanation(self, key: Optional[bytes], mode: str, pred_idx: int) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key) if key is not None else None
+            text = entry[4].get((mode, pred_idx)) if entry is not None and entry[4] else None
+            if text is None:
+                self.explanation_misses += 1
+            else:
+                self.explanation_hits += 1
+            return text
+
+    def put_explanation(self, generation: int, key: Optional[bytes], mode: str, pred_idx: int,
+                        explanation: str) -> None:
+        with self._lock:
+            entry = self._entries.get(key) if key is not None else None
+            if entry is None or generation != self.generation:
+                return
+            self.memory_bytes -= self._entry_size(key, entry)
+            if entry[4] is None:
+                entry[4] = {}
+            entry[4][(mode, pred_idx)] = explanation
+            self.memory_bytes += self._entry_size(key, entry)
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_entries:
+            key, entry = self._entries.popitem(last=False)
+            self.memory_bytes -= self._entry_size(key, entry)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every entry (model swap); in-flight stores from the old model are ignored."""
+        with self._lock:
+            self._entries.clear()
+            self.memory_bytes = 0
+            self.generation += 1
+
+    def status(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            explanation_lookups = self.explanation_hits + self.explanation_misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "memory_bytes": self.memory_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "explanation_hits": self.explanation_hits,
+                "explanation_misses": self.explanation_misses,
+                "explanation_hit_rate": (
+                    round(self.explanation_hits / explanation_lookups, 4) if explanation_lookups else None
+                ),
+                "evictions": self.evictions,
+                "generation": self.generation,
+            }
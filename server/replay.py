@@ -0,0 +1,121 @@
+"""
+Rate-controlled replay scheduling.
+
+ReplayScheduler is a token bucket refilled at a target packets/sec that can
+follow a rate profile over time:
+  constant - flat target rate
+  burst    - target * multiplier for `burst_seconds` out of every `burst_period_seconds`
+  diurnal  - sinusoidal day/night curve around the target rate
+Processing time is absorbed by the bucket rather than added to a fixed sleep,
+so the achieved rate tracks the target until the pipeline saturates.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Optional
+
+REPLAY_PROFILES = ("constant", "burst", "diurnal")
+_RATE_WINDOW_SECONDS = 10.0
+
+
+def configured_base_rate(config: dict) -> Optional[float]:
+    """Packets/sec from replay_target_pps, else derived from simulation_speed. None = unthrottled."""
+    target = float(config.get("replay_target_pps", 0.0) or 0.0)
+    if target > 0:
+        return target
+    speed = float(config.get("simulation_speed", 1.0))
+    return 1.0 / speed if speed > 0 else None
+
+
+def profile_rate(config: dict, elapsed: float) -> Optional[float]:
+    base = configured_base_rate(config)
+    if base is None:
+        return None
+    profile = config.get("replay_profile", "constant")
+    if profile == "burst":
+        period = max(1.0, float(config.get("replay_burst_period_seconds", 60.0)))
+        if (elapsed % period) < float(config.get("replay_burst_seconds", 10.0)):
+            return base * max(1.0, float(config.get("replay_burst_multiplier", 5.0)))
+        return base
+    if profile == "diurnal":
+        period = max(1.0, float(config.get("replay_diurnal_period_seconds", 86400.0)))
+        amplitude = min(0.95, max(0.0, float(config.get("replay_diurnal_amplitude", 0.5))))
+        return base * (1.0 + amplitude * math.sin(2.0 * math.pi * elapsed / period))
+    return base
+
+
+class ReplayScheduler:
+    def __init__(self, config: dict):
+        self.config = config
+        self.started_at = time.monotonic()
+        self._tokens = 0.0
+        self._last_refill = self.started_at
+        self._emitted = deque()
+        self._first_emit_at: Optional[float] = None
+        self.total_emitted = 0
+
+    def _refill(self, now: float, rate: Optional[float], capacity: float) -> None:
+        if rate is not None:
+            self._tokens = min(capacity, self._tokens + (now - self._last_refill) * rate)
+        self._last_refill = now
+
+    async def take(self, max_n: int, max_wait: float) -> int:
+        """Wait for at least one packet slot, then up to max_n slots or max_wait seconds."""
+        max_n = max(1, int(max_n))
+        deadline = None
+        while True:
+            now = time.monotonic()
+            rate = profile_rate(self.config, now - self.started_at)
+            if rate is None:
+                # Unthrottled: hand out a full batch but still yield to the event loop.
+                self._last_refill = now
+                await asyncio.sleep(0)
+                return self._record(now, max_n)
+
+            # Never bank more than one batch of credit, so a stall is not followed by a flood.
+            self._refill(now, rate, capacity=float(max_n))
+            if self._tokens >= 1.0 and deadline is None:
+                deadline = now + max_wait
+            if self._tokens >= max_n or (deadline is not None and now >= deadline):
+                n = int(self._tokens)
+                self._tokens -= n
+                return self._record(now, n)
+
+            wait = (min(max_n, max(1.0, self._tokens + 1.0)) - self._tokens) / rate
+            if deadline is not None:
+                wait = min(wait, max(0.0, deadline - now))
+            await asyncio.sleep(min(wait, 1.0))  # re-read the profile at least once a second
+
+    def _record(self, now: float, n: int) -> int:
+        if self._first_emit_at is None:
+            self._first_emit_at = now
+        self.total_emitted += n
+        self._emitted.append((now, n))
+        while self._emitted and now - self._emitted[0][0] > _RATE_WINDOW_SECONDS:
+            self._emitted.popleft()
+        return n
+
+    def achieved_rate(self) -> float:
+        now = time.monotonic()
+        while self._emitted and now - self._emitted[0][0] > _RATE_WINDOW_SECONDS:
+            self._emitted.popleft()
+        if not self._emitted:
+            return 0.0
+        window = min(_RATE_WINDOW_SECONDS, max(1e-3, now - self._first_emit_at))
+        return sum(n for _, n in self._emitted) / window
+
+    def status(self) -> dict:
+        target = profile_rate(self.config, time.monotonic() - self.started_at)
+        achieved = self.achieved_rate()
+        return {
+            "profile": self.config.get("replay_profile", "constant"),
+            "base_target_pps": configured_base_rate(self.config),
+            "target_pps": round(target, 2) if target is not None else None,
+            "achieved_pps": round(achieved, 2),
+            "achieved_ratio": round(achieved / target, 3) if target else None,
+            "total_emitted": self.total_emitted,
+        }
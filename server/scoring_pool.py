@@ -0,0 +1,152 @@
+"""
+Multi-process inference pool for traffic_simulator.
+
+Each worker process loads the model once and owns a pair of shared-memory
+buffers: the parent writes a float32 feature chunk into the input buffer,
+sends only the row count over a pipe, and reads (class index, confidence,
+runner-up index) back from the output buffer. Feature data is never pickled.
+Chunks are collected in submission order, so results line up with the batch.
+A worker that dies (broken pipe) marks the whole pool dead; the owner closes
+it and starts a new one.
+"""
+
+from __future__ import annotations
+
+import multiprocessing as mp
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Output layout per row: pred_idx (int32), confidence (float32), runner_up (int32).
+_OUT_FIELDS = 3
+
+
+def _worker_main(model_file: str, in_name: str, out_name: str, max_rows: int, n_features: int, conn) -> None:
+    import joblib
+    from fast_scorer import FastScorer
+
+    model = joblib.load(model_file)
+    scorer = FastScorer.from_model(model)
+    if scorer is not None:
+        scorer.set_threads(1)  # one core per worker; parallelism comes from processes
+    predict_proba = scorer.predict_proba if scorer is not None else model.predict_proba
+
+    # Spawned workers share the parent's resource tracker; the parent unlinks the segments.
+    in_shm = shared_memory.SharedMemory(name=in_name)
+    out_shm = shared_memory.SharedMemory(name=out_name)
+    X_buf = np.ndarray((max_rows, n_features), dtype=np.float32, buffer=in_shm.buf)
+    out_buf = np.ndarray((_OUT_FIELDS, max_rows), dtype=np.float32, buffer=out_shm.buf)
+    pred_buf = out_buf[0].view(np.int32)
+    conf_buf = out_buf[1]
+    runner_buf = out_buf[2].view(np.int32)
+    conn.send("ready")
+
+    try:
+        while True:
+            n = conn.recv()
+            if n is None:
+                break
+            try:
+                probs = np.asarray(predict_proba(X_buf[:n]))
+                pred = np.argmax(probs, axis=1)
+                pred_buf[:n] = pred
+                conf_buf[:n] = probs[np.arange(n), pred]
+                runner_buf[:n] = np.argsort(probs, axis=1)[:, ::-1][:, 1] if probs.shape[1] > 1 else pred
+                conn.send(n)
+            except Exception as e:
+                conn.send(f"error: {e}")
+    finally:
+        del X_buf, out_buf, pred_buf, conf_buf, runner_buf
+        in_shm.close()
+        out_shm.close()
+
+
+class _Worker:
+    def __init__(self, ctx, model_file: str, max_rows: int, n_features: int):
+        self.in_shm = shared_memory.SharedMemory(create=True, size=max_rows * n_features * 4)
+        self.out_shm = shared_memory.SharedMemory(create=True, size=_OUT_FIELDS * max_rows * 4)
+        self.conn, child_conn = ctx.Pipe()
+        self.proc = ctx.Process(
+            target=_worker_main,
+            args=(model_file, self.in_shm.name, self.out_shm.name, max_rows, n_features, child_conn),
+            daemon=True,
+        )
+        self.proc.start()
+        self.X = np.ndarray((max_rows, n_features), dtype=np.float32, buffer=self.in_shm.buf)
+        self.out = np.ndarray((_OUT_FIELDS, max_rows), dtype=np.float32, buffer=self.out_shm.buf)
+
+    def close(self) -> None:
+        try:
+            self.conn.send(None)
+        except Exception:
+            pass
+        self.proc.join(timeout=5)
+        if self.proc.is_alive():
+            self.proc.terminate()
+        self.X = self.out = None  # release buffer exports before closing the segments
+        for shm in (self.in_shm, self.out_shm):
+            try:
+                shm.close()
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class ScoringPoolDead(RuntimeError):
+    """A worker process exited; the pool cannot score any more batches."""
+
+
+class ScoringPool:
+    """Fixed set of scoring processes fed through shared memory."""
+
+    def __init__(self, model_file: str, n_workers: int, n_features: int, max_rows_per_worker: int = 1024):
+        self.model_file = model_file
+        self.n_workers = max(1, int(n_workers))
+        self.n_features = n_features
+        self.max_rows = max_rows_per_worker
+        self._lock = threading.Lock()
+        self.alive = True
+        ctx = mp.get_context("spawn")
+        self._workers = [_Worker(ctx, model_file, self.max_rows, n_features) for _ in range(self.n_workers)]
+        for worker in self._workers:
+            if worker.conn.recv() != "ready":
+                raise RuntimeError("Scoring worker failed to start")
+
+    def score(self, features: np.ndarray):
+        """Score a batch; returns (pred_idx, confidence, runner_up) in input order."""
+        features = np.atleast_2d(features)
+        n = len(features)
+        pred = np.empty(n, dtype=int)
+        conf = np.empty(n, dtype=float)
+        runner = np.empty(n, dtype=int)
+        per_round = self.n_workers * self.max_rows
+        with self._lock:
+            for round_start in range(0, n, per_round):
+                round_rows = features[round_start:round_start + per_round]
+                bounds = np.linspace(0, len(round_rows), min(self.n_workers, len(round_rows)) + 1).astype(int)
+                dispatched = []
+                try:
+                    for worker, lo, hi in zip(self._workers, bounds[:-1], bounds[1:]):
+                        worker.X[:hi - lo] = round_rows[lo:hi]
+                        worker.conn.send(int(hi - lo))
+                        dispatched.append((worker, round_start + lo, round_start + hi))
+                    replies = [worker.conn.recv() for worker, _, _ in dispatched]
+                except (EOFError, OSError) as e:
+                    # Remaining replies are out of step with the requests now; the pool is unusable.
+                    self.alive = False
+                    raise ScoringPoolDead(f"Scoring worker exited: {e!r}") from e
+                for (worker, lo, hi), reply in zip(dispatched, replies):
+                    if isinstance(reply, str):
+                        raise RuntimeError(f"Scoring worker failed: {reply}")
+                    pred[lo:hi] = worker.out[0, :hi - lo].view(np.int32)
+                    conf[lo:hi] = worker.out[1, :hi - lo]
+                    runner[lo:hi] = worker.out[2, :hi - lo].view(np.int32)
+        return pred, conf, runner
+
+    def close(self) -> None:
+        self.alive = False
+        with self._lock:
+            for worker in self._workers:
+                worker.close()
+            self._workers = []
@@ -0,0 +1,176 @@
+"""
+Shadow evaluation of a candidate model next to the live one.
+
+The score stage hands each scored batch (raw feature rows + the live model's
+own class indices, before simulation noise) to ShadowEvaluator.submit(), which
+only does a non-blocking put on a bounded queue; when the shadow worker falls
+behind, whole batches are dropped and counted instead of slowing ingestion.
+The worker thread re-projects the rows into the candidate's input space,
+scores them, appends one compact CSV row per flow to the results file and
+keeps running agreement / confusion / latency totals. Live latency counts
+only the rows the live model actually scored (prediction cache misses), so the
+overhead ratio compares model cost per row rather than the cache hit rate.
+Shadow predictions are never fed back into the SOAR decision path.
+"""
+
+from __future__ import annotations
+
+import csv
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+
+from model_artifacts import ModelArtifacts
+
+SHADOW_RESULTS_FIELDS = [
+    "timestamp", "live_version", "shadow_version",
+    "live_type", "live_confidence", "shadow_type", "shadow_confidence",
+]
+
+
+class ShadowEvaluator:
+    def __init__(self, candidate: ModelArtifacts, results_file: str, queue_batches: int = 64):
+        self.candidate = candidate
+        self.results_file = results_file
+        self.started_at = datetime.utcnow().isoformat()
+        self.batches_submitted = 0
+        self.batches_dropped = 0
+        self.batches_scored = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.live_version: Optional[str] = None
+        self.rows_compared = 0
+        self.rows_agreed = 0
+        self.confusion: Counter = Counter()  # (live_type, shadow_type) -> rows
+        self.live_rows = 0  # rows the live model scored (cache hits excluded)
+        self.live_seconds = 0.0
+        self.shadow_seconds = 0.0
+        self._stats_lock = threading.Lock()
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_batches)
+        self._stop = threading.Event()
+        if candidate.fast_scorer is not None:
+            # Share the CPU politely with the live scorer.
+            candidate.fast_scorer.set_threads(1)
+        self._thread = threading.Thread(target=self._run, daemon=True, name="shadow-scorer")
+        self._thread.start()
+
+    def submit(self, live: ModelArtifacts, raw_features: np.ndarray, live_idx: np.ndarray,
+               live_confidence: np.ndarray, live_rows: int, live_seconds: float) -> bool:
+        """Queue one scored batch for shadow scoring; never blocks (False = dropped).
+
+        `live_rows` / `live_seconds`: how many of the rows the live model itself scored, and how long it took.
+        """
+        self.batches_submitted += 1
+        try:
+            self._queue.put_nowait((live, raw_features, live_idx, live_confidence, live_rows, live_seconds))
+            return True
+        except queue.Full:
+            self.batches_dropped += 1
+            return False
+
+    def _run(self) -> None:
+        with open(self.results_file, "a", newline="", encoding="utf-8") as fh:
+            writer = csv.writer(fh)
+            if fh.tell() == 0:
+                writer.writerow(SHADOW_RESULTS_FIELDS)
+            while not self._stop.is_set():
+                try:
+                    item = self._queue.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                try:
+                    self._score(writer, *item)
+                    fh.flush()
+                except Exception as e:
+                    self.errors += 1
+                    self.last_error = str(e)
+
+    def _score(self, writer, live: ModelArtifacts, raw_features: np.ndarray, live_idx: np.ndarray,
+               live_confidence: np.ndarray, live_rows: int, live_seconds: float) -> None:
+        candidate = self.candidate
+        started = time.perf_counter()
+        features = candidate.project_raw(raw_features, live.feature_columns)
+        probs = candidate.predict_proba(features)
+        shadow_idx = np.argmax(probs, axis=1)
+        shadow_confidence = probs[np.arange(len(probs)), shadow_idx]
+        shadow_seconds = time.perf_counter() - started
+
+        # Compare by label text: the two encoders need not share class order.
+        live_types = live.label_encoder.inverse_transform(live_idx)
+        shadow_types = candidate.label_encoder.inverse_transform(shadow_idx)
+        timestamp = datetime.utcnow().isoformat(timespec="milliseconds")
+        writer.writerows(
+            (timestamp, live.version, candidate.version, lt, round(float(lc), 4), st, round(float(sc), 4))
+            for lt, lc, st, sc in zip(live_types, live_confidence, shadow_types, shadow_confidence)
+        )
+        pairs = Counter(zip(live_types.tolist(), shadow_types.tolist()))
+        with self._stats_lock:
+            self.confusion.update(pairs)
+            self.rows_compared += len(live_types)
+            self.rows_agreed += sum(n for (lt, st), n in pairs.items() if lt == st)
+            self.live_rows += live_rows
+            self.live_seconds += live_seconds
+            self.shadow_seconds += shadow_seconds
+            self.batches_scored += 1
+            self.live_version = live.version
+
+    def compare(self) -> dict:
+        """Agreement rate, per-class confusion (live -> shadow) and latency overhead so far."""
+        with self._stats_lock:
+            confusion = dict(self.confusion)
+            rows = self.rows_compared
+            agreed = self.rows_agreed
+            live_rows = self.live_rows
+            live_seconds = self.live_seconds
+            shadow_seconds = self.shadow_seconds
+
+        matrix: dict = {}
+        per_class: dict = {}
+        for (live_type, shadow_type), n in sorted(confusion.items()):
+            matrix.setdefault(live_type, {})[shadow_type] = n
+        for live_type, row in matrix.items():
+            total = sum(row.values())
+            per_class[live_type] = {
+                "rows": total,
+                "agreement_rate": round(row.get(live_type, 0) / total, 4),
+                "shadow_rows": sum(n for (_, st), n in confusion.items() if st == live_type),
+            }
+        live_per_row = live_seconds / live_rows if live_rows else None
+        shadow_per_row = shadow_seconds / rows if rows else None
+        return {
+            "live_version": self.live_version,
+            "shadow_version": self.candidate.version,
+            "started_at": self.started_at,
+            "rows_compared": rows,
+            "agreement_rate": round(agreed / rows, 4) if rows else None,
+            "per_class": per_class,
+            "confusion": matrix,
+            "latency": {
+                "live_rows_scored": live_rows,
+                "live_ms_per_1k_rows": round(1e6 * live_per_row, 3) if live_per_row is not None else None,
+                "shadow_ms_per_1k_rows": round(1e6 * shadow_per_row, 3) if shadow_per_row is not None else None,
+                "overhead_ratio": (
+                    round(shadow_per_row / live_per_row, 3) if shadow_per_row is not None and live_per_row else None
+                ),
+            },
+            "queue": {
+                "depth": self._queue.qsize(),
+                "capacity": self._queue.maxsize,
+                "batches_submitted": self.batches_submitted,
+                "batches_scored": self.batches_scored,
+                "batches_dropped": self.batches_dropped,
+            },
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "results_file": os.path.abspath(self.results_file),
+        }
+
+    def close(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=2)
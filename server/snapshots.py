@@ -0,0 +1,128 @@
+"""
+Packed feature snapshots.
+
+A snapshot is the raw feature row the model scored. It is stored in the
+feature_vector (bytea) column as
+    8-byte feature-schema hash | float32 little-endian values
+instead of a JSON dict of ~80 named floats (kilobytes per row). The schema
+hash is model_metadata.json's feature_hash (schema_hash of feature_columns);
+the feature_schemas table maps it back to the column names, so rows written
+under an older model stay readable after a retrain. decode_matrix() turns N
+stored rows into one float32 matrix with a single np.frombuffer per schema
+instead of N json.loads calls.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import text
+
+HASH_BYTES = 8
+VALUE_DTYPE = np.dtype("<f4")
+
+
+def schema_hash(columns: Sequence[str]) -> str:
+    """16 hex chars identifying an ordered feature column list (as written to model_metadata.json)."""
+    return hashlib.sha256(json.dumps(list(columns), sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def _record_dtype(width: int) -> np.dtype:
+    return np.dtype([("schema", f"S{HASH_BYTES}"), ("values", VALUE_DTYPE, (width,))])
+
+
+def encode_rows(schema: str, raw: np.ndarray) -> List[bytes]:
+    """Pack each row of `raw` (n x len(columns)) into one snapshot blob."""
+    raw = np.asarray(raw)
+    records = np.empty(len(raw), dtype=_record_dtype(raw.shape[1]))
+    records["schema"] = bytes.fromhex(schema)
+    records["values"] = raw
+    data = records.tobytes()
+    size = records.dtype.itemsize
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def blob_schema(blob) -> str:
+    return bytes(blob[:HASH_BYTES]).hex()
+
+
+def store_schema(conn, schema: str, columns: Sequence[str]) -> None:
+    """Record schema -> columns in feature_schemas (no-op if already there)."""
+    conn.execute(
+        text("INSERT INTO feature_schemas (hash, columns, created_at) VALUES (:hash, :columns, :created_at) "
+             "ON CONFLICT (hash) DO NOTHING"),
+        {"hash": schema, "columns": json.dumps(list(columns)), "created_at": datetime.utcnow()},
+    )
+
+
+class SchemaRegistry:
+    """Feature schema hash -> column names, cached in memory and backed by feature_schemas."""
+
+    def __init__(self, engine=None):
+        self.engine = engine
+        self._columns: Dict[str, List[str]] = {}
+        self._stored: set = set()
+        self._lock = threading.Lock()
+
+    def register(self, schema: str, columns: Sequence[str]) -> None:
+        with self._lock:
+            self._columns[schema] = list(columns)
+
+    def ensure_stored(self, schema: str, columns: Sequence[str]) -> None:
+        """Persist a schema before rows that use it are written (once per process)."""
+        if schema in self._stored:
+            return
+        self.register(schema, columns)
+        if self.engine is not None:
+            with self.engine.begin() as conn:
+                store_schema(conn, schema, columns)
+        with self._lock:
+            self._stored.add(schema)
+
+    def columns(self, schema: str) -> Optional[List[str]]:
+        with self._lock:
+            cached = self._columns.get(schema)
+        if cached is not None or self.engine is None:
+            return cached
+        with self.engine.connect() as conn:
+            stored = conn.execute(text("SELECT columns FROM feature_schemas WHERE hash = :hash"),
+                                  {"hash": schema}).scalar()
+        if stored is None:
+            return None
+        columns = json.loads(stored)
+        self.register(schema, columns)
+        return columns
+
+
+def decode_matrix(blobs: Sequence, columns: Sequence[str], registry: SchemaRegistry,
+                  fill: float = 0.0) -> np.ndarray:
+    """Stored snapshots -> float32 matrix laid out as `columns`.
+
+    Columns a row's schema lacks, and rows with an unknown schema, are `fill`.
+    """
+    columns = list(columns)
+    out = np.full((len(blobs), len(columns)), fill, dtype=np.float32)
+    groups = defaultdict(list)
+    for i, blob in enumerate(blobs):
+        groups[blob_schema(blob)].append(i)
+    for schema, positions in groups.items():
+        schema_columns = registry.columns(schema)
+        if schema_columns is None:
+            continue
+        data = b"".join(blobs[i] for i in positions)
+        values = np.frombuffer(data, dtype=_record_dtype(len(schema_columns)))["values"]
+        if schema_columns == columns:
+            out[positions] = values
+            continue
+        index = {name: j for j, name in enumerate(schema_columns)}
+        pairs = [(j, index[name]) for j, name in enumerate(columns) if name in index]
+        if pairs:
+            target, source = zip(*pairs)
+            out[np.ix_(positions, target)] = values[:, source]
+    return out
@@ -10,12 +10,22 @@ Implemented upgrades:
 6) Drift baseline artifact export.
 7) Model metadata/version artifact export.
 8) Cross-validation on macro-F1.
+9) Scaler-free export: StandardScaler folded into the booster split thresholds.
+10) Cascade prefilter: a few shallow trees with a validation-calibrated
+    "confidently normal" cutoff; only the remaining rows need the full model.
+
+Usage:
+    python train_model.py                    # full training run
+    python train_model.py --export-unscaled  # fold the scaler into existing artifacts
+    python train_model.py --train-prefilter  # (re)train only the cascade prefilter
 """
 
 from __future__ import annotations
 
-import hashlib
+import argparse
+import copy
 import json
+import os
 import time
 from datetime import datetime, timezone
 
@@ -30,7 +40,10 @@ from sklearn.model_selection import StratifiedKFold, cross_val_score, train_test
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 from sklearn.utils.class_weight import compute_class_weight
-from xgboost import XGBClassifier
+from xgboost import Booster, XGBClassifier
+
+from corpus_cache import load_corpus
+from snapshots import schema_hash
 
 # --- CONFIGURATION ---
 DATA_FILE = "large_simulation_log.csv"
@@ -42,6 +55,14 @@ SCALER_FILE = "scaler.joblib"
 MODEL_METADATA_FILE = "model_metadata.json"
 FEATURE_BASELINE_FILE = "feature_baseline.json"
 BENCHMARK_FILE = "model_benchmark.json"
+UNSCALED_MODEL_FILE = "multiclass_xgboost_ids_unscaled.joblib"
+UNSCALED_EXPLAIN_MODEL_FILE = "xgboost_explainer_unscaled.joblib"
+UNSCALED_PARITY_TOLERANCE = 1e-3
+PREFILTER_FILE = "prefilter_xgboost.joblib"
+UNSCALED_PREFILTER_FILE = "prefilter_xgboost_unscaled.joblib"
+NORMAL_CLASS = "Normal Traffic"
+# Share of validation attacks the prefilter may wave through as normal.
+PREFILTER_MAX_ATTACK_MISS_RATE = 0.001
 
 
 def add_engineered_features(df: pd.DataFrame) -> pd.DataFrame:
@@ -97,13 +118,219 @@ def build_model() -> XGBClassifier:
     )
 
 
+def fold_scaler_into_model(base_model: XGBClassifier, scaler: StandardScaler) -> XGBClassifier:
+    """Return a copy of base_model whose split thresholds are expressed in raw feature space.
+
+    A tree split `(x - mean) / scale < t` is the same test as `x < t * scale + mean`
+    because StandardScaler scales are strictly positive, so only thresholds change.
+    """
+    model_json = json.loads(base_model.get_booster().save_raw(raw_format="json"))
+    mean = np.asarray(scaler.mean_, dtype=np.float64)
+    scale = np.asarray(scaler.scale_, dtype=np.float64)
+    for tree in model_json["learner"]["gradient_booster"]["model"]["trees"]:
+        left = tree["left_children"]
+        split_indices = tree["split_indices"]
+        split_conditions = tree["split_conditions"]
+        for node, child in enumerate(left):
+            if child == -1:
+                continue  # leaf: split_conditions holds the leaf value
+            feature = split_indices[node]
+            split_conditions[node] = float(split_conditions[node] * scale[feature] + mean[feature])
+
+    folded = copy.deepcopy(base_model)
+    folded._Booster = Booster(model_file=bytearray(json.dumps(model_json).encode("utf-8")))
+    return folded
+
+
+def export_unscaled_artifacts(
+    calibrator: CalibratedClassifierCV,
+    base_model: XGBClassifier,
+    scaler: StandardScaler,
+    X_raw: pd.DataFrame,
+) -> dict:
+    """Fold the scaler into the model, verify parity on X_raw and save scaler-free artifacts."""
+    folded_model = fold_scaler_into_model(base_model, scaler)
+    folded_calibrator = copy.deepcopy(calibrator)
+    folded_calibrator.estimator = folded_model
+    for calibrated in folded_calibrator.calibrated_classifiers_:
+        calibrated.estimator = folded_model
+
+    X_scaled = pd.DataFrame(scaler.transform(X_raw), columns=X_raw.columns)
+    expected = calibrator.predict_proba(X_scaled)
+    actual = folded_calibrator.predict_proba(X_raw)
+    diff = np.abs(expected - actual)
+    report = {
+        "parity_rows": int(len(X_raw)),
+        "parity_max_abs_diff": float(diff.max()) if diff.size else 0.0,
+        "parity_mean_abs_diff": float(diff.mean()) if diff.size else 0.0,
+        "parity_argmax_agreement": float((expected.argmax(axis=1) == actual.argmax(axis=1)).mean()) if diff.size else 1.0,
+        "tolerance": UNSCALED_PARITY_TOLERANCE,
+    }
+    report["exported"] = report["parity_max_abs_diff"] <= UNSCALED_PARITY_TOLERANCE
+    print("Scaler folding parity:", report)
+
+    if report["exported"]:
+        joblib.dump(folded_calibrator, UNSCALED_MODEL_FILE)
+        joblib.dump(folded_model, UNSCALED_EXPLAIN_MODEL_FILE)
+        print(f"Saved: {UNSCALED_MODEL_FILE}")
+        print(f"Saved: {UNSCALED_EXPLAIN_MODEL_FILE}")
+    else:
+        # Never leave a stale scaler-free model next to freshly trained artifacts.
+        for path in (UNSCALED_MODEL_FILE, UNSCALED_EXPLAIN_MODEL_FILE):
+            if os.path.exists(path):
+                os.remove(path)
+        print("Scaler-free export skipped: parity outside tolerance.")
+    return report
+
+
+def build_prefilter() -> XGBClassifier:
+    return XGBClassifier(
+        objective="binary:logistic",
+        n_estimators=30,
+        max_depth=3,
+        learning_rate=0.3,
+        eval_metric="logloss",
+        random_state=42,
+        n_jobs=-1,
+        verbosity=0,
+    )
+
+
+def train_prefilter(
+    X_train_s: pd.DataFrame,
+    y_train: np.ndarray,
+    X_val_s: pd.DataFrame,
+    y_val: np.ndarray,
+    X_test: pd.DataFrame,
+    X_test_s: pd.DataFrame,
+    y_test: np.ndarray,
+    y_pred_full: np.ndarray,
+    le: LabelEncoder,
+    scaler: StandardScaler,
+) -> dict:
+    """Train the stage-one "confidently normal" model, pick its cutoff and report the cascade trade-off.
+
+    The cutoff is the lowest P(normal) above which at most PREFILTER_MAX_ATTACK_MISS_RATE
+    of the validation attacks would skip the full model. Skip fraction and recall cost are
+    then measured on the untouched test split against the full model's own predictions.
+    """
+    if NORMAL_CLASS not in le.classes_:
+        print(f"Cascade prefilter skipped: no '{NORMAL_CLASS}' class.")
+        return {"exported": False}
+    normal_idx = int(le.transform([NORMAL_CLASS])[0])
+
+    prefilter = build_prefilter()
+    prefilter.fit(X_train_s, (y_train == normal_idx).astype(int))
+
+    val_scores = prefilter.predict_proba(X_val_s)[:, 1]
+    attack_scores = np.sort(val_scores[y_val != normal_idx])[::-1]
+    allowed_misses = int(PREFILTER_MAX_ATTACK_MISS_RATE * len(attack_scores))
+    cutoff = float(attack_scores[allowed_misses]) if len(attack_scores) > allowed_misses else 0.5
+    cutoff = max(cutoff, 0.5)
+
+    test_scores = prefilter.predict_proba(X_test_s)[:, 1]
+    skip = test_scores > cutoff
+    y_pred_cascade = np.where(skip, normal_idx, y_pred_full)
+    attacks = y_test != normal_idx
+    recall_full = float((y_pred_full[attacks] != normal_idx).mean()) if attacks.any() else 1.0
+    recall_cascade = float((y_pred_cascade[attacks] != normal_idx).mean()) if attacks.any() else 1.0
+    report = {
+        "normal_class": NORMAL_CLASS,
+        "cutoff": round(cutoff, 6),
+        "max_attack_miss_rate": PREFILTER_MAX_ATTACK_MISS_RATE,
+        "trees": int(prefilter.n_estimators),
+        "max_depth": int(prefilter.max_depth),
+        "val_skip_fraction": round(float((val_scores > cutoff).mean()), 6),
+        "skip_fraction": round(float(skip.mean()), 6),
+        "attack_recall_full": round(recall_full, 6),
+        "attack_recall_cascade": round(recall_cascade, 6),
+        "recall_cost": round(recall_full - recall_cascade, 6),
+        "macro_f1_full": round(float(f1_score(y_test, y_pred_full, average="macro")), 6),
+        "macro_f1_cascade": round(float(f1_score(y_test, y_pred_cascade, average="macro")), 6),
+    }
+
+    # Same trees with thresholds in raw feature space, for the scaler-free bundle.
+    folded = fold_scaler_into_model(prefilter, scaler)
+    diff = np.abs(folded.predict_proba(X_test)[:, 1] - test_scores)
+    report["unscaled_exported"] = bool(diff.max() <= UNSCALED_PARITY_TOLERANCE) if diff.size else True
+    joblib.dump(prefilter, PREFILTER_FILE)
+    print(f"Saved: {PREFILTER_FILE}")
+    if report["unscaled_exported"]:
+        joblib.dump(folded, UNSCALED_PREFILTER_FILE)
+        print(f"Saved: {UNSCALED_PREFILTER_FILE}")
+    elif os.path.exists(UNSCALED_PREFILTER_FILE):
+        os.remove(UNSCALED_PREFILTER_FILE)
+    report["exported"] = True
+    print("Cascade prefilter:", report)
+    return report
+
+
+def export_unscaled_from_artifacts(max_rows: int = 5000) -> None:
+    """Run the scaler-free export against the artifacts already on disk."""
+    calibrator = joblib.load(MODEL_FILE)
+    base_model = joblib.load(EXPLAIN_MODEL_FILE)
+    scaler = joblib.load(SCALER_FILE)
+    with open(FEATURE_FILE, "r", encoding="utf-8") as f:
+        feature_columns = json.load(f)
+
+    df = load_corpus(DATA_FILE)
+    df = add_engineered_features(df)
+    X = df[feature_columns].replace([np.inf, -np.inf], np.nan).fillna(0.0)
+    if len(X) > max_rows:
+        X = X.sample(n=max_rows, random_state=42)
+
+    report = export_unscaled_artifacts(calibrator, base_model, scaler, X)
+    metadata = {}
+    if os.path.exists(MODEL_METADATA_FILE):
+        with open(MODEL_METADATA_FILE, "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+    metadata["scaler_folding"] = report
+    with open(MODEL_METADATA_FILE, "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2)
+    print(f"Saved: {MODEL_METADATA_FILE}")
+
+
+def train_prefilter_from_artifacts() -> None:
+    """Train the cascade prefilter against the artifacts already on disk (same splits as training)."""
+    calibrator = joblib.load(MODEL_FILE)
+    scaler = joblib.load(SCALER_FILE)
+    le = joblib.load(LABEL_ENCODER_FILE)
+    with open(FEATURE_FILE, "r", encoding="utf-8") as f:
+        feature_columns = json.load(f)
+
+    df = add_engineered_features(load_corpus(DATA_FILE))
+    X = df[feature_columns].copy()
+    X = X.replace([np.inf, -np.inf], np.nan).fillna(X.median(numeric_only=True)).fillna(0.0)
+    y_encoded = le.transform(df["Attack Type"].astype(str))
+    X_train_full, X_test, y_train_full, y_test = train_test_split(
+        X, y_encoded, test_size=0.2, random_state=42, stratify=y_encoded
+    )
+    X_train, X_val, y_train, y_val = train_test_split(
+        X_train_full, y_train_full, test_size=0.2, random_state=42, stratify=y_train_full
+    )
+    X_train_s = pd.DataFrame(scaler.transform(X_train), columns=feature_columns)
+    X_val_s = pd.DataFrame(scaler.transform(X_val), columns=feature_columns)
+    X_test_s = pd.DataFrame(scaler.transform(X_test), columns=feature_columns)
+    y_pred_full = calibrator.predict(X_test_s)
+
+    report = train_prefilter(X_train_s, y_train, X_val_s, y_val, X_test, X_test_s, y_test,
+                             y_pred_full, le, scaler)
+    metadata = {}
+    if os.path.exists(MODEL_METADATA_FILE):
+        with open(MODEL_METADATA_FILE, "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+    metadata["cascade"] = report
+    with open(MODEL_METADATA_FILE, "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2)
+    print(f"Saved: {MODEL_METADATA_FILE}")
+
+
 def train_ids_model() -> None:
     started = time.time()
     print("=" * 72)
     print("STEP 1: Load Dataset")
     print("=" * 72)
-    df = pd.read_csv(DATA_FILE)
-    df.columns = df.columns.str.strip()
+    df = load_corpus(DATA_FILE)
     with open(FEATURE_FILE, "r", encoding="utf-8") as f:
         base_features = json.load(f)
 
@@ -181,6 +408,12 @@ def train_ids_model() -> None:
     print(f"Accuracy: {accuracy:.4f} | Macro-F1: {macro_f1:.4f} | Weighted-F1: {weighted_f1:.4f}")
     print(f"Avg confidence: {np.max(y_prob, axis=1).mean():.4f}")
 
+    print("=" * 72)
+    print("STEP 5b: Cascade Prefilter (Stage One)")
+    print("=" * 72)
+    cascade = train_prefilter(X_train_s, y_train, X_val_s, y_val, X_test, X_test_s, y_test,
+                              y_pred, le, scaler)
+
     print("=" * 72)
     print("STEP 6: CV (Macro-F1)")
     print("=" * 72)
@@ -249,6 +482,7 @@ def train_ids_model() -> None:
     joblib.dump(base_model, EXPLAIN_MODEL_FILE)
     joblib.dump(le, LABEL_ENCODER_FILE)
     joblib.dump(scaler, SCALER_FILE)
+    scaler_folding = export_unscaled_artifacts(calibrator, base_model, scaler, X_test)
 
     feature_baseline = {
         "generated_at": datetime.now(timezone.utc).isoformat(),
@@ -259,7 +493,7 @@ def train_ids_model() -> None:
     with open(FEATURE_BASELINE_FILE, "w", encoding="utf-8") as f:
         json.dump(feature_baseline, f, indent=2)
 
-    feature_hash = hashlib.sha256(json.dumps(feature_columns, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    feature_hash = schema_hash(feature_columns)  # keys packed feature snapshots (snapshots.py)
     model_metadata = {
         "version": f"ids-xgb-{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}",
         "trained_at_utc": datetime.now(timezone.utc).isoformat(),
@@ -278,6 +512,8 @@ def train_ids_model() -> None:
         "benchmark": benchmark,
         "best_trees": int(best_trees),
         "engineered_features": engineered_features,
+        "scaler_folding": scaler_folding,
+        "cascade": cascade,
     }
     with open(MODEL_METADATA_FILE, "w", encoding="utf-8") as f:
         json.dump(model_metadata, f, indent=2)
@@ -300,4 +536,15 @@ def train_ids_model() -> None:
 
 
 if __name__ == "__main__":
-    train_ids_model()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--export-unscaled", action="store_true",
+                        help="fold the scaler into the existing artifacts instead of retraining")
+    parser.add_argument("--train-prefilter", action="store_true",
+                        help="train only the cascade prefilter against the existing artifacts")
+    args = parser.parse_args()
+    if args.export_unscaled:
+        export_unscaled_from_artifacts()
+    elif args.train_prefilter:
+        train_prefilter_from_artifacts()
+    else:
+        train_ids_model()
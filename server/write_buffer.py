@@ -0,0 +1,173 @@
+"""
+Write-behind buffer with group commit for the persist stage.
+
+The persist stage hands whole micro-batches of decided packets to
+WriteBuffer.submit(); a flusher thread writes everything buffered in one
+transaction (bulk INSERTs) once `write_buffer_rows` packets are waiting or
+the oldest one has waited `write_buffer_max_wait_ms`. Durability is chosen
+with `write_durability`:
+  immediate - submit() returns only after its rows are committed (one
+              transaction per micro-batch; nothing handed over is lost)
+  buffered  - submit() returns at once; a crash loses what is still buffered
+              (at most one flush worth of rows / max wait)
+  relaxed   - buffered, and the write function may also skip waiting for the
+              commit to reach disk (Postgres synchronous_commit=off)
+Buffered rows are capped at `write_buffer_max_pending` packets; beyond that
+submit() blocks, which slows the pipeline instead of growing memory.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Callable, List, Optional
+
+WRITE_DURABILITY_MODES = ("immediate", "buffered", "relaxed")
+
+
+class _Flush:
+    def __init__(self):
+        self.done = threading.Event()
+        self.error: Optional[BaseException] = None
+
+    def wait(self) -> None:
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+
+
+class WriteBuffer:
+    def __init__(self, config: dict, write_fn: Callable[[list, bool], None],
+                 on_flushed: Optional[Callable[[list], None]] = None):
+        self.config = config
+        self.write_fn = write_fn
+        self.on_flushed = on_flushed
+        self.flushes = 0
+        self.rows_written = 0
+        self.rows_failed = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.last_flush_rows = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.flush_seconds = 0.0
+        self.max_depth = 0
+        self._pending: List = []
+        self._waiters: List[_Flush] = []
+        self._oldest: Optional[float] = None
+        self._recent_flush_ms = deque(maxlen=200)
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True, name="write-buffer")
+        self._thread.start()
+
+    def _settings(self):
+        max_rows = max(1, int(self.config.get("write_buffer_rows", 500)))
+        max_wait = max(0.0, float(self.config.get("write_buffer_max_wait_ms", 200.0))) / 1000.0
+        max_pending = max(max_rows, int(self.config.get("write_buffer_max_pending", 20_000)))
+        durability = self.config.get("write_durability", "buffered")
+        return max_rows, max_wait, max_pending, durability
+
+    def submit(self, packets: list) -> None:
+        """Buffer a micro-batch; with "immediate" durability wait until it is committed."""
+        if not packets:
+            return
+        _, _, max_pending, durability = self._settings()
+        waiter = _Flush() if durability == "immediate" else None
+        with self._cond:
+            while len(self._pending) >= max_pending and not self._closed:
+                self._cond.wait(0.1)
+            if self._closed:
+                raise RuntimeError("Write buffer is closed")
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            self._pending.extend(packets)
+            self.max_depth = max(self.max_depth, len(self._pending))
+            if waiter is not None:
+                self._waiters.append(waiter)
+            self._cond.notify_all()
+        if waiter is not None:
+            waiter.wait()
+
+    def _take(self):
+        """Block until a flush is due; returns (packets, waiters, relaxed) or None once closed and empty."""
+        with self._cond:
+            while True:
+                max_rows, max_wait, _, durability = self._settings()
+                if self._pending:
+                    due_in = self._oldest + max_wait - time.monotonic()
+                    if self._waiters or self._closed or len(self._pending) >= max_rows or due_in <= 0:
+                        packets, self._pending = self._pending, []
+                        waiters, self._waiters = self._waiters, []
+                        self._oldest = None
+                        self._cond.notify_all()
+                        return packets, waiters, durability == "relaxed"
+                    self._cond.wait(due_in)
+                elif self._closed:
+                    return None
+                else:
+                    self._cond.wait(0.5)
+
+    def _run(self) -> None:
+        while True:
+            taken = self._take()
+            if taken is None:
+                return
+            packets, waiters, relaxed = taken
+            started = time.perf_counter()
+            error = None
+            try:
+                self.write_fn(packets, relaxed)
+                self.rows_written += len(packets)
+            except Exception as e:
+                error = e
+                self.errors += 1
+                self.rows_failed += len(packets)
+                self.last_error = str(e)
+                print(f"Write buffer flush of {len(packets)} rows failed: {e}")
+            elapsed = time.perf_counter() - started
+            self.flushes += 1
+            self.flush_seconds += elapsed
+            self.last_flush_rows = len(packets)
+            self.last_flush_ms = elapsed * 1000.0
+            self.max_flush_ms = max(self.max_flush_ms, self.last_flush_ms)
+            self._recent_flush_ms.append(self.last_flush_ms)
+            if self.on_flushed is not None:
+                self.on_flushed(packets)  # committed or dropped: either way no longer buffered
+            for waiter in waiters:
+                waiter.error = error
+                waiter.done.set()
+
+    def depth(self) -> int:
+        return len(self._pending)
+
+    def status(self) -> dict:
+        max_rows, max_wait, max_pending, durability = self._settings()
+        recent = sorted(self._recent_flush_ms)
+        return {
+            "durability": durability,
+            "flush_rows": max_rows,
+            "flush_max_wait_ms": max_wait * 1000.0,
+            "max_pending": max_pending,
+            "depth": self.depth(),
+            "max_depth": self.max_depth,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "rows_failed": self.rows_failed,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "avg_rows_per_flush": round(self.rows_written / self.flushes, 1) if self.flushes else None,
+            "last_flush_rows": self.last_flush_rows,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "avg_flush_ms": round(1000.0 * self.flush_seconds / self.flushes, 2) if self.flushes else None,
+            "p95_flush_ms": round(recent[int(0.95 * (len(recent) - 1))], 2) if recent else None,
+            "max_flush_ms": round(self.max_flush_ms, 2),
+        }
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Flush what is buffered and stop the flusher thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout=timeout)
@@ -0,0 +1,52 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Add server directory to path so imports work
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server'))
+
+from corpus_cache import default_cache_dir, is_cache_valid, load_corpus
+
+
+def _write_csv(path, rows=1000, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        ' Destination Port': rng.integers(0, 65535, rows),
+        ' Flow Bytes/s': rng.normal(1e4, 5e3, rows),
+        'Attack Type': rng.choice(['Normal Traffic', 'DDoS', 'PortScan'], rows),
+    })
+    df.to_csv(path, index=False)
+    return df
+
+
+def test_cache_roundtrip(tmp_path):
+    csv_path = str(tmp_path / 'corpus.csv')
+    expected = _write_csv(csv_path)
+
+    df = load_corpus(csv_path)
+    assert is_cache_valid(csv_path)
+    assert list(df.columns) == ['Destination Port', 'Flow Bytes/s', 'Attack Type']
+    assert df['Flow Bytes/s'].dtype == np.float32
+    assert isinstance(df['Attack Type'].dtype, pd.CategoricalDtype)
+    np.testing.assert_allclose(df['Flow Bytes/s'], expected[' Flow Bytes/s'].astype(np.float32))
+    assert df['Attack Type'].astype(str).tolist() == expected['Attack Type'].tolist()
+
+    # Second load maps the cache instead of parsing the CSV.
+    again = load_corpus(csv_path, columns=['Destination Port'])
+    assert isinstance(again['Destination Port'].to_numpy().base, np.memmap)
+    assert again['Destination Port'].astype(int).tolist() == expected[' Destination Port'].tolist()
+
+
+def test_cache_invalidated_when_csv_changes(tmp_path):
+    csv_path = str(tmp_path / 'corpus.csv')
+    _write_csv(csv_path, rows=100, seed=1)
+    load_corpus(csv_path)
+
+    changed = _write_csv(csv_path, rows=120, seed=2)
+    assert not is_cache_valid(csv_path)
+    df = load_corpus(csv_path)
+    assert len(df) == 120
+    assert df['Attack Type'].astype(str).tolist() == changed['Attack Type'].tolist()
+    assert os.path.isdir(default_cache_dir(csv_path))
@@ -0,0 +1,57 @@
+import json
+import os
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+
+# Add server directory to path so imports work
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server')
+sys.path.append(SERVER_DIR)
+
+from fast_scorer import FastScorer
+
+
+def _load_artifacts():
+    model = joblib.load(os.path.join(SERVER_DIR, 'multiclass_xgboost_ids.joblib'))
+    with open(os.path.join(SERVER_DIR, 'feature_columns.json'), 'r', encoding='utf-8') as f:
+        feature_columns = json.load(f)
+    return model, feature_columns
+
+
+def _sample_scaled_rows(feature_columns, rows=500):
+    # Scaled-space rows around the training distribution, plus a few extreme values.
+    rng = np.random.default_rng(7)
+    X = rng.normal(0.0, 1.5, size=(rows, len(feature_columns)))
+    X[:10] *= 50.0
+    return X.astype(np.float32)
+
+
+def test_fast_scorer_matches_calibrated_model():
+    model, feature_columns = _load_artifacts()
+    scorer = FastScorer.from_model(model)
+    assert scorer is not None
+
+    X = _sample_scaled_rows(feature_columns)
+    expected = model.predict_proba(pd.DataFrame(X, columns=feature_columns))
+    actual = scorer.predict_proba(X)
+
+    assert actual.shape == expected.shape
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-6)
+    np.testing.assert_array_equal(actual.argmax(axis=1), expected.argmax(axis=1))
+
+
+def test_fast_scorer_single_row():
+    model, feature_columns = _load_artifacts()
+    scorer = FastScorer.from_model(model)
+    row = _sample_scaled_rows(feature_columns, rows=1)[0]
+
+    expected = model.predict_proba(pd.DataFrame([row], columns=feature_columns))
+    np.testing.assert_allclose(scorer.predict_proba(row), expected, rtol=0, atol=1e-6)
+
+
+if __name__ == "__main__":
+    test_fast_scorer_matches_calibrated_model()
+    test_fast_scorer_single_row()
+    print("FastScorer parity OK")
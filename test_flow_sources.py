@@ -0,0 +1,169 @@
+import os
+import socket
+import sys
+import time
+
+import pytest
+
+# Add server directory to path so imports work
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server'))
+
+import flow_sources
+from flow_sources import CsvTailSource, SocketFlowSource, parse_flow_lines
+
+HEADER = ['Flow ID', 'Destination Port', 'Flow Duration']
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('timed out waiting for the flow source')
+        time.sleep(0.02)
+
+
+def _drain(source):
+    batches = []
+    while True:
+        batch = source.read_batch(100)
+        if batch is None:
+            return batches
+        batches.append(batch)
+
+
+@pytest.fixture
+def tcp_source():
+    source = SocketFlowSource('tcp', '127.0.0.1', 0, HEADER)
+    yield source
+    source.close()
+
+
+@pytest.fixture
+def udp_source():
+    source = SocketFlowSource('udp', '127.0.0.1', 0, HEADER)
+    yield source
+    source.close()
+
+
+def _connect(source):
+    conn = socket.create_connection(('127.0.0.1', source.port))
+    conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return conn
+
+
+def test_tcp_header_only_on_first_line(tcp_source):
+    with _connect(tcp_source) as conn:
+        # CICFlowMeter records start with a text Flow ID; only the first line may be a header.
+        conn.sendall(b'Flow ID,Flow Duration,Destination Port\n'
+                     b'10.0.0.1-10.0.0.2-80-1234-6,100,80\n'
+                     b'Flow ID,Destination Port,Flow Duration\n')
+    _wait_for(lambda: tcp_source.records_received == 2)
+    with _connect(tcp_source) as conn:
+        conn.sendall(b'10.0.0.3-10.0.0.4-22-999-6,22,7\n')
+    _wait_for(lambda: tcp_source.records_received == 3)
+
+    batches = _drain(tcp_source)
+    assert [b.header for b in batches] == [['Flow ID', 'Flow Duration', 'Destination Port'], HEADER]
+    # A repeated header line mid-stream is a record (its text becomes NaN), not a header switch.
+    assert batches[0].lines[1] == 'Flow ID,Destination Port,Flow Duration'
+    first = parse_flow_lines(batches[0])
+    assert first['Destination Port'].tolist()[0] == 80
+    assert first['Flow Duration'].tolist()[0] == 100
+    assert parse_flow_lines(batches[1])['Destination Port'].tolist() == [22]
+    assert tcp_source.records_read == 3
+
+
+def test_tcp_record_split_across_reads(tcp_source):
+    with _connect(tcp_source) as conn:
+        conn.sendall(b'a,443,5\nb,4')
+        time.sleep(0.2)
+        conn.sendall(b'43,6\nc,44')
+        time.sleep(0.2)
+        conn.sendall(b'3,7')  # no trailing newline: flushed when the peer closes
+    _wait_for(lambda: tcp_source.records_received == 3)
+    (batch,) = _drain(tcp_source)
+    assert batch.lines == ['a,443,5', 'b,443,6', 'c,443,7']
+
+
+def test_tcp_line_without_newline_is_capped(tcp_source, monkeypatch):
+    monkeypatch.setattr(flow_sources, 'MAX_LINE_BYTES', 1024)
+    conn = _connect(tcp_source)
+    conn.sendall(b'x' * 4096)
+    conn.settimeout(5)
+    assert conn.recv(1) == b''  # the source closed the connection
+    conn.close()
+    assert tcp_source.records_dropped == 1
+    assert tcp_source.read_batch(10) is None
+
+    with _connect(tcp_source) as conn:
+        conn.sendall(b'a,443,5\n')
+    _wait_for(lambda: tcp_source.records_received == 1)
+    assert tcp_source.read_batch(10).lines == ['a,443,5']
+
+
+def test_udp_headers_are_per_peer_and_bounded(udp_source, monkeypatch):
+    monkeypatch.setattr(flow_sources, 'MAX_UDP_PEERS', 2)
+    peers = [socket.socket(socket.AF_INET, socket.SOCK_DGRAM) for _ in range(3)]
+    target = ('127.0.0.1', udp_source.port)
+    try:
+        peers[0].sendto(b'Flow ID,Flow Duration,Destination Port', target)
+        peers[0].sendto(b'a,1,80', target)
+        peers[1].sendto(b'b,2,8080', target)  # no header: default column order
+        _wait_for(lambda: udp_source.records_received == 2)
+        batches = _drain(udp_source)
+        assert [(b.header, b.lines) for b in batches] == [
+            (['Flow ID', 'Flow Duration', 'Destination Port'], ['a,1,80']),
+            (HEADER, ['b,2,8080']),
+        ]
+
+        # Two more peers with their own headers push the first one out.
+        for i, peer in enumerate(peers[1:], start=1):
+            peer.sendto(b'Destination Port,Flow ID,Flow Duration\n' + f'{i},p{i},{i}'.encode(), target)
+        _wait_for(lambda: udp_source.records_received == 4)
+        _drain(udp_source)
+        assert len(udp_source._udp_headers) == 2
+        assert peers[0].getsockname() not in udp_source._udp_headers
+
+        peers[0].sendto(b'c,3,443', target)
+        peers[2].sendto(b'9,p9,9', target)
+        _wait_for(lambda: udp_source.records_received == 6)
+        batches = _drain(udp_source)
+        assert [(b.header, b.lines) for b in batches] == [
+            (HEADER, ['c,3,443']),
+            (['Destination Port', 'Flow ID', 'Flow Duration'], ['9,p9,9']),
+        ]
+    finally:
+        for peer in peers:
+            peer.close()
+
+
+def test_csv_tail_follows_appends_and_reopens_on_truncation_and_rotation(tmp_path):
+    path = tmp_path / 'flows.csv'
+    path.write_text('Flow ID,Destination Port\na,80\nb,4')
+    source = CsvTailSource(str(path))
+    try:
+        batch = source.read_batch(10)
+        assert batch.header == ['Flow ID', 'Destination Port']
+        assert batch.lines == ['a,80']  # the partial last line waits
+        with open(path, 'a') as fh:
+            fh.write('43\nc,22\n')
+        assert source.read_batch(10).lines == ['b,443', 'c,22']
+        assert source.read_batch(10) is None
+
+        # Truncated in place: read again from the start, under the new header.
+        path.write_text('Destination Port,Flow ID\n53,d\n')
+        batch = source.read_batch(10)
+        assert batch.header == ['Destination Port', 'Flow ID']
+        assert batch.lines == ['53,d']
+
+        # Rotated: a new file (new inode) under the same name, even if it is larger.
+        rotated = tmp_path / 'flows.csv.new'
+        rotated.write_text('Flow ID,Destination Port\n' + ''.join(f'r{i},{i}\n' for i in range(5)))
+        os.replace(rotated, path)
+        batch = source.read_batch(10)
+        assert batch.header == ['Flow ID', 'Destination Port']
+        assert batch.lines == [f'r{i},{i}' for i in range(5)]
+        assert source.reopens == 2
+        assert source.records_read == 9
+    finally:
+        source.close()
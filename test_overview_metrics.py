@@ -0,0 +1,96 @@
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import sessionmaker
+
+# Add server directory to path so imports work
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server'))
+
+from database import AutoBlocked, Base, ManualReview, TrafficLog, create_db_engine
+from overview_metrics import RollingOverview
+
+TYPES = ["Normal Traffic", "DDoS", "PortScan", "Bots", "Brute Force"]
+
+
+def _rows(now, n=400, seed=7):
+    """Random rows over the last 30h, kept clear of the 24h edge so bucket alignment cannot flip them."""
+    rng = random.Random(seed)
+    traffic, blocked, reviews = [], [], []
+    for _ in range(n):
+        minutes = rng.choice([rng.uniform(0.5, 23.8 * 60), rng.uniform(24.2 * 60, 30 * 60)])
+        ts = now - timedelta(minutes=minutes)
+        attack_type = rng.choice(TYPES)
+        traffic.append((ts, attack_type))
+        if attack_type != "Normal Traffic" and rng.random() < 0.4:
+            blocked.append(ts)
+        if attack_type != "Normal Traffic" and rng.random() < 0.3:
+            resolved_at = ts + timedelta(seconds=rng.randint(5, 600))
+            reviews.append((ts, resolved_at, rng.choice(["MANUAL_BLOCK", "FALSE_POSITIVE", "AUTO_BLOCKED"])))
+    return traffic, blocked, reviews
+
+
+def test_seed_from_database_matches_recorded_events(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'overview.db'}")
+    Base.metadata.create_all(engine)
+    now = datetime.utcnow()
+    traffic, blocked, reviews = _rows(now)
+    db = sessionmaker(bind=engine)()
+    db.add_all(TrafficLog(timestamp=ts, type=t, action="MONITOR") for ts, t in traffic)
+    db.add_all(AutoBlocked(timestamp=ts, type="DDoS") for ts in blocked)
+    db.add_all(ManualReview(timestamp=ts, resolved_at=r, action_taken=a, status="RESOLVED", type="Bots")
+               for ts, r, a in reviews)
+    db.add(ManualReview(timestamp=now - timedelta(hours=1), type="Bots", status="PENDING"))
+    db.commit()
+    db.close()
+
+    seeded = RollingOverview(session_factory=sessionmaker(bind=engine))
+    seeded.seed()
+    recorded = RollingOverview(session_factory=None)
+    recorded.loaded = True
+    recorded.record(traffic=traffic, auto_blocked=blocked, resolved=reviews)
+    assert seeded.overview() == recorded.overview()
+
+    day_ago = now - timedelta(hours=24)
+    in_window = [t for ts, t in traffic if ts >= day_ago]
+    result = seeded.overview()
+    assert result["traffic_total"] == len(in_window) == sum(result["traffic_bars_24h"])
+    assert result["active_threats"] == sum(1 for t in in_window if t != "Normal Traffic")
+    assert result["active_threats"] == sum(result["severity_distribution"].values())
+    assert result["auto_blocked"] == sum(1 for ts in blocked if ts >= day_ago)
+    assert result["resolved"] == sum(1 for ts, _, _ in reviews if ts >= day_ago)
+    assert result["false_positives"] == sum(1 for ts, _, a in reviews if ts >= day_ago and a == "FALSE_POSITIVE")
+    engine.dispose()
+
+
+def test_buckets_expire_and_windows_slide():
+    overview = RollingOverview(session_factory=None)
+    overview.loaded = True
+    now = datetime.utcnow()
+    overview.record(traffic=[(now - timedelta(minutes=1), "DDoS")], auto_blocked=[now - timedelta(hours=5)])
+    result = overview.overview(now)
+    assert result["traffic_bars_24h"][-1] == 1
+    assert result["traffic_last_12h"] == 1 and result["traffic_prev_12h"] == 0
+    assert result["severity_distribution"]["critical"] == 1
+    assert [slot["automated"] for slot in result["decision_velocity"]] == [0, 0, 0, 0, 1, 0]
+
+    later = overview.overview(now + timedelta(hours=13))
+    assert later["traffic_last_12h"] == 0 and later["traffic_prev_12h"] == 1
+    assert overview.overview(now + timedelta(hours=25))["traffic_total"] == 0
+    overview.record(traffic=[(now - timedelta(days=2), "DDoS")])
+    assert overview.dropped == 1
+
+
+def test_re_resolution_replaces_the_earlier_outcome():
+    overview = RollingOverview(session_factory=None)
+    overview.loaded = True
+    created = datetime.utcnow() - timedelta(minutes=30)
+    first = created + timedelta(minutes=10)
+    overview.record_resolution(created, first, "FALSE_POSITIVE")
+    overview.record_resolution(created, created + timedelta(minutes=20), "MANUAL_BLOCK",
+                               previous=(first, "FALSE_POSITIVE"))
+    result = overview.overview()
+    assert result["resolved"] == 1
+    assert result["false_positives"] == 0
+    assert result["mean_time_to_respond_seconds"] == 20 * 60
@@ -0,0 +1,30 @@
+import os
+import sys
+from datetime import date
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable
+
+# Add server directory to path so imports work
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server'))
+
+from database import Base
+from partitioning import _partition_day, partition_name, partitioned_definition
+
+
+def test_partitioned_definition_keys_on_timestamp():
+    table = partitioned_definition(Base.metadata.tables["traffic_logs"])
+    ddl = str(CreateTable(table).compile(dialect=postgresql.dialect()))
+    assert "PARTITION BY RANGE (timestamp)" in ddl
+    assert "id SERIAL NOT NULL" in ddl
+    assert "PRIMARY KEY (id, timestamp)" in ddl
+    # The ORM mapping itself is untouched.
+    assert [c.name for c in Base.metadata.tables["traffic_logs"].primary_key] == ["id"]
+
+
+def test_partition_names_round_trip():
+    name = partition_name("traffic_logs", date(2026, 3, 9))
+    assert name == "traffic_logs_p20260309"
+    assert _partition_day("traffic_logs", name) == date(2026, 3, 9)
+    assert _partition_day("traffic_logs", "traffic_logs_default") is None
+    assert _partition_day("auto_blocked", name) is None
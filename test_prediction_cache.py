@@ -0,0 +1,71 @@
+import os
+import sys
+
+import numpy as np
+
+# Add server directory to path so imports work
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server'))
+
+from prediction_cache import PredictionCache, scoring_scope
+
+
+def _features(rows=4, seed=0):
+    return np.random.default_rng(seed).normal(size=(rows, 8)).astype(np.float32)
+
+
+def test_hits_after_store_and_version_is_part_of_key():
+    cache = PredictionCache(max_entries=16)
+    features = _features()
+    generation, keys, found = cache.lookup("v1", features)
+    assert found == [None] * 4
+    cache.store(generation, keys, [0, 1, 2, 1], [0.9, 0.8, 0.7, 0.6], [1, 0, 0, 2], True)
+
+    _, again, found = cache.lookup("v1", features)
+    assert again == keys
+    assert [entry[0] for entry in found] == [0, 1, 2, 1]
+    assert found[1][1] == 0.8
+    assert cache.status()["hit_rate"] == 0.5
+
+    _, _, other_model = cache.lookup("v2", features)
+    assert other_model == [None] * 4
+
+
+def test_explanations_are_per_mode_and_class():
+    cache = PredictionCache()
+    generation, keys, _ = cache.lookup("v1", _features(rows=1))
+    cache.store(generation, keys, [3], [0.9], [1], True)
+    cache.put_explanation(generation, keys[0], "exact", 3, "a (+0.5)")
+    assert cache.get_explanation(keys[0], "exact", 3) == "a (+0.5)"
+    assert cache.get_explanation(keys[0], "approx", 3) is None
+    assert cache.get_explanation(keys[0], "exact", 1) is None
+
+
+def test_clear_drops_entries_and_ignores_stale_stores():
+    cache = PredictionCache(max_entries=2)
+    generation, keys, _ = cache.lookup("v1", _features())
+    cache.store(generation, keys, [0, 0, 0, 0], [0.5] * 4, [1] * 4, True)
+    status = cache.status()
+    assert status["entries"] == 2 and status["evictions"] == 2 and status["memory_bytes"] > 0
+
+    cache.clear()
+    cache.store(generation, keys, [0, 0, 0, 0], [0.5] * 4, [1] * 4, True)
+    assert cache.status()["entries"] == 0
+    assert cache.status()["memory_bytes"] == 0
+
+
+def test_switching_scoring_mode_misses_a_warm_cache():
+    cache = PredictionCache()
+    features = _features()
+    full = scoring_scope("v1", "full", 0.97)
+    cascade = scoring_scope("v1", "cascade", 0.97)
+    assert full == scoring_scope("v1", "cascade", None) == "v1"
+    assert cascade != scoring_scope("v1", "cascade", 0.9)
+
+    generation, keys, _ = cache.lookup(cascade, features)
+    cache.store(generation, keys, [0, 0, 0, 0], [0.99] * 4, [0] * 4, True)
+    assert cache.lookup(full, features)[2] == [None] * 4
+
+    generation, keys, _ = cache.lookup(full, features)
+    cache.store(generation, keys, [2, 1, 2, 1], [0.9] * 4, [0] * 4, True)
+    assert [entry[0] for entry in cache.lookup(full, features)[2]] == [2, 1, 2, 1]
+    assert [entry[0] for entry in cache.lookup(cascade, features)[2]] == [0, 0, 0, 0]
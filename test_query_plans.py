@@ -0,0 +1,81 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, text
+from sqlalchemy.exc import OperationalError
+
+# Add server directory to path so imports work
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server'))
+
+from database import AutoBlocked, ManualReview, SessionLocal, TrafficLog, engine, init_db
+
+
+@pytest.fixture(scope="module")
+def db():
+    if engine.dialect.name not in ("postgresql", "sqlite"):
+        pytest.skip("plan checks cover PostgreSQL and SQLite")
+    try:
+        init_db()
+    except OperationalError as e:
+        pytest.skip(f"database not reachable: {e.orig}")
+    session = SessionLocal()
+    if engine.dialect.name == "postgresql":
+        # With seq scans priced out, the planner only picks one when no index fits the query.
+        session.execute(text("SET enable_seqscan = off"))
+    yield session
+    session.rollback()
+    session.close()
+
+
+def _seq_scans(db, query):
+    compiled = query.statement.compile(dialect=engine.dialect)
+    if engine.dialect.name == "sqlite":
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+        details = db.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + str(compiled), params).all()
+        # "SCAN traffic_logs" is a full table scan; "SCAN ... USING INDEX" / "SEARCH ..." are not.
+        return [row[-1] for row in details if row[-1].startswith("SCAN ") and " USING " not in row[-1]]
+    plan = db.connection().exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params).scalar()
+    found, stack = [], [plan[0]["Plan"]]
+    while stack:
+        node = stack.pop()
+        if node["Node Type"] == "Seq Scan":
+            found.append(node["Relation Name"])
+        stack.extend(node.get("Plans", []))
+    return found
+
+
+def _hot_queries(db):
+    since = datetime.utcnow() - timedelta(hours=2)
+    version = "ids-xgb-plan-check"
+    return {
+        # _compute_automation_rate_24h
+        "automation_threats": db.query(func.count(TrafficLog.id)).filter(
+            TrafficLog.timestamp >= since, TrafficLog.type != "Normal Traffic", TrafficLog.model_version == version
+        ),
+        "automation_auto_blocked": db.query(func.count(TrafficLog.id)).filter(
+            TrafficLog.timestamp >= since, TrafficLog.action == "AUTO_BLOCKED", TrafficLog.model_version == version
+        ),
+        # get_threat_map / get_threat_map_batches
+        "threat_map": db.query(TrafficLog).filter(TrafficLog.type != "Normal Traffic")
+        .order_by(TrafficLog.timestamp.desc()).limit(100),
+        "threat_map_batches": db.query(TrafficLog).filter(TrafficLog.type != "Normal Traffic")
+        .order_by(TrafficLog.timestamp.asc()).limit(200),
+        # get_live_traffic / overview windows
+        "live_traffic": db.query(TrafficLog).order_by(TrafficLog.timestamp.desc()).limit(20),
+        "overview_traffic": db.query(TrafficLog).filter(TrafficLog.timestamp >= since),
+        "overview_auto_blocked": db.query(AutoBlocked).filter(AutoBlocked.timestamp >= since),
+        # get_pending_incidents / pending queue reconcile
+        "pending_incidents": db.query(ManualReview).filter(ManualReview.status == "PENDING"),
+        "pending_by_type": db.query(ManualReview.type, func.count(ManualReview.id))
+        .filter(ManualReview.status == "PENDING").group_by(ManualReview.type),
+    }
+
+
+@pytest.mark.parametrize("name", [
+    "automation_threats", "automation_auto_blocked", "threat_map", "threat_map_batches",
+    "live_traffic", "overview_traffic", "overview_auto_blocked", "pending_incidents", "pending_by_type",
+])
+def test_hot_query_uses_an_index(db, name):
+    assert _seq_scans(db, _hot_queries(db)[name]) == []
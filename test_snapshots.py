@@ -0,0 +1,40 @@
+import os
+import sys
+
+import numpy as np
+
+# Add server directory to path so imports work
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server'))
+
+from snapshots import SchemaRegistry, blob_schema, decode_matrix, encode_rows, schema_hash
+
+COLUMNS = ["Destination Port", "Flow Duration", "Flow Bytes/s"]
+
+
+def _registry(*schemas):
+    registry = SchemaRegistry()
+    for columns in schemas:
+        registry.register(schema_hash(columns), columns)
+    return registry
+
+
+def test_round_trip_is_exact_float32():
+    raw = np.random.default_rng(0).lognormal(size=(5, 3)).astype(np.float32)
+    schema = schema_hash(COLUMNS)
+    blobs = encode_rows(schema, raw)
+    assert len(blobs) == 5
+    assert all(len(b) == 8 + 3 * 4 and blob_schema(b) == schema for b in blobs)
+    # psycopg2 hands bytea back as memoryview
+    decoded = decode_matrix([memoryview(b) for b in blobs], COLUMNS, _registry(COLUMNS))
+    np.testing.assert_array_equal(decoded, raw)
+
+
+def test_rows_from_another_schema_are_realigned_by_name():
+    old_columns = ["Flow Bytes/s", "Destination Port"]
+    old = encode_rows(schema_hash(old_columns), np.array([[10.0, 443.0]]))
+    new = encode_rows(schema_hash(COLUMNS), np.array([[53.0, 7.0, 1.5]]))
+    unknown = encode_rows(schema_hash(["Other"]), np.array([[1.0]]))
+    decoded = decode_matrix([old[0], new[0], unknown[0]], COLUMNS, _registry(COLUMNS, old_columns), fill=np.nan)
+    np.testing.assert_array_equal(decoded[0], [443.0, np.nan, 10.0])
+    np.testing.assert_array_equal(decoded[1], [53.0, 7.0, 1.5])
+    assert np.isnan(decoded[2]).all()